@@ -0,0 +1,229 @@
+import json
+from collections import deque
+
+
+class DirtyTracer:
+    """
+    Records why a Network's nodes recompute, once switched on like this:
+
+        tracer = net.enable_tracing()
+        ... use the network ...
+        print(tracer.why('formatter'))
+        tracer.to_json('trace.json')
+
+    For every node that is made dirty, it remembers what caused it: the
+    terminals whose writes reached it, (or a change to the topology), and the
+    path of nodes along which each got there. And for every node that is then
+    re-evaluated, which read of the network triggered it, and whether its
+    transfer function was executed, its outputs were served from a MemoCache
+    or ResultStore, (a 'cache hit'), or it was simply marked clean because
+    none of its inputs had changed, (a 'cut off').
+
+    So why(node_name) answers "why did this node recompute?", like this:
+
+        <formatter> was executed by read #2 (of formatter), because of:
+            TERM:X > adder > formatter
+
+    (A node that is reached by a second terminal write while it is still dirty
+    records that terminal too, but dirty status is not propagated beyond it,
+    so the nodes downstream of it pick the second terminal up through their
+    path to it).
+
+    Everything is also written to an event log, (in the order it happened,
+    and holding at most max_events events), which events() returns as a list
+    of dictionaries, and to_json() exports.
+
+    The recording costs little more than the propagation itself, (no paths are
+    worked out until you ask for them), and nothing at all when it is off.
+    """
+
+    def __init__(self, max_events=100000):
+        self.max_events = max_events
+        self.reset()
+
+    def reset(self):
+        self.reads = 0  # How many reads have triggered an evaluation.
+        self._events = deque(maxlen=self.max_events)
+        # The causes of each dirty node, keyed on name, (see add_cause()).
+        self._causes = {}
+        # The outcome of each node's most recent re-evaluation, keyed on name,
+        # as (outcome, read, causes) tuples.
+        self._outcomes = {}
+        self._read = None  # The current read, as a (number, node_names) tuple.
+
+    #------------------------------------------------------------------------
+    # Recording API (for the Network's helpers).
+    #------------------------------------------------------------------------
+
+    def add_cause(self, node_name, cause):
+        """
+        Records a cause of the named node being dirty, and returns the list of
+        all its causes, (which the causes of the nodes downstream of it refer
+        to).
+
+        A cause is a (origin, upstream_causes, upstream_name) tuple. The origin
+        is what started the propagation, (e.g. 'TERM:X'), for a node that was
+        made dirty by it directly. Otherwise it is None, and the cause refers
+        to the list of causes of the upstream node that passed it on.
+        """
+        causes = self._causes.get(node_name)
+        if causes is None:
+            causes = self._causes[node_name] = []
+        elif any(c[0] == cause[0] and c[1] is cause[1] for c in causes):
+            return causes
+        causes.append(cause)
+        self._events.append(('dirtied', node_name, cause[0], cause[2]))
+        return causes
+
+    def record_read(self, node_names):
+        self.reads += 1
+        self._read = (self.reads, tuple(node_names))
+        self._events.append(('read',) + self._read)
+
+    def record_outcome(self, node_name, outcome):
+        """
+        Records that a dirty node has been re-evaluated, (with an outcome of
+        'executed', 'cache hit' or 'cut off'), which consumes its causes.
+        """
+        causes = self._causes.pop(node_name, [])
+        self._outcomes[node_name] = (outcome, self._read, causes)
+        self._events.append((outcome, node_name, self._read, causes))
+
+    #------------------------------------------------------------------------
+    # Query API.
+    #------------------------------------------------------------------------
+
+    def causes(self, node_name):
+        """
+        The paths by which the named node was made dirty, before it was most
+        recently re-evaluated, (or since, if it is dirty now). Each path is a
+        list of names, starting with the origin, (e.g. 'TERM:X'), and ending
+        with the node itself. There is one path for each origin that reached it
+        through each of its upstream nodes.
+        """
+        causes = self._causes.get(node_name)
+        if causes is None:
+            outcome = self._outcomes.get(node_name)
+            causes = [] if outcome is None else outcome[2]
+        return self._paths(node_name, causes)
+
+    def why(self, node_name):
+        """
+        An explanation of why the named node was most recently re-evaluated,
+        (or, if it is dirty now, why it is dirty), as text.
+        """
+        if node_name in self._causes:
+            return self._explanation(
+                '<{}> is dirty'.format(node_name),
+                self.causes(node_name))
+        outcome = self._outcomes.get(node_name)
+        if outcome is None:
+            return '<{}> has not been re-evaluated since tracing began.'.format(
+                node_name)
+        outcome, read, _ = outcome
+        return self._explanation(
+            '<{}> was {} by {}'.format(
+                node_name, _PAST_TENSES[outcome], self._describe_read(read)),
+            self.causes(node_name))
+
+    def events(self):
+        """
+        The event log, as a list of dictionaries, each with an 'event' key of
+        'dirtied', 'read', 'executed', 'cache hit' or 'cut off'.
+        """
+        return [self._event_as_dict(event) for event in self._events]
+
+    def to_json(self, path=None):
+        """
+        The event log as a JSON string, which is also written to the file at
+        the given path, if you give one.
+        """
+        text = json.dumps(self.events(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _paths(node_name, causes):
+        """
+        Works the paths out from the chain of cause lists, (see add_cause()).
+        It does so without recursion, and visits each list once, so it copes
+        with deep networks, and with diamonds, where the number of distinct
+        paths could be enormous. (Upstream, only the first path found from
+        each origin is kept).
+        """
+        paths_of = {}  # The paths from each origin, keyed on id(causes).
+        stack = [c[1] for c in causes if c[1] is not None]
+        while stack:
+            current = stack[-1]
+            if id(current) in paths_of:
+                stack.pop()
+                continue
+            unresolved = [c[1] for c in current if c[1] is not None and
+                          id(c[1]) not in paths_of]
+            if unresolved:
+                stack.extend(unresolved)
+                continue
+            stack.pop()
+            paths = {}
+            for origin, upstream_causes, upstream_name in current:
+                if upstream_causes is None:
+                    paths.setdefault(origin, [origin])
+                    continue
+                for upstream_origin, path in paths_of[id(upstream_causes)]\
+                        .items():
+                    paths.setdefault(upstream_origin, path + [upstream_name])
+            paths_of[id(current)] = paths
+        # For the node itself, one path per origin through each of its
+        # upstream nodes.
+        result = {}
+        for origin, upstream_causes, upstream_name in causes:
+            if upstream_causes is None:
+                result.setdefault((origin, None), [origin, node_name])
+                continue
+            for upstream_origin, path in paths_of[id(upstream_causes)].items():
+                result.setdefault((upstream_origin, upstream_name),
+                                  path + [upstream_name, node_name])
+        return sorted(result.values())
+
+    @staticmethod
+    def _describe_read(read):
+        if read is None:
+            return 'an evaluation made before tracing began'
+        number, node_names = read
+        return 'read #{} (of {})'.format(number, ', '.join(node_names))
+
+    @staticmethod
+    def _explanation(headline, paths):
+        if not paths:
+            return headline + (', but no cause was recorded. (It may be new, '
+                               'its values may have been evicted, or it may '
+                               'have been made dirty before tracing began).')
+        return '\n    '.join([headline + ', because of:'] +
+                               [' > '.join(path) for path in paths])
+
+    def _event_as_dict(self, event):
+        kind = event[0]
+        if kind == 'dirtied':
+            _, node_name, origin, upstream_name = event
+            return {'event': kind, 'node': node_name,
+                    'by': origin if upstream_name is None else upstream_name}
+        if kind == 'read':
+            _, number, node_names = event
+            return {'event': kind, 'read': number, 'nodes': list(node_names)}
+        _, node_name, read, causes = event
+        return {'event': kind, 'node': node_name,
+                'read': None if read is None else read[0],
+                'causes': self._paths(node_name, causes)}
+
+
+_PAST_TENSES = {
+    'executed': 'executed',
+    'cache hit': 'served from its cache',
+    'cut off': 'cut off',
+}
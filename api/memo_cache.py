@@ -0,0 +1,159 @@
+from collections import OrderedDict
+
+
+class MemoCache:
+    """
+    A bounded cache of a node's previous results, keyed on its input values,
+    which lets the node skip calling its transfer function when it sees a set
+    of input values it has seen before. (E.g. when terminals toggle between a
+    handful of recurring states).
+
+    Usage:
+
+        cache = MemoCache(max_entries=16)
+        net.set_memo_cache('expensive_node', cache)
+        ...
+        print(cache.hits, cache.misses)
+
+    The transfer function must be *pure* for this to make sense, and the input
+    values must be hashable (a node whose input values are not hashable simply
+    runs its transfer function every time). Input values are matched on their
+    types as well as on equality, (so the results for 1 are not served for
+    1.0 or True). Remembered output values are handed back as they are, not
+    copied.
+
+    Give each node a MemoCache of its own. The keys do not include the node,
+    so nodes sharing one would be served each other's results. (And changing
+    either node's transfer function clears it).
+
+    Eviction happens whenever there are more than *max_entries* entries, or
+    (when a *size_fn* is given) when the total size of the entries is greater
+    than *max_size*. The size_fn is called with the dictionary of output values
+    to estimate its size in whatever units you like. The entry evicted depends
+    on the *eviction* policy:
+
+        'lru'       The least recently used entry.
+        'cheapest'  The entry that took the least time to compute, (so the
+                    ones that would be most expensive to recompute are kept).
+    """
+
+    def __init__(self, max_entries=128, max_size=None, size_fn=None,
+                 eviction='lru'):
+        if eviction not in self._EVICTION_POLICIES:
+            raise ValueError('Unknown eviction policy: <{}>'.format(eviction))
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size_fn = size_fn
+        self.eviction = eviction
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_size = 0
+
+        # (output_values, size, compute_seconds) tuples, keyed on the input
+        # values key, and held in least to most recently used order.
+        self._entries = OrderedDict()
+
+    def lookup(self, input_values_dict):
+        """
+        The remembered output values for the given input values, or None.
+        """
+        key = self._make_key(input_values_dict)
+        entry = None if key is None else self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def store(self, input_values_dict, output_values, compute_seconds=0.0):
+        """
+        Remember the output values produced from the given input values.
+        """
+        key = self._make_key(input_values_dict)
+        if key is None:
+            return
+        self._discard(key)
+        size = 0 if self.size_fn is None else self.size_fn(output_values)
+        self._entries[key] = (output_values, size, compute_seconds)
+        self.total_size += size
+        self._evict_as_needed()
+
+    def clear(self):
+        self._entries.clear()
+        self.total_size = 0
+
+    def stats(self):
+        """
+        A dictionary of the cache's counters.
+        """
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'total_size': self.total_size,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    _EVICTION_POLICIES = ('lru', 'cheapest')
+
+    @staticmethod
+    def _make_key(input_values_dict):
+        """
+        A hashable key for the given input values, or None if they are not
+        hashable.
+        """
+        key = tuple(sorted(
+            ((name, _typed(value)) for name, value in input_values_dict.items()),
+            key=lambda kv: kv[0]))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_size -= entry[1]
+
+    def _evict_as_needed(self):
+        while self._entries and self._is_over_budget():
+            if self.eviction == 'lru':
+                victim = next(iter(self._entries))
+            else:
+                # Iteration is oldest first, so min() breaks ties in favour
+                # of evicting the least recently used.
+                victim = min(self._entries,
+                             key=lambda k: self._entries[k][2])
+            self._discard(victim)
+            self.evictions += 1
+
+    def _is_over_budget(self):
+        if self.max_entries is not None and \
+                len(self._entries) > self.max_entries:
+            return True
+        return self.max_size is not None and self.total_size > self.max_size
+
+
+def _typed(value):
+    """
+    The value paired with its type, (and likewise the members of a tuple or
+    frozenset, however deeply nested), so that values that are equal but of
+    different types make different keys.
+    """
+    kind = type(value)
+    if isinstance(value, tuple):
+        return kind, tuple(_typed(member) for member in value)
+    if isinstance(value, frozenset):
+        return kind, frozenset(_typed(member) for member in value)
+    return kind, value
@@ -1,12 +1,22 @@
-from operator import attrgetter
+from contextlib import contextmanager
 
 
+from dataflow.api.dirty_tracer import DirtyTracer
 from dataflow.api.network_error import NetworkError
+from dataflow.api.network_profiler import NetworkProfiler
 from dataflow.implementation.node import Node
 from dataflow.implementation.terminal import Terminal
 from dataflow.implementation.edge import Edge
+from dataflow.implementation.edge_index import EdgeIndex
 from dataflow.implementation.dirty_propagator import DirtyPropagator
+from dataflow.implementation.evaluation_plan import EvaluationPlan
+from dataflow.implementation.evaluator import Evaluator
 from dataflow.implementation.network_integrity import NetworkIntegrity
+from dataflow.implementation.network_snapshot import NetworkSnapshot
+from dataflow.implementation.subnetwork_inliner import SubnetworkInliner
+from dataflow.implementation.subscription_manager import SubscriptionManager
+from dataflow.implementation.sweep_evaluator import SweepEvaluator
+from dataflow.implementation.topology_editor import TopologyEditor
 
 
 class Network:
@@ -26,15 +36,42 @@ class Network:
         self.terminals = {}
         self.edges = []
 
+        # The same edges, indexed for the structural queries below.
+        self.edge_index = EdgeIndex()
+
         # A helper that knows how to propagate dirty status downstream.
         self._dirty_propagator = DirtyPropagator(self)
 
+        # A helper that knows how to make nodes clean, and the compiled form
+        # of the topology that it works from. The latter is compiled lazily,
+        # and then kept up to date as the topology changes.
+        self._evaluator = Evaluator(self)
+        self._plan = None
+
+        # The terminals written to during a terminal_transaction(), whose
+        # dirty status has not been propagated yet. (None when there is no
+        # transaction in progress).
+        self._pending_terminals = None
+
+        # A helper that pushes changed output values to subscribers. (See
+        # subscribe()).
+        self._subscriptions = SubscriptionManager(self)
+
+        # Whether the network has passed its integrity check since anything
+        # that could affect the outcome last changed. (See
+        # check_integrity_if_needed()).
+        self._integrity_verified = False
+
     # ------------------------------------------------------------------------
     # Network Creation API
     # ------------------------------------------------------------------------
 
     def register_node(self, name):
-        self.nodes.setdefault(name, Node(name))
+        if name not in self.nodes:
+            node = self.nodes[name] = Node(name)
+            if self._plan is not None:
+                self._plan.add_node(node)
+            self._integrity_verified = False
 
     def register_terminal(self, name):
         # Do nothing if it already exists?
@@ -42,10 +79,13 @@ class Network:
             return self.terminals[name]
         # Otherwise create and register it.
         self.terminals[name] = Terminal(name)
+        self._integrity_verified = False
 
     def register_input_port(self, node_name, port_name):
         node = self.nodes[node_name]
         node.register_input_port(port_name)
+        if self._plan is not None:
+            self._plan.update_feeds(node)
 
     def register_output_port(self, node_name, port_name):
         node = self.nodes[node_name]
@@ -56,8 +96,7 @@ class Network:
         terminal = self.terminals[terminal_name]
         node = self.nodes[downstream_node_name]
         port = node.input_ports[downstream_port_name]
-        self._assert_not_duplicate_edge(terminal, port)
-        self.edges.append(Edge(terminal, port))
+        self.add_edge(terminal, port)
 
     def create_output_to_input_edge(self,
                 upstream_node_name, upstream_port_name,
@@ -66,8 +105,29 @@ class Network:
         u_port = u_node.output_ports[upstream_port_name]
         d_node = self.nodes[downstream_node_name]
         d_port = d_node.input_ports[downstream_port_name]
-        self._assert_not_duplicate_edge(u_port, d_port)
-        self.edges.append(Edge(u_port, d_port))
+        self.add_edge(u_port, d_port)
+
+    def inline_subnetwork(self, node_name, subnet, input_mapping,
+                          output_mapping, prefix=None):
+        """
+        An alternative to giving a node a Network2Xfn transfer function, (see
+        dataflow.api.network_to_xfn), that takes the same mappings. Instead of
+        treating the subnetwork as one opaque transfer function, this copies
+        its nodes and edges into this network, named <prefix>.<inner node
+        name>, (the prefix defaults to the node's name). So a change to one of
+        the node's inputs only makes the inner nodes that depend on it dirty,
+        and caching and early cutoff work across the boundary.
+
+        The node itself stays, so you can still read its outputs, but it just
+        passes on the values of the inner outputs mapped to them. Inner
+        terminals that are not mapped are copied too, named
+        <prefix>.<terminal name>, and inner nodes that wrap subnetworks
+        themselves are inlined in turn. The subnetwork is left as it was.
+        """
+        replaced = SubnetworkInliner(self).inline(
+            node_name, subnet, input_mapping, output_mapping, prefix)
+        self._integrity_verified = False
+        self._dirty_propagator.propagate_from_nodes(replaced)
 
     def set_xfn(self, node_name, transfer_fn):
         """
@@ -83,16 +143,234 @@ class Network:
 
             foo = input_values_dict['in_1']
 
+        (It is a read-only Mapping that the node reuses for every call, and
+        which reads the values straight from whatever feeds its input ports).
+
         And it is obliged to set the values on output ports like this:
 
             output_setter_callback('sum', 56.3)
+
+        (A node with a ResultStore forgets the xfn_version given for its old
+        transfer function, see set_result_store(). Give it again if the new
+        one should have one).
         """
         # Delegate to the node.
         try:
             self.nodes[node_name].set_xfn(transfer_fn)
         except KeyError:
             raise NetworkError('Unknown node name: <{}>'.format(node_name))
+        if transfer_fn is None:
+            self._integrity_verified = False
+
+    def set_terminal_comparator(self, terminal_name, comparator):
+        """
+        Opts a terminal in to change detection. The comparator is a callable
+        like this, that says whether two values are equal:
+
+            comparator(old_value, new_value) -> bool
+
+        (operator.eq is often all you need, but you can provide something
+        cheaper, or something that works for your payload type, like
+        numpy.array_equal.) Writing a value to the terminal that the comparator
+        says is equal to the existing one is then a no-op.
+        """
+        try:
+            self.terminals[terminal_name].comparator = comparator
+        except KeyError:
+            raise NetworkError(
+                'Unknown terminal name: <{}>'.format(terminal_name))
+
+    def set_output_port_comparator(self, node_name, port_name, comparator):
+        """
+        Opts an output port in to change detection, using a comparator like the
+        one described in set_terminal_comparator(). When the node is
+        re-evaluated, and produces a value on this port equal to the previous
+        one, the change does not flow any further downstream. I.e. a dirty
+        downstream node is not re-evaluated if none of its inputs have changed.
+        """
+        self._resolve_output_port(node_name, port_name).comparator = comparator
+
+    def set_memo_cache(self, node_name, memo_cache):
+        """
+        Opts a node in to memoization, by giving it a MemoCache, (see
+        dataflow.api.memo_cache). The node then remembers the outputs its
+        transfer function produced for recently seen sets of input values, and
+        reuses them instead of calling the transfer function again when it sees
+        the same input values. (Give each node a MemoCache of its own). Pass
+        None to opt out again.
+        """
+        try:
+            self.nodes[node_name].memo_cache = memo_cache
+        except KeyError:
+            raise NetworkError('Unknown node name: <{}>'.format(node_name))
+
+    def set_result_store(self, node_name, result_store, xfn_version=None):
+        """
+        Opts a node in to persistent caching of its results, by giving it a
+        ResultStore, (see dataflow.api.result_store). The node then looks for
+        the outputs for its current input values in the store, before calling
+        its transfer function, and stores the outputs it computes. So that
+        after a restart, results computed in earlier runs are reused.
+
+        Results are filed under the node's name and the xfn_version you give,
+        (which applies only to the current transfer function; set_xfn() forgets
+        it). If you give none, one derived from the transfer function's code is
+        used, (see dataflow.implementation.stable_digest.xfn_fingerprint()).
+        Pass None as the store to opt out again.
+        """
+        try:
+            node = self.nodes[node_name]
+        except KeyError:
+            raise NetworkError('Unknown node name: <{}>'.format(node_name))
+        node.result_store = result_store
+        node.xfn_version = xfn_version
+
+    def set_executor(self, executor):
+        """
+        By default, node transfer functions are executed one at a time, in the
+        calling thread. Provide a concurrent.futures Executor here to have the
+        network instead execute the dirty nodes that do not depend on each
+        other concurrently. E.g.
+
+            net.set_executor(ThreadPoolExecutor(max_workers=8))
+
+        A ThreadPoolExecutor suits transfer functions that release the GIL,
+        (I/O, NumPy and similar). A ProcessPoolExecutor suits pure-Python CPU
+        bound ones, but then the transfer functions and the values they
+        consume and produce must be picklable, and any state they change on
+        themselves is changed only in the worker process.
+
+        The results are the same as for serial execution. Pass None to go back
+        to serial execution. The network does not shut the executor down.
+        """
+        self._evaluator.executor = executor
+
+
+    def enable_profiling(self, profiler=None):
+        """
+        Switches on the recording of per-node execution counts and times, and
+        related statistics, (see dataflow.api.network_profiler). Returns the
+        NetworkProfiler doing the recording, from which you can get reports.
+        (You may provide your own, e.g. to share one between networks).
+        """
+        if profiler is None:
+            profiler = NetworkProfiler()
+        self._evaluator.profiler = profiler
+        self._dirty_propagator.profiler = profiler
+        return profiler
+
+    def disable_profiling(self):
+        """
+        Switches the recording started by enable_profiling() off again.
+        """
+        self._evaluator.profiler = None
+        self._dirty_propagator.profiler = None
+
+    def enable_tracing(self, tracer=None):
+        """
+        Switches on the recording of why nodes recompute: which terminal writes
+        made each node dirty, along which paths, and which read then triggered
+        its re-evaluation, (see dataflow.api.dirty_tracer). Returns the
+        DirtyTracer doing the recording, which you can ask why() a node
+        recomputed, or have export its event log.
+        """
+        if tracer is None:
+            tracer = DirtyTracer()
+        self._evaluator.tracer = tracer
+        self._dirty_propagator.tracer = tracer
+        return tracer
+
+    def disable_tracing(self):
+        """
+        Switches the recording started by enable_tracing() off again.
+        """
+        self._evaluator.tracer = None
+        self._dirty_propagator.tracer = None
+
+    def set_retention_policy(self, retention_policy):
+        """
+        By default, every output port holds on to its latest value for ever.
+        Provide a RetentionPolicy here, (see dataflow.api.retention_policy),
+        to bound the memory taken by the values of intermediate nodes instead.
+        Values beyond the policy's budget are evicted, and recomputed (by
+        executing their nodes again) if and when they are needed. The outputs
+        you read, or subscribe to, are never evicted.
+
+        Only values computed after this call count towards the budget. Pass
+        None to switch eviction off again.
+        """
+        self._evaluator.retention = retention_policy
+
+
+    #------------------------------------------------------------------------
+    # Network Editing API
+    #------------------------------------------------------------------------
+
+    # These change the topology of a network that is already in use, without
+    # rebuilding it. Only the nodes whose inputs change, (and whatever is
+    # downstream of them), are made dirty; all the others keep their values.
+    # Input ports left unfed by a removal must be rewired (or removed) before
+    # the nodes they belong to are next evaluated.
+
+    def remove_node(self, node_name):
+        """
+        Removes the node, its ports, and all the edges into and out of it.
+        """
+        TopologyEditor(self).remove_node(node_name)
+
+    def remove_terminal(self, terminal_name):
+        """
+        Removes the terminal, and all the edges out of it.
+        """
+        TopologyEditor(self).remove_terminal(terminal_name)
+
+    def remove_input_port(self, node_name, port_name):
+        """
+        Removes the input port, and the edge into it.
+        """
+        TopologyEditor(self).remove_input_port(node_name, port_name)
+
+    def remove_output_port(self, node_name, port_name):
+        """
+        Removes the output port, all the edges out of it, and any
+        subscriptions to it.
+        """
+        TopologyEditor(self).remove_output_port(node_name, port_name)
+
+    def remove_terminal_edge(self, terminal_name, downstream_node_name,
+                             downstream_port_name):
+        editor = TopologyEditor(self)
+        editor.remove_edge(editor.terminal(terminal_name),
+                           downstream_node_name, downstream_port_name)
+
+    def remove_output_to_input_edge(self,
+                upstream_node_name, upstream_port_name,
+                downstream_node_name, downstream_port_name):
+        editor = TopologyEditor(self)
+        editor.remove_edge(
+            editor.output_port(upstream_node_name, upstream_port_name),
+            downstream_node_name, downstream_port_name)
 
+    def rewire_input_to_terminal(self, node_name, port_name, terminal_name):
+        """
+        Makes the given terminal the only thing feeding the given input port,
+        (in place of whatever fed it before).
+        """
+        editor = TopologyEditor(self)
+        editor.rewire_input(node_name, port_name,
+                            editor.terminal(terminal_name))
+
+    def rewire_input_to_output(self, node_name, port_name,
+                               upstream_node_name, upstream_port_name):
+        """
+        Makes the given upstream output port the only thing feeding the given
+        input port, (in place of whatever fed it before). Raises NetworkError
+        if that would make a cycle.
+        """
+        editor = TopologyEditor(self)
+        editor.rewire_input(
+            node_name, port_name,
+            editor.output_port(upstream_node_name, upstream_port_name))
 
     #------------------------------------------------------------------------
     # Network Operation API
@@ -103,30 +381,241 @@ class Network:
         This is where the client can write a value to one of the Network's
         input terminals. Which in turn, stimulates the propagation of a dirty
         status to all the dependent nodes downstream.
+
+        When there are subscriptions, (see subscribe()), the subscribed outputs
+        are then re-evaluated and notified straight away. So an exception
+        raised by a transfer function or a callback while that happens comes
+        out of here, (and likewise out of set_terminal_values(), and at the end
+        of a terminal_transaction()). The value has been written all the same,
+        and the other subscribers notified.
         """
         try:
             terminal = self.terminals[terminal_name]
-            terminal.value = value
-            self._dirty_propagator.propagate(terminal)
         except KeyError:
             raise NetworkError(
                 'Unknown terminal name: <{}>'.format(terminal_name))
+        self._write_terminal(terminal, value)
+
+    def set_terminal_values(self, values):
+        """
+        Writes several terminal values at once, from a dictionary keyed on
+        terminal name. The dirty status is propagated downstream only once, after
+        all the values have been written, so nodes that depend on more than one
+        of the terminals are visited only once.
+        """
+        # Resolve all the names first, so that nothing is written if any of
+        # them are wrong.
+        try:
+            terminals = [(self.terminals[name], value)
+                         for name, value in values.items()]
+        except KeyError as e:
+            raise NetworkError(
+                'Unknown terminal name: <{}>'.format(e.args[0]))
+        with self.terminal_transaction():
+            for terminal, value in terminals:
+                self._write_terminal(terminal, value)
+
+    @contextmanager
+    def terminal_transaction(self):
+        """
+        A context manager, inside which calls to set_terminal_value() write
+        their values straight away, but defer the propagation of dirty status
+        until the transaction ends. Then it is done once for all the terminals
+        written. Like this:
+
+            with net.terminal_transaction():
+                net.set_terminal_value('X', 42)
+                net.set_terminal_value('Y', 3.14)
+
+        Transactions may be nested, in which case only the outermost one
+        propagates. Reading an output inside a transaction is allowed; it
+        propagates whatever has been written so far first.
+        """
+        outermost = self._pending_terminals is None
+        if outermost:
+            self._pending_terminals = []
+        try:
+            yield self
+        finally:
+            if outermost:
+                terminals = self._pending_terminals
+                self._pending_terminals = None
+                self._dirty_propagator.propagate_from_terminals(terminals)
+        if outermost and self._subscriptions:
+            self._subscriptions.publish()
 
     def get_output_port_value(self, node_name, output_port_name):
         """
         This is where the client can read a value from a node's output terminal,
-        which in turn stimulates a recursive upstream re-evaluation of its
-        inputs if necessary.
+        which in turn stimulates an upstream re-evaluation of its inputs if
+        necessary.
         """
         # First fire the network integrity checker, and then all being well,
         # (it doesn't raise an exception), continue to answer the question.
-        NetworkIntegrity.check_now(self)
+        self.check_integrity_if_needed()
+        if self._pending_terminals:
+            self._propagate_pending_terminals()
 
-        # We do the real (recursive) work in a private implementaton function, so
-        # that we can avoid the cost of repeated integrity checks every time it
-        # recurses.
+        # We do the real work in a private implementaton function, so that
+        # sister methods can avoid the cost of repeated integrity checks.
         return self._get_output_port_value(node_name, output_port_name)
 
+    def get_output_port_values(self, node_and_port_names):
+        """
+        Reads several output port values at once. You provide a list of
+        (node_name, output_port_name) tuples, and get back a list of the
+        corresponding values.
+
+        This is cheaper than reading them one at a time, because the upstream
+        nodes they depend on in common are worked out together, and every
+        dirty node is executed exactly once, in dependency order.
+        """
+        output_ports = self._prepare_batch_read(node_and_port_names)
+        dirty_nodes = [port.node for port in output_ports if port.node.is_stale]
+        if dirty_nodes:
+            self._evaluator.evaluate(dirty_nodes)
+        return [port.get_value() for port in output_ports]
+
+    async def aget_output_port_value(self, node_name, output_port_name):
+        """
+        The asynchronous equivalent of get_output_port_value(), which you must
+        use if any of the transfer functions involved are coroutine functions,
+        (i.e. defined with *async def*), like this:
+
+            async def your_xfn(input_values_dict, output_setter_callback):
+                foo = await fetch_something(input_values_dict['in_1'])
+                output_setter_callback('sum', foo)
+
+        Nodes that do not depend on one another are awaited concurrently, and
+        plain transfer functions can be mixed in freely. Only one evaluation
+        should be in progress on a network at a time.
+        """
+        values = await self.aget_output_port_values(
+            [(node_name, output_port_name)])
+        return values[0]
+
+    async def aget_output_port_values(self, node_and_port_names):
+        """
+        The asynchronous equivalent of get_output_port_values().
+        """
+        output_ports = self._prepare_batch_read(node_and_port_names)
+        dirty_nodes = [port.node for port in output_ports if port.node.is_stale]
+        if dirty_nodes:
+            await self._evaluator.aevaluate(dirty_nodes)
+        return [port.get_value() for port in output_ports]
+
+
+    def subscribe(self, node_name, output_port_name, callback,
+                  min_interval=None):
+        """
+        Switches the network into *push* mode for the given output port. After
+        every terminal write, (or terminal_transaction(), or
+        set_terminal_values()), that makes it dirty, the network re-evaluates
+        it straight away, (along with whatever it depends upon, but nothing
+        else), and calls your callback if its value has changed, like this:
+
+            callback(node_name, output_port_name, new_value)
+
+        (Without a comparator on the port, every re-evaluation counts as a
+        change). Changes made in a transaction are notified once, at the end.
+        To throttle a subscriber, give a min_interval in seconds; it is then
+        not called more often than that, and gets only the latest value when
+        it is called. Changes held back like this are delivered by the next
+        write after the interval, or when you call flush_notifications().
+
+        Exceptions raised by your callback, or by the transfer functions
+        evaluated for it, come out of the terminal write that triggered them,
+        (after every other subscriber has been notified). A subscriber whose
+        output could not be evaluated is notified at a later write instead.
+
+        Returns a Subscription; call its cancel() method to unsubscribe.
+        """
+        output_port = self._resolve_output_port(node_name, output_port_name)
+        self._retain([output_port])
+        return self._subscriptions.add(output_port, callback, min_interval)
+
+    def flush_notifications(self):
+        """
+        Delivers any changes to subscribed outputs that are being held back by
+        a subscription's min_interval, (see subscribe()).
+        """
+        self._subscriptions.publish(force=True)
+
+    def sweep(self, terminal_columns, node_and_port_names):
+        """
+        Evaluates the network for many *scenarios* at once, and returns the
+        values the given outputs take in each. You provide a column of values
+        (a list, or a NumPy array) for each terminal to vary, keyed on terminal
+        name, with one value per scenario. You get back a list with a column
+        for each of the (node_name, output_port_name) tuples requested, in the
+        same order. E.g.
+
+            sums, msgs = net.sweep({'X': [1, 2, 3], 'Y': [4, 5, 6]},
+                                   [('adder', 'sum'), ('formatter', 'msg')])
+
+        The other terminals keep their current values throughout. Nodes that
+        do not depend on any of the varied terminals are evaluated only once,
+        in the normal way. The others are called once per scenario, or once
+        altogether for transfer functions marked as accepting whole columns,
+        (see dataflow.api.vectorized_xfn). The columns are NumPy arrays if
+        any of the terminal columns you gave were, and lists otherwise.
+
+        A sweep leaves the network's terminals and the values in its (varying)
+        nodes just as they were.
+        """
+        try:
+            terminal_columns = {self.terminals[name]: column
+                                for name, column in terminal_columns.items()}
+        except KeyError as e:
+            raise NetworkError(
+                'Unknown terminal name: <{}>'.format(e.args[0]))
+        if self._pending_terminals:
+            self._propagate_pending_terminals()
+        output_ports = [self._resolve_output_port(node_name, port_name)
+                        for node_name, port_name in node_and_port_names]
+        self._retain(output_ports)
+        return SweepEvaluator(self).sweep(terminal_columns, output_ports)
+
+    def snapshot(self, serializers=None):
+        """
+        Captures the network's runtime state, (every terminal and output port
+        value, and which nodes are dirty), as bytes, from which restore() can
+        later put it back, into this network or into another one built from
+        the same script. E.g. to warm start a replica or a restarted worker
+        with a clean network, instead of recomputing everything.
+
+        The values are pickled, unless you provide a custom serializer (any
+        object with dumps() and loads() methods, like the json module) for
+        them, in a dictionary keyed on terminal name, or on
+        (node_name, output_port_name) tuple. (Give restore() the same ones).
+
+        Taking a snapshot inside a terminal_transaction() propagates whatever
+        has been written so far first, like reading an output does.
+        """
+        return self._capture(serializers).to_bytes()
+
+    def restore(self, data, serializers=None):
+        """
+        Puts back the runtime state captured by snapshot(). The network must
+        have the same topology as the one the snapshot was taken of, (else
+        NetworkError is raised). Subscribers are then sent the restored values.
+        """
+        self._restore(NetworkSnapshot.from_bytes(data), serializers)
+
+    def save_snapshot(self, path, serializers=None):
+        """
+        The same as snapshot(), but writes the snapshot to the given file.
+        """
+        self._capture(serializers).write(path)
+
+    def load_snapshot(self, path, serializers=None, mmap_arrays=False):
+        """
+        The same as restore(), but reads the snapshot from the given file.
+        With mmap_arrays, large array values, (NumPy arrays and anything else
+        that supports out-of-band pickling), are not read in, but restored as
+        (copy on write) views onto the memory-mapped file.
+        """
+        self._restore(NetworkSnapshot.read(path, mmap_arrays), serializers)
 
     #------------------------------------------------------------------------
     # Network Queries
@@ -138,89 +627,224 @@ class Network:
         To which Node(s) is the given Terminal routed?
         (sorted alphabetically).
         """
-        edges = [e for e in self.edges if e.source == terminal]
-        input_ports = [e.dest for e in edges]
-        return sorted([port.node for port in input_ports],
-                       key=attrgetter('name'))
+        return list(self.edge_index.nodes_fed_by(terminal))
 
     def nodes_fed_by_output_port(self, output_port):
         """
         Which nodes are fed by the given output port?
         (Sorted alphabetidally).
         """
-        edges = [e for e in self.edges if e.source == output_port]
-        input_ports = [e.dest for e in edges]
-        return sorted([port.node for port in input_ports],
-                       key=attrgetter('name'))
+        return list(self.edge_index.nodes_fed_by(output_port))
+
+    def evaluation_plan(self):
+        """
+        The compiled EvaluationPlan for the network's current topology.
+        """
+        if self._plan is None:
+            self._plan = EvaluationPlan(self)
+        return self._plan
 
     def edge_for_input(self, input_port):
-        for edge in self.edges:
-            if edge.dest == input_port:
-                return edge
+        edge = self.edge_index.edge_for_input(input_port)
+        if edge is not None:
+            return edge
         raise RuntimeError('Cannot find edge for input port: {}.{}'.format(
             input_port.node.name, input_port.name))
+
+    #------------------------------------------------------------------------
+    # API for sister modules, (the Network's helpers), not for clients.
+    #------------------------------------------------------------------------
+
+    def compiled_plan(self):
+        """
+        The EvaluationPlan, if one has been compiled, or else None. (For the
+        helpers that keep the plan up to date as they change the topology, but
+        have no need to compile one).
+        """
+        return self._plan
+
+    def add_edge(self, source, dest):
+        """
+        Adds an edge from the given source (Terminal or OutputPort) to the
+        given InputPort, keeping the edge index and plan up to date.
+        """
+        self._assert_not_duplicate_edge(source, dest)
+        if self._plan is not None:
+            try:
+                self._plan.check_new_edge(source, dest)
+            except NetworkError:
+                # Creating an edge that makes a cycle is reported when the
+                # network is next evaluated, (by compiling a new plan), just
+                # as it is for a network built with one.
+                self._plan = None
+        edge = Edge(source, dest)
+        self.edges.append(edge)
+        self.edge_index.add(edge)
+        if self._plan is not None:
+            self._plan.update_edges([edge])
+
+    def remove_edges(self, edges):
+        """
+        Removes the given edges, keeping the edge index and plan up to date.
+        """
+        if not edges:
+            return
+        for edge in edges:
+            self.edge_index.remove(edge)
+        removed = set(edges)
+        self.edges = [edge for edge in self.edges if edge not in removed]
+        if self._plan is not None:
+            self._plan.update_edges(edges)
+
+    def evaluate(self, nodes):
+        """
+        Makes the given nodes clean, (see Evaluator).
+        """
+        self._evaluator.evaluate(nodes)
+
+    def invalidate_outputs(self, nodes):
+        """
+        Makes the given nodes dirty, along with everything downstream of them,
+        (for when something other than a terminal write makes their outputs
+        stale, like a change to the topology).
+        """
+        self._dirty_propagator.propagate_from_nodes(nodes)
+
+    def forget_node(self, node):
+        """
+        Drops whatever the network's helpers hold for the given node, (which
+        is being removed).
+        """
+        for port in node.output_ports.values():
+            self._subscriptions.remove_for_port(port)
+        if self._evaluator.retention is not None:
+            self._evaluator.retention.discard(node)
+
+    def forget_output_port(self, output_port):
+        """
+        Cancels the subscriptions to the given output port, (which is being
+        removed).
+        """
+        self._subscriptions.remove_for_port(output_port)
+
+    def check_integrity_if_needed(self, ignore_terminals=()):
+        """
+        Runs the NetworkIntegrity check, unless the network has already passed
+        it, and nothing that could change the outcome has happened since. That
+        is to say: no nodes or terminals have been added, and no transfer
+        function or terminal has been set to None. (The terminals in
+        ignore_terminals may be unset, see NetworkIntegrity.check_now(); a
+        check that ignores some does not count as passing).
+        """
+        if self._integrity_verified:
+            return
+        NetworkIntegrity.check_now(self, ignore_terminals)
+        if not ignore_terminals:
+            self._integrity_verified = True
+
     #------------------------------------------------------------------------
     # Private below.
     #------------------------------------------------------------------------
 
     def _assert_not_duplicate_edge(self, source, dest):
-        for edge in self.edges:
-            if (edge.source == source) and (edge.dest == dest):
-                raise RuntimeError(
-                    'Encountered duplicate edge from: {} to {}'.format(
-                        source.name, dest.name))
+        if self.edge_index.contains(source, dest):
+            raise RuntimeError(
+                'Encountered duplicate edge from: {} to {}'.format(
+                    source.name, dest.name))
+
+    def _write_terminal(self, terminal, value):
+        comparator = terminal.comparator
+        if comparator is not None and comparator(terminal.value, value):
+            return
+        terminal.value = value
+        terminal.version += 1
+        if value is None:
+            self._integrity_verified = False
+        if self._pending_terminals is None:
+            self._dirty_propagator.propagate(terminal)
+            if self._subscriptions:
+                self._subscriptions.publish()
+        else:
+            self._pending_terminals.append(terminal)
+
+    def _capture(self, serializers):
+        # The nodes dirtied by pending terminal writes must be captured as
+        # dirty.
+        if self._pending_terminals:
+            self._propagate_pending_terminals()
+        return NetworkSnapshot.capture(self, serializers)
+
+    def _restore(self, snapshot, serializers):
+        if self._pending_terminals is not None:
+            raise NetworkError(
+                'Cannot restore a snapshot during a terminal_transaction().')
+        snapshot.restore_into(self, serializers)
+        # A restored terminal may be unset.
+        self._integrity_verified = False
+        if self._subscriptions:
+            self._subscriptions.forget_notified_versions()
+            self._subscriptions.publish()
+
+    def _propagate_pending_terminals(self):
+        terminals = self._pending_terminals
+        self._pending_terminals = []
+        self._dirty_propagator.propagate_from_terminals(terminals)
 
     def _get_output_port_value(self, node_name, output_port_name):
         """
         This is the private implementation for get_output_port().
         It is isolated from the public method, so that the public method
         can make a network integrity check before it gets going with the
-        (recursive) real work.
+        real work.
+        """
+        output_port = self._resolve_output_port(node_name, output_port_name)
+        self._retain([output_port])
+        node = output_port.node
+        # If the node is clean - we can simpy return the output port's
+        # saved value. Otherwise the evaluator re-evaluates whatever dirty
+        # nodes upstream it depends on, and then the node itself. (Likewise if
+        # its values have been evicted).
+        if node.is_stale:
+            self._evaluator.evaluate([node])
+        return output_port.get_value()
+
+    def _prepare_batch_read(self, node_and_port_names):
+        """
+        Does the preliminaries for reading the outputs with the given
+        (node_name, output_port_name) tuples, and returns the OutputPort
+        objects.
+        """
+        self.check_integrity_if_needed()
+        if self._pending_terminals:
+            self._propagate_pending_terminals()
+        output_ports = [self._resolve_output_port(node_name, port_name)
+                        for node_name, port_name in node_and_port_names]
+        self._retain(output_ports)
+        return output_ports
+
+    def _retain(self, output_ports):
+        """
+        Exempts the nodes of the given output ports, (which the client reads),
+        from eviction by the RetentionPolicy, if there is one.
+        """
+        retention = self._evaluator.retention
+        if retention is not None:
+            for output_port in output_ports:
+                retention.pin(output_port.node)
+
+    def _resolve_output_port(self, node_name, output_port_name):
+        """
+        Get hold of the OutputPort object with the given names - (with error
+        handling).
         """
-        # Get hold of the node/port objects - (with error handling)
         try:
             node = self.nodes[node_name]
         except KeyError:
             raise NetworkError(
                 'Unknown node name: <{}>'.format(node_name))
         try:
-            output_port = node.output_ports[output_port_name]
+            return node.output_ports[output_port_name]
         except KeyError:
             raise NetworkError(
                 'Node: <{}> does not have an output port called: <{}>'.format(
                     node_name, output_port_name))
-
-        # If the node is clean - we can simpy return the output port's
-        # saved value.
-        if not node.is_dirty:
-            return output_port.get_value()
-        # Otherwise we must re-fetch the latest imports (recursively).
-        # todo can we make the back/fwd propagation read as more symmetrical?
-        self._refresh_inputs_recursively(node)
-        # Now we can re-evaluate our own outputs, by invoking the transfer
-        # function. This autonomously sets the node to being clean again.
-        node.execute_transfer_function()
-        return output_port.get_value()
-
-
-    def _refresh_inputs_recursively(self, node):
-        """
-        Knows how to traverse the input ports on the given node, and fetch the
-        values for them from whichever output ports (and/or terminals) that is
-        feeding them. It does this using a recursive call to
-        _get_output_port_value(), thus propagating the process back upstream as
-        far as is necessary.
-        """
-        # The traversal order for input ports is arbitrary, but we make it
-        # repeatable to assist in debugging and testing.
-        for input_port in node.sorted_input_ports():
-            incoming_edge = self.edge_for_input(input_port)
-            upstream_obj = incoming_edge.source
-            # Behaviour depends on if its a Terminal or OutputPort
-            if isinstance(upstream_obj, Terminal):
-                input_port.value = upstream_obj.value
-            else:
-                # The recursive call...
-                output_port = upstream_obj
-                input_port.value = self._get_output_port_value(
-                    output_port.node.name, output_port.name)
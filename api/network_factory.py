@@ -1,32 +1,164 @@
-import re
+import hashlib
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
 
 
-from dataflow.api.network import Network
+from dataflow.implementation.compiled_topology import CompiledTopology
+from dataflow.implementation.compiled_topology import TopologyBuilder
 
 class NetworkFactory:
     """
-    Builds a Network from a script string.
+    Builds a Network from a script string - or from a file, or any iterable of
+    lines, (see from_file() and from_lines()), which is read one line at a time,
+    so that even very large scripts never have to be held in memory whole.
+
+    Parsing a long script takes a while, so you can give the factory a
+    directory in which to cache the script compiled into a compact binary
+    form, (see compile()). Then only the first build() of a given script
+    parses it; later ones, (in this or any other process), load the compiled
+    form instead, which is much faster:
+
+        net = NetworkFactory(script, cache_dir='/var/cache/networks').build()
+
+    The cached files are named by a hash of the script, (and the Python
+    version), so a changed script is simply compiled again. So is one whose
+    cached file turns out to be corrupt.
+
+    Errors in the script raise ParseError, with a message that starts with
+    the number of the offending line.
     """
 
-    def __init__(self, script:str):
+    def __init__(self, script:str, cache_dir=None):
         self._script = script
+        self._cache_dir = cache_dir
+        # The alternative sources of the script's lines. (See from_file() and
+        # from_lines()).
+        self._path = None
+        self._lines = None
         # Keep track of most recently encountered left hand side segment
         # to be used by continuation lines.
         self._saved_lhs = None
 
+    @classmethod
+    def from_file(cls, path, cache_dir=None):
+        """
+        A factory for the script in the file at the given path. (It is read
+        one line at a time, unless there is a cache_dir, in which case it is
+        read whole, so that the text parsed is the text hashed).
+        """
+        factory = cls(None, cache_dir)
+        factory._path = path
+        return factory
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        A factory for the script made from the given iterable of lines. E.g. a
+        generator, which lets code generate a script as the factory reads it.
+        (The lines are consumed by the first build(), and are not cached).
+        """
+        factory = cls(None)
+        factory._lines = lines
+        return factory
+
     def build(self):
-        net = Network()
-        # Deal with one line of the script at a time - incrementally updating
-        # The Network as it goes.
-        for line in self._script.splitlines():
-            self._action_one_line(line, net)
-        return net
+        if self._cache_dir is None or self._lines is not None:
+            return self._parse().build_network()
+        # The file is read just once, so that what is parsed is exactly what
+        # was hashed, even if the file is being changed meanwhile.
+        script = self._script
+        if self._path is not None:
+            with open(self._path, encoding='utf-8') as f:
+                script = f.read()
+        path = self._cache_path(script)
+        try:
+            with open(path, 'rb') as f:
+                return CompiledTopology.from_bytes(f.read()).build_network()
+        except (OSError, ValueError):
+            pass
+        topology = self._parse(script)
+        self._write_cache_file(path, topology.to_bytes())
+        return topology.build_network()
+
+    def compile(self):
+        """
+        Parses the script, and returns the resulting topology serialized as
+        bytes, which from_compiled() turns back into a Network.
+        """
+        return self._parse().to_bytes()
+
+    @staticmethod
+    def from_compiled(data):
+        """
+        A new Network, built from bytes produced by compile(). (Without its
+        transfer functions, which you set as usual).
+        """
+        try:
+            return CompiledTopology.from_bytes(data).build_network()
+        except ValueError as e:
+            raise ParseError(str(e))
 
     #---------------------------------------------------------------------------
     # Private below.
     #---------------------------------------------------------------------------
 
-    def _action_one_line(self, line, net):
+    def _parse(self, script=None):
+        """
+        Reads the script in a single pass, and returns its CompiledTopology.
+        (From the given script text, if there is one, rather than from
+        wherever the factory's script comes from).
+        """
+        builder = TopologyBuilder()
+        self._saved_lhs = None
+        # Deal with one line of the script at a time - incrementally updating
+        # the builder as it goes.
+        with self._open_lines(script) as lines:
+            for line_number, line in enumerate(lines, 1):
+                try:
+                    self._action_one_line(line, builder)
+                except (ParseError, ValueError) as e:
+                    raise ParseError(
+                        'Line {}: {}'.format(line_number, e)) from None
+        return builder.topology()
+
+    @contextmanager
+    def _open_lines(self, script=None):
+        if script is not None:
+            yield script.splitlines()
+        elif self._path is not None:
+            with open(self._path, encoding='utf-8') as f:
+                yield f
+        elif self._lines is not None:
+            yield self._lines
+        else:
+            yield self._script.splitlines()
+
+    def _cache_path(self, script):
+        digest = hashlib.sha256()
+        # (The compiled form differs between Python versions).
+        digest.update(b'py%d.%d:' % sys.version_info[:2])
+        digest.update(script.encode('utf-8'))
+        return os.path.join(self._cache_dir,
+                            digest.hexdigest() + self._CACHE_SUFFIX)
+
+    def _write_cache_file(self, path, data):
+        """
+        Writes the file atomically, so that other processes sharing the cache
+        never see it half written. Failure to write it is not an error.
+        """
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self._cache_dir,
+                                             suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            pass
+
+    def _action_one_line(self, line, builder):
         """
         Interprets and actions one line of the script.
         """
@@ -39,21 +171,20 @@ class NetworkFactory:
         # adder:sum       > formatter:in_1      # canonical (out->in)
         # formatter:msg   > DANGLING            # Dangling
 
-        line = self._remove_comment(line)
-        line = line.strip()
-        if len(line) == 0:
+        line = self._remove_comment(line).strip()
+        if not line:
             return
         left, right = self._split_into_two(line, '>', line)
         if left == "":
-            self._action_continuation_line(right, line, net)
+            self._action_continuation_line(right, line, builder)
             return
         self._saved_lhs = left
         if right == 'DANGLING':
-            self._action_dangling_line(left, line, net)
+            self._action_dangling_line(left, line, builder)
         else:
-            self._action_canonical_line(left, right, line, net)
+            self._action_canonical_line(left, right, line, builder)
 
-    def _action_canonical_line(self, left, right, line, net):
+    def _action_canonical_line(self, left, right, line, builder):
         """
         Handles these two variants:
             TERM:X          > adder:in_1
@@ -64,47 +195,40 @@ class NetworkFactory:
         downstream_node_name, downstream_port_name = \
             self._split_into_two(right, ':', line)
 
-        net.register_node(downstream_node_name)
-        net.register_input_port(downstream_node_name, downstream_port_name)
-
         if upstream_node_name == self._RW_TERM:
-            net.register_terminal(upstream_port_name)
-            net.create_terminal_edge(
+            builder.add_terminal_edge(
                 upstream_port_name, downstream_node_name, downstream_port_name)
         else:
-            net.register_node(upstream_node_name)
-            net.register_output_port(upstream_node_name, upstream_port_name)
-            net.create_output_to_input_edge(
+            builder.add_output_to_input_edge(
                 upstream_node_name, upstream_port_name, downstream_node_name,
                 downstream_port_name)
 
-    def _action_dangling_line(self, left, line, net):
+    def _action_dangling_line(self, left, line, builder):
         """
         Handles: 
             formatter:msg   > DANGLING
         """
         node_name, port_name = self._split_into_two(left, ':', line)
-        net.register_node(node_name)
-        net.register_output_port(node_name, port_name)
+        builder.register_output_port(node_name, port_name)
 
-    def _action_continuation_line(self, right, line, net):
+    def _action_continuation_line(self, right, line, builder):
         if self._saved_lhs is None:
             raise ParseError('A line with a left-hand-side must '
                     'exist before this dangline line is used |{}|.'.format(line))
         implied_left = self._saved_lhs
-        self._action_canonical_line(implied_left, right, line, net)
+        self._action_canonical_line(implied_left, right, line, builder)
 
     def _split_into_two(self, buf, delim, line):
         """
         Split the string buf into two pieces using the given delimiter.
         Returns the two (stripped) pieces as a tuple, or raises ParseError.
         """
-        left_and_right = [s.strip() for s in buf.split(delim)]
-        if len(left_and_right) != 2:
+        left, found, right = buf.partition(delim)
+        if not found or delim in right:
             raise ParseError(
                 'Cannot split this part |{}| of this line |{}| ' 
                 'into two using |{}|'.format(buf, line, delim))
-        return left_and_right
+        return left.strip(), right.strip()
 
 
     def _remove_comment(self, line):
@@ -112,9 +236,10 @@ class NetworkFactory:
         Return a copy of <line>, having removed from it anything beyond
         a # character. (Including the # itself).
         """
-        return re.sub(r'#.*', "", line)
+        return line.partition('#')[0]
 
     _RW_TERM = 'TERM'
+    _CACHE_SUFFIX = '.dfnet'
 
 class ParseError(Exception):
     pass
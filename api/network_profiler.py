@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class NetworkProfiler:
+    """
+    Records where a Network's time goes, once switched on like this:
+
+        profiler = net.enable_profiling()
+        ... use the network ...
+        print(profiler.report())
+        profiler.to_csv('profile.csv')
+
+    For every node it counts:
+
+        executions      How many times its transfer function was called.
+        wall_seconds    The cumulative wall-clock time of those calls ...
+        cpu_seconds     ... and the CPU time of the thread that made them.
+        last_wall_seconds, last_cpu_seconds
+                        The times for the most recent call.
+        cache_hits      How many times its outputs were served from a MemoCache
+                        or ResultStore instead.
+        cutoffs         How many times it was made clean without executing,
+                        because none of its inputs had changed.
+        times_dirtied   How many times a terminal write made it dirty.
+
+    And for the network as a whole, the time spent evaluating reads, how much
+    of that was spent in the transfer functions, (the rest being the
+    framework's own overhead), and the time spent propagating dirty status.
+
+    (With an executor or asynchronous evaluation, the transfer functions of
+    a level run concurrently, so their times can add up to more than the time
+    the evaluation took. CPU times are not recorded for coroutine transfer
+    functions.)
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = {}  # Dictionaries of the counters above, keyed on name.
+        self.evaluations = 0
+        self.evaluation_seconds = 0.0
+        self.xfn_seconds = 0.0
+        self.propagations = 0
+        self.propagation_seconds = 0.0
+
+    #------------------------------------------------------------------------
+    # Recording API (for the Network's helpers).
+    #------------------------------------------------------------------------
+
+    def record_execution(self, node_name, wall_seconds, cpu_seconds):
+        stats = self._stats_for(node_name)
+        stats['executions'] += 1
+        stats['wall_seconds'] += wall_seconds
+        stats['last_wall_seconds'] = wall_seconds
+        if cpu_seconds is not None:
+            stats['cpu_seconds'] += cpu_seconds
+            stats['last_cpu_seconds'] = cpu_seconds
+        self.xfn_seconds += wall_seconds
+
+    def record_cache_hit(self, node_name):
+        self._stats_for(node_name)['cache_hits'] += 1
+
+    def record_cutoff(self, node_name):
+        self._stats_for(node_name)['cutoffs'] += 1
+
+    def record_dirtied(self, node_name):
+        self._stats_for(node_name)['times_dirtied'] += 1
+
+    @contextmanager
+    def timing_evaluation(self):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.evaluations += 1
+            self.evaluation_seconds += perf_counter() - started
+
+    @contextmanager
+    def timing_propagation(self):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.propagations += 1
+            self.propagation_seconds += perf_counter() - started
+
+    #------------------------------------------------------------------------
+    # Reporting API.
+    #------------------------------------------------------------------------
+
+    def report(self):
+        """
+        Everything recorded, as a dictionary (with a 'network' and a 'nodes'
+        part).
+        """
+        return {
+            'network': {
+                'evaluations': self.evaluations,
+                'evaluation_seconds': self.evaluation_seconds,
+                'xfn_seconds': self.xfn_seconds,
+                'overhead_seconds': self.evaluation_seconds - self.xfn_seconds,
+                'propagations': self.propagations,
+                'propagation_seconds': self.propagation_seconds,
+            },
+            'nodes': {name: dict(stats)
+                      for name, stats in sorted(self.nodes.items())},
+        }
+
+    def to_json(self, path=None):
+        """
+        The report as a JSON string, which is also written to the file at the
+        given path, if you give one.
+        """
+        text = json.dumps(self.report(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def to_csv(self, path=None):
+        """
+        The per-node part of the report as CSV text, (one row per node), which
+        is also written to the file at the given path, if you give one.
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(('node',) + self._COUNTERS)
+        for name, stats in sorted(self.nodes.items()):
+            writer.writerow((name,) + tuple(stats[c] for c in self._COUNTERS))
+        text = buf.getvalue()
+        if path is not None:
+            with open(path, 'w', newline='') as f:
+                f.write(text)
+        return text
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    _COUNTERS = ('executions', 'wall_seconds', 'cpu_seconds',
+                 'last_wall_seconds', 'last_cpu_seconds', 'cache_hits',
+                 'cutoffs', 'times_dirtied')
+
+    def _stats_for(self, node_name):
+        stats = self.nodes.get(node_name)
+        if stats is None:
+            stats = dict.fromkeys(self._COUNTERS, 0)
+            for counter in ('wall_seconds', 'cpu_seconds', 'last_wall_seconds',
+                            'last_cpu_seconds'):
+                stats[counter] = 0.0
+            self.nodes[node_name] = stats
+        return stats
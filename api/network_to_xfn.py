@@ -41,19 +41,25 @@ class Network2Xfn:
         self.input_mapping = input_mapping
         self.output_mapping = output_mapping
 
+    def inline_into(self, super_net, node_name, prefix=None):
+        """
+        Rather than using *xfn* as the transfer function for the node called
+        node_name in super_net, copy the existing network into super_net in
+        its place, (see Network.inline_subnetwork()).
+        """
+        super_net.inline_subnetwork(node_name, self.net, self.input_mapping,
+                                    self.output_mapping, prefix)
+
     def xfn(self, input_values_dict, output_setter_fn):
 
-        # iterate over input port names and values
-        for pname, pvalue in input_values_dict.items():
-            # convert a portname to a terminal name
-            terminal_name = self.input_mapping[pname]
-            # assign port value to appropriate terminal
-            self.net.set_terminal_value(terminal_name, pvalue)
-
-        # Unpack the output mapping and get the existing node name,
-        # port name and super port name
-        for (nname, pname), spname in self.output_mapping.items():
-            # get the output value on the output of the existing node
-            out = self.net.get_output_port_value(nname, pname)
-            # and set it on the output of the super node
+        # Convert the input port names to terminal names, and assign the
+        # port values to the appropriate terminals (all in one go).
+        self.net.set_terminal_values(
+            {self.input_mapping[pname]: pvalue
+             for pname, pvalue in input_values_dict.items()})
+
+        # Read all the mapped outputs of the existing network in one go, and
+        # set them on the corresponding outputs of the super node.
+        values = self.net.get_output_port_values(list(self.output_mapping))
+        for spname, out in zip(self.output_mapping.values(), values):
             output_setter_fn(spname, out)
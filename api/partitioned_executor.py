@@ -0,0 +1,143 @@
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+
+
+from dataflow.implementation.detached_xfn import run_detached_xfn
+from dataflow.implementation.network_partitioner import NetworkPartitioner
+from dataflow.implementation.shared_memory_transport import discard_values
+from dataflow.implementation.shared_memory_transport import share_values
+from dataflow.implementation.shared_memory_transport import unshare_values
+
+
+class PartitionedExecutor(Executor):
+    """
+    An executor for Network.set_executor(), that divides the network's nodes
+    between a number of partitions, and executes the transfer functions of
+    each partition in a worker process of its own. Usage:
+
+        executor = PartitionedExecutor(net, n_partitions=4)
+        net.set_executor(executor)
+        ... use the network as usual ...
+        executor.shutdown()
+
+    The network itself stays in your process, so terminal writes, dirty
+    propagation and reads work exactly as they always do. Only the execution
+    of the transfer functions moves:
+
+        o  The nodes that do not depend on each other run concurrently, in
+           as many processes as they have partitions between them. (The nodes
+           of one partition run one at a time).
+        o  Each transfer function is sent to its partition's process once, and
+           then stays there, (so any state it keeps lives in that process).
+           Setting a different transfer function sends the new one.
+        o  Input and output values of at least share_threshold bytes, that are
+           bytes, bytearrays or NumPy arrays, travel through shared memory,
+           (see multiprocessing.shared_memory). Anything else is pickled, so
+           must be picklable, as must the transfer functions.
+
+    See NetworkPartitioner for the partitioning strategies. Pass a
+    NetworkProfiler that has watched the network run to partition it by the
+    measured cost of its nodes; otherwise every node counts the same. Nodes
+    added to the network afterwards go to partition 0.
+    """
+
+    def __init__(self, network, n_partitions, strategy='connected',
+                 profiler=None, share_threshold=64 * 1024, mp_context=None):
+        node_costs = None
+        if profiler is not None:
+            node_costs = {name: stats['wall_seconds'] / stats['executions']
+                          for name, stats in profiler.nodes.items()
+                          if stats['executions']}
+        self._partition_of = NetworkPartitioner.partition(
+            network, n_partitions, strategy, node_costs)
+        self.share_threshold = share_threshold
+        # Started here, so that the worker processes share it, and a block of
+        # shared memory created in one process and unlinked in another is not
+        # reported as leaked.
+        resource_tracker.ensure_running()
+        self._workers = [ProcessPoolExecutor(max_workers=1,
+                                             mp_context=mp_context)
+                         for _ in range(n_partitions)]
+        # The transfer function each worker holds, keyed on node name.
+        self._shipped = [{} for _ in range(n_partitions)]
+
+    def partitions(self):
+        """
+        The names of the nodes in each partition, (a list of sorted lists).
+        """
+        partitions = [[] for _ in self._workers]
+        for name, partition in self._partition_of.items():
+            partitions[partition].append(name)
+        return [sorted(names) for names in partitions]
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        The network submits run_detached_xfn(node_name, xfn, input_values_dict,
+        output_port_names) calls, which are sent to the node's partition.
+        Anything else is just run in the first partition's process.
+        """
+        if fn is not run_detached_xfn or kwargs:
+            return self._workers[0].submit(fn, *args, **kwargs)
+        node_name, xfn, input_values_dict, output_port_names = args
+        partition = self._partition_of.get(node_name, 0)
+        shipped = self._shipped[partition]
+        shared_inputs = share_values(input_values_dict, self.share_threshold)
+        inner = self._workers[partition].submit(
+            execute_in_partition, node_name,
+            None if shipped.get(node_name) is xfn else xfn, shared_inputs,
+            output_port_names, self.share_threshold)
+        outer = Future()
+
+        def on_done(inner):
+            try:
+                shared_outputs, wall_seconds, cpu_seconds = inner.result()
+            except BaseException as e:
+                # The inputs may never have been received.
+                discard_values(shared_inputs)
+                shipped.pop(node_name, None)
+                outer.set_exception(e)
+                return
+            shipped[node_name] = xfn
+            try:
+                output_values = unshare_values(shared_outputs)
+            except BaseException as e:
+                # (E.g. a segment has gone). Free whatever is left, and fail
+                # the future, rather than leave the evaluator waiting on it.
+                discard_values(shared_outputs)
+                outer.set_exception(e)
+                return
+            outer.set_result((output_values, wall_seconds, cpu_seconds))
+
+        inner.add_done_callback(on_done)
+        return outer
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        for worker in self._workers:
+            worker.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+#------------------------------------------------------------------------
+# Run in the worker processes.
+#------------------------------------------------------------------------
+
+# The transfer functions sent to this (worker) process, keyed on node name.
+_xfns_by_node = {}
+
+
+def execute_in_partition(node_name, xfn, shared_inputs, output_port_names,
+                         share_threshold):
+    """
+    Executes a node's transfer function in a partition's worker process, (in
+    the way that run_detached_xfn() does). The xfn is None when the process
+    already holds it.
+    """
+    if xfn is None:
+        xfn = _xfns_by_node[node_name]
+    else:
+        _xfns_by_node[node_name] = xfn
+    output_values, wall_seconds, cpu_seconds = run_detached_xfn(
+        node_name, xfn, unshare_values(shared_inputs), output_port_names)
+    return (share_values(output_values, share_threshold), wall_seconds,
+            cpu_seconds)
@@ -0,0 +1,173 @@
+import os
+import pickle
+import tempfile
+
+
+from dataflow.implementation.stable_digest import stable_digest
+
+
+class ResultStore:
+    """
+    A persistent store of node results in a local directory, which survives
+    process restarts. So that after a restart, nodes whose input values have
+    been seen before can pick up their outputs from disk, instead of calling
+    their (expensive) transfer functions again.
+
+    Usage:
+
+        store = ResultStore('/var/cache/my_network', max_bytes=2 * 1024**3)
+        net.set_result_store('expensive_node', store, xfn_version='3')
+
+    Results are *content addressed*. Each one lives in its own pickle file,
+    named by a hash of the node's name, the version of its transfer function,
+    and its input values, (see stable_digest(), which makes the same hash in
+    every process). So the input and output values must be picklable, (results
+    for input values that are not, are simply not stored). Bump the
+    xfn_version whenever you change what a transfer function computes, so that
+    results computed by the old one are not used.
+
+    Without an xfn_version, one is derived from the transfer function's code
+    and the values it closes over, (see xfn_fingerprint()). That cannot see
+    the globals it uses, or the state of an object it is a method of; give an
+    xfn_version when what it computes depends on those.
+
+    When *max_bytes* is given, the files least recently used are deleted
+    whenever the store grows beyond it. Several networks (and processes) may
+    share one store; files are written atomically.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._scan())
+
+    def lookup(self, node_name, xfn_version, input_values_dict):
+        """
+        The stored output values for the given node, xfn version and input
+        values, or None.
+        """
+        path = self._path(node_name, xfn_version, input_values_dict)
+        if path is None:
+            self.misses += 1
+            return None
+        try:
+            with open(path, 'rb') as f:
+                output_values = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError):
+            # (The latter two when the pickle refers to code that has since
+            # changed).
+            self.misses += 1
+            return None
+        # Note the use, for least recently used eviction. (Another process
+        # sharing the store may have evicted the file since it was read).
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return output_values
+
+    def store(self, node_name, xfn_version, input_values_dict, output_values):
+        """
+        Store the output values produced by the given node and xfn version from
+        the given input values.
+        """
+        path = self._path(node_name, xfn_version, input_values_dict)
+        if path is None:
+            return
+        try:
+            payload = pickle.dumps(output_values, protocol=_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        existing_size = self._size_of(path)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.total_bytes += len(payload) - existing_size
+        self._evict_as_needed()
+
+    def clear(self):
+        for path, _, _ in self._scan():
+            os.remove(path)
+        self.total_bytes = 0
+
+    def stats(self):
+        """
+        A dictionary of the store's counters.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'total_bytes': self.total_bytes,
+        }
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _path(self, node_name, xfn_version, input_values_dict):
+        """
+        The path to the file for the given key, or None if the input values
+        cannot be pickled.
+        """
+        try:
+            digest = stable_digest(
+                (node_name, xfn_version, dict(input_values_dict)))
+        except TypeError:
+            return None
+        return os.path.join(self.directory, digest + _SUFFIX)
+
+    def _scan(self):
+        """
+        Yields (path, last_used_time, size) for every result file, (skipping
+        those that another process removes while it is looking).
+        """
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, stat.st_mtime, stat.st_size
+
+    def _size_of(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _evict_as_needed(self):
+        if self.max_bytes is None or self.total_bytes <= self.max_bytes:
+            return
+        # Other processes sharing the directory may have changed it, so base
+        # the decisions on what is really there.
+        files = sorted(self._scan(), key=lambda f: f[1])
+        self.total_bytes = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.evictions += 1
+
+
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+_SUFFIX = '.result'
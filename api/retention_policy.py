@@ -0,0 +1,145 @@
+import sys
+from collections import OrderedDict
+
+
+class RetentionPolicy:
+    """
+    Limits how much memory a Network's intermediate output values may occupy,
+    by *evicting* (i.e. forgetting) some of them. An evicted node's outputs are
+    transparently recomputed if and when they are needed again. Usage:
+
+        policy = RetentionPolicy(max_bytes=2 * 1024**3)
+        net.set_retention_policy(policy)
+
+    Some nodes' outputs are never evicted:
+
+        o  Those read from outside the network, (with get_output_port_value()
+           and friends, or via a subscription).
+        o  Those with pin_fan_out or more distinct downstream nodes, (when
+           pin_fan_out is given), which would be expensive to lose.
+
+    The size of each node's outputs is estimated by calling size_fn on every
+    output value. The default, sys.getsizeof, is shallow: it is good for
+    strings, bytes and NumPy arrays that own their data, but it counts only
+    the container itself of a list, dictionary or other object, not what it
+    holds, (and only the header of a NumPy view). So give a size_fn that knows
+    your payload types, unless they are of the former kinds. Whenever the
+    total for the evictable nodes exceeds *max_bytes*, nodes are evicted
+    according to the *eviction* policy:
+
+        'lru'       The least recently used, (i.e. computed or consumed).
+        'cheapest'  The cheapest to recompute per byte freed, (using the time
+                    the node took to compute them last).
+
+    The transfer functions must be *pure* for this to make sense.
+    """
+
+    def __init__(self, max_bytes, size_fn=sys.getsizeof, eviction='lru',
+                 pin_fan_out=None):
+        if eviction not in self._EVICTION_POLICIES:
+            raise ValueError('Unknown eviction policy: <{}>'.format(eviction))
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn
+        self.eviction = eviction
+        self.pin_fan_out = pin_fan_out
+
+        self.evictions = 0
+        self.recomputations = 0
+        self.total_bytes = 0
+
+        # (size, compute_seconds) tuples keyed on the evictable Nodes holding
+        # values, in least to most recently used order.
+        self._resident = OrderedDict()
+        self._pinned = set()
+
+    def stats(self):
+        """
+        A dictionary of the policy's counters.
+        """
+        return {
+            'resident_nodes': len(self._resident),
+            'pinned_nodes': len(self._pinned),
+            'evictions': self.evictions,
+            'recomputations': self.recomputations,
+            'total_bytes': self.total_bytes,
+        }
+
+    #------------------------------------------------------------------------
+    # API for the Network's helpers.
+    #------------------------------------------------------------------------
+
+    def pin(self, node):
+        """
+        Exempt the given node from eviction, (e.g. because it is being read).
+        """
+        if node not in self._pinned:
+            self._pinned.add(node)
+            self._forget(node)
+
+    def discard(self, node):
+        """
+        Forget all about the given node, (which is being removed from the
+        network).
+        """
+        self._pinned.discard(node)
+        self._forget(node)
+
+    def record_execution(self, node, compute_seconds, fan_out, recomputed):
+        """
+        Note that the given node has just produced its output values, and
+        (unless it is pinned) is holding them.
+        """
+        if recomputed:
+            self.recomputations += 1
+        if node in self._pinned:
+            return
+        if self.pin_fan_out is not None and fan_out >= self.pin_fan_out:
+            self.pin(node)
+            return
+        self._forget(node)
+        size = sum(self.size_fn(port.get_value())
+                   for port in node.output_ports.values())
+        self._resident[node] = (size, compute_seconds)
+        self.total_bytes += size
+
+    def record_use(self, node):
+        """
+        Note that the given node's output values have just been consumed.
+        """
+        if node in self._resident:
+            self._resident.move_to_end(node)
+
+    def enforce(self, in_use=()):
+        """
+        Evict as many nodes as it takes to bring the total size within budget,
+        (sparing those in in_use, whose values are about to be read).
+        """
+        while self.total_bytes > self.max_bytes:
+            candidates = (node for node in self._resident
+                          if node not in in_use)
+            if self.eviction == 'lru':
+                victim = next(candidates, None)
+            else:
+                # Iteration is oldest first, so min() breaks ties in favour
+                # of evicting the least recently used.
+                victim = min(candidates, key=self._cost_per_byte, default=None)
+            if victim is None:
+                return
+            self._forget(victim)
+            victim.evict_output_values()
+            self.evictions += 1
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    _EVICTION_POLICIES = ('lru', 'cheapest')
+
+    def _cost_per_byte(self, node):
+        size, compute_seconds = self._resident[node]
+        return compute_seconds / max(size, 1)
+
+    def _forget(self, node):
+        entry = self._resident.pop(node, None)
+        if entry is not None:
+            self.total_bytes -= entry[0]
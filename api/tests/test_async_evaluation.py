@@ -0,0 +1,72 @@
+
+import asyncio
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import REF_SCRIPT
+from dataflow.implementation.reference_network import format_xfn
+
+
+class TestAsyncEvaluation(unittest.TestCase):
+
+    def setUp(self):
+        self.net = NetworkFactory(REF_SCRIPT).build()
+        self.net.set_terminal_values({'X': 42, 'Y': 3.14})
+
+    def test_mixture_of_async_and_plain_xfns(self):
+        self.net.set_xfn('adder', async_adder_xfn)
+        self.net.set_xfn('multiplier', async_mult_xfn)
+        self.net.set_xfn('formatter', format_xfn)
+        msg = asyncio.run(
+            self.net.aget_output_port_value('formatter', 'msg'))
+        self.assertEqual('sum: 45.14, mult: 131.88', msg,
+                         'Wrong output from Network')
+
+    def test_independent_nodes_are_awaited_concurrently(self):
+        # The adder and multiplier each wait for the other to have started,
+        # which they can only do if they are awaited concurrently.
+        started = {}
+
+        def make_xfn(name, port_name, operation):
+            async def xfn(input_values_dict, output_setter_fn):
+                started[name].set()
+                other = 'multiplier' if name == 'adder' else 'adder'
+                await asyncio.wait_for(started[other].wait(), timeout=5)
+                output_setter_fn(port_name, operation(
+                    input_values_dict['in_1'], input_values_dict['in_2']))
+            return xfn
+
+        self.net.set_xfn('adder', make_xfn('adder', 'sum', lambda a, b: a + b))
+        self.net.set_xfn('multiplier',
+                         make_xfn('multiplier', 'prod', lambda a, b: a * b))
+        self.net.set_xfn('formatter', format_xfn)
+
+        async def read():
+            started['adder'] = asyncio.Event()
+            started['multiplier'] = asyncio.Event()
+            return await self.net.aget_output_port_value('formatter', 'msg')
+
+        self.assertEqual('sum: 45.14, mult: 131.88', asyncio.run(read()),
+                         'Wrong output from Network')
+
+    def test_synchronous_read_of_async_xfn_is_reported(self):
+        self.net.set_xfn('adder', async_adder_xfn)
+        self.net.set_xfn('multiplier', async_mult_xfn)
+        self.net.set_xfn('formatter', format_xfn)
+        with self.assertRaises(NetworkError) as cm:
+            self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual(
+            'The transfer function for the node called <adder> is '
+            'asynchronous, so its outputs must be read with '
+            'aget_output_port_value().', str(cm.exception), 'Wrong message.')
+
+
+async def async_adder_xfn(input_values_dict, output_setter_fn):
+    await asyncio.sleep(0)
+    output_setter_fn('sum', input_values_dict['in_1'] + input_values_dict['in_2'])
+
+
+async def async_mult_xfn(input_values_dict, output_setter_fn):
+    await asyncio.sleep(0)
+    output_setter_fn('prod', input_values_dict['in_1'] * input_values_dict['in_2'])
@@ -0,0 +1,55 @@
+
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestBatchOutputReads(unittest.TestCase):
+
+    def test_get_output_port_values(self):
+        net = build_reference_network()
+        net.set_terminal_values({'X': 42, 'Y': 3.14})
+        values = net.get_output_port_values(
+            [('formatter', 'msg'), ('adder', 'sum'), ('multiplier', 'prod')])
+        self.assertEqual('sum: 45.14, mult: 131.88', values[0],
+                         'Wrong output from Network')
+        self.assertAlmostEqual(45.14, values[1])
+        self.assertAlmostEqual(131.88, values[2])
+
+    def test_each_dirty_node_executes_once(self):
+        # Two outputs that share the same upstream node.
+        net = NetworkFactory("""
+            TERM:T   > shared:in
+            shared:out > left:in
+                       > right:in
+            left:out   > DANGLING
+            right:out  > DANGLING
+        """).build()
+        counter = CountingXfn()
+        for name in net.nodes:
+            net.set_xfn(name, counter.xfn)
+        net.set_terminal_value('T', 1)
+        values = net.get_output_port_values([('left', 'out'), ('right', 'out')])
+        self.assertEqual([3, 3], values, 'Wrong output from Network')
+        self.assertEqual(3, counter.fired_count, 'Wrong number of calls.')
+
+    def test_unknown_port_is_reported(self):
+        net = build_reference_network()
+        net.set_terminal_values({'X': 42, 'Y': 3.14})
+        with self.assertRaises(NetworkError) as cm:
+            net.get_output_port_values([('adder', 'sum'), ('adder', 'fibble')])
+        self.assertEqual(
+            'Node: <adder> does not have an output port called: <fibble>',
+            str(cm.exception), 'Wrong message.')
+
+
+class CountingXfn:
+
+    def __init__(self):
+        self.fired_count = 0
+
+    def xfn(self, input_values_dict, output_setter_fn):
+        self.fired_count += 1
+        output_setter_fn('out', input_values_dict['in'] + 1)
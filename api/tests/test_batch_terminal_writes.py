@@ -0,0 +1,50 @@
+
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestBatchTerminalWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.net = build_reference_network()
+        self.net.set_terminal_values({'X': 42, 'Y': 3.14})
+
+    def test_set_terminal_values(self):
+        msg = self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual('sum: 45.14, mult: 131.88', msg,
+                         'Wrong output from Network')
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        msg = self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual('sum: 3, mult: 2', msg, 'Wrong output from Network')
+
+    def test_set_terminal_values_with_unknown_name_writes_nothing(self):
+        with self.assertRaises(NetworkError) as cm:
+            self.net.set_terminal_values({'X': 1, 'fibble': 2})
+        self.assertEqual('Unknown terminal name: <fibble>',
+                         str(cm.exception), 'Wrong message.')
+        self.assertEqual(42, self.net.terminals['X'].value,
+                         'Terminal was written.')
+
+    def test_transaction_defers_propagation_until_it_ends(self):
+        self.net.get_output_port_value('formatter', 'msg')
+        with self.net.terminal_transaction():
+            self.net.set_terminal_value('X', 1)
+            self.net.set_terminal_value('Y', 2)
+            self.assertFalse(self.net.nodes['adder'].is_dirty,
+                             'Propagated too early.')
+        self.assertTrue(all(n.is_dirty for n in self.net.nodes.values()),
+                        'Did not propagate when the transaction ended.')
+        msg = self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual('sum: 3, mult: 2', msg, 'Wrong output from Network')
+
+    def test_read_inside_transaction_sees_values_written_so_far(self):
+        self.net.get_output_port_value('formatter', 'msg')
+        with self.net.terminal_transaction():
+            self.net.set_terminal_value('X', 1)
+            self.assertAlmostEqual(4.14, self.net.get_output_port_value(
+                'adder', 'sum'), msg='Read a stale value.')
+            self.net.set_terminal_value('Y', 2)
+        self.assertEqual(3, self.net.get_output_port_value('adder', 'sum'),
+                         'Read a stale value.')
@@ -0,0 +1,115 @@
+import json
+import operator
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestDirtyTracing(unittest.TestCase):
+    """
+    Tests that a tracer can say which terminal writes made a node dirty, along
+    which paths, and which read then made it recompute.
+    """
+
+    def setUp(self):
+        self.net = build_reference_network()
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        self.net.get_output_port_value('formatter', 'msg')
+        self.tracer = self.net.enable_tracing()
+
+    def test_why_a_node_recomputed(self):
+        self.assertEqual(
+            '<formatter> has not been re-evaluated since tracing began.',
+            self.tracer.why('formatter'))
+        self.net.set_terminal_value('X', 10)
+        self.assertEqual(
+            '<formatter> is dirty, because of:\n'
+            '    TERM:X > adder > formatter\n'
+            '    TERM:X > multiplier > formatter',
+            self.tracer.why('formatter'))
+        self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual(
+            '<formatter> was executed by read #1 (of formatter), because of:\n'
+            '    TERM:X > adder > formatter\n'
+            '    TERM:X > multiplier > formatter',
+            self.tracer.why('formatter'))
+
+    def test_writes_to_a_node_that_is_already_dirty(self):
+        self.net.set_terminal_value('X', 10)
+        self.net.set_terminal_value('Y', 20)
+        self.assertEqual([['TERM:X', 'adder'], ['TERM:Y', 'adder']],
+                         self.tracer.causes('adder'))
+        self.assertEqual([['TERM:X', 'adder', 'formatter'],
+                          ['TERM:X', 'multiplier', 'formatter'],
+                          ['TERM:Y', 'adder', 'formatter'],
+                          ['TERM:Y', 'multiplier', 'formatter']],
+                         self.tracer.causes('formatter'))
+
+    def test_cutoffs_and_topology_changes(self):
+        self.net.set_terminal_comparator('X', operator.eq)
+        self.net.set_output_port_comparator('adder', 'sum', operator.eq)
+        self.net.set_output_port_comparator('multiplier', 'prod', operator.eq)
+        # The sum and product stay the same.
+        self.net.set_terminal_values({'X': 2, 'Y': 1})
+        self.net.get_output_port_value('formatter', 'msg')
+        self.assertTrue(self.tracer.why('formatter').startswith(
+            '<formatter> was cut off by read #1'))
+        self.net.set_terminal_values({'X': 0, 'Y': 3})
+        self.net.get_output_port_value('adder', 'sum')
+        self.assertEqual(
+            '<adder> was executed by read #2 (of adder), because of:\n'
+            '    TERM:X > adder\n'
+            '    TERM:Y > adder',
+            self.tracer.why('adder'))
+
+        self.net.get_output_port_value('formatter', 'msg')
+        self.net.rewire_input_to_terminal('multiplier', 'in_2', 'X')
+        self.assertEqual([['topology change', 'multiplier', 'formatter']],
+                         self.tracer.causes('formatter'))
+
+    def test_event_log(self):
+        self.net.set_terminal_value('Y', 5)
+        self.net.get_output_port_value('adder', 'sum')
+        events = self.tracer.events()
+        self.assertEqual(
+            {'event': 'dirtied', 'node': 'formatter', 'by': 'multiplier'},
+            next(e for e in events if e['event'] == 'dirtied' and
+                 e['node'] == 'formatter'))
+        self.assertEqual({'event': 'read', 'read': 1, 'nodes': ['adder']},
+                         events[-2])
+        self.assertEqual({'event': 'executed', 'node': 'adder', 'read': 1,
+                          'causes': [['TERM:Y', 'adder']]},
+                         events[-1])
+        self.assertEqual(events, json.loads(self.tracer.to_json()))
+
+    def test_deep_networks(self):
+        depth = 5000
+        net = NetworkFactory('\n'.join(
+            ['TERM:T > N0:in'] +
+            ['N{}:out > N{}:in'.format(i, i + 1) for i in range(depth - 1)] +
+            ['N{}:out > DANGLING'.format(depth - 1)])).build()
+        for node_name in net.nodes:
+            net.set_xfn(node_name, pass_through_xfn)
+        last = 'N{}'.format(depth - 1)
+        net.set_terminal_value('T', 1)
+        net.get_output_port_value(last, 'out')
+        tracer = net.enable_tracing()
+        net.set_terminal_value('T', 2)
+        self.assertEqual(
+            [['TERM:T'] + ['N{}'.format(i) for i in range(depth)]],
+            tracer.causes(last))
+
+    def test_tracing_can_be_switched_off(self):
+        self.net.disable_tracing()
+        self.net.set_terminal_value('X', 10)
+        self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual([], self.tracer.events())
+
+
+def pass_through_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', input_values_dict['in'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+
+import operator
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+
+
+class TestEarlyCutoff(unittest.TestCase):
+    """
+    Tests that, when comparators are provided, writes and recomputations that
+    do not actually change a value stop the recomputation from flowing any
+    further downstream.
+    """
+
+    def setUp(self):
+        # A daisy-chain in which A computes the sign of its input, and B and C
+        # just count how many times they are called.
+        self.net = NetworkFactory("""
+            TERM:T   > A:in
+            A:out    > B:in
+            B:out    > C:in
+            C:out    > DANGLING
+        """).build()
+        self.counter = CountingXfn()
+        self.net.set_xfn('A', sign_xfn)
+        self.net.set_xfn('B', self.counter.xfn)
+        self.net.set_xfn('C', self.counter.xfn)
+
+    def evaluate_everything_once(self):
+        self.net.set_terminal_value('T', 5)
+        self.net.get_output_port_value('C', 'out')
+        self.counter.fired_count = 0
+
+    def test_without_comparators_everything_reruns(self):
+        self.evaluate_everything_once()
+        self.net.set_terminal_value('T', 7)
+        self.assertEqual(1, self.net.get_output_port_value('C', 'out'))
+        self.assertEqual(2, self.counter.fired_count, 'Wrong number of calls.')
+
+    def test_unchanged_terminal_write_is_a_no_op(self):
+        self.net.set_terminal_comparator('T', operator.eq)
+        self.evaluate_everything_once()
+        self.net.set_terminal_value('T', 5)
+        self.assertFalse(self.net.nodes['A'].is_dirty, 'Was set dirty.')
+        self.net.get_output_port_value('C', 'out')
+        self.assertEqual(0, self.counter.fired_count, 'Wrong number of calls.')
+
+    def test_unchanged_output_stops_recomputation(self):
+        self.net.set_output_port_comparator('A', 'out', operator.eq)
+        self.evaluate_everything_once()
+        # The sign of 7 is the same as the sign of 5, so B and C should not
+        # run again.
+        self.net.set_terminal_value('T', 7)
+        self.assertEqual(1, self.net.get_output_port_value('C', 'out'))
+        self.assertEqual(0, self.counter.fired_count, 'Wrong number of calls.')
+        self.assertFalse(self.net.nodes['B'].is_dirty, 'Was left dirty.')
+
+        # But a real change must still get through.
+        self.net.set_terminal_value('T', -7)
+        self.assertEqual(-1, self.net.get_output_port_value('C', 'out'))
+        self.assertEqual(2, self.counter.fired_count, 'Wrong number of calls.')
+
+
+def sign_xfn(input_values_dict, output_setter_fn):
+    value = input_values_dict['in']
+    output_setter_fn('out', (value > 0) - (value < 0))
+
+
+class CountingXfn:
+
+    def __init__(self):
+        self.fired_count = 0
+
+    def xfn(self, input_values_dict, output_setter_fn):
+        self.fired_count += 1
+        output_setter_fn('out', input_values_dict['in'])
@@ -3,6 +3,7 @@ import unittest
 from dataflow.api.network_error import NetworkError
 from dataflow.api.network_factory import NetworkFactory
 from dataflow.implementation.reference_network import REF_SCRIPT
+from dataflow.implementation.reference_network import build_reference_network
 
 
 class TestErrorHandling(unittest.TestCase):
@@ -131,3 +132,30 @@ class TestErrorHandling(unittest.TestCase):
         self.assertEqual(
             'No value has been been set for your terminal called <Y>.',
             str(cm.exception), 'Wrong message.')
+
+    def test_integrity_check_is_repeated_after_relevant_changes(self):
+        """
+        Make sure that once a network has passed its integrity check, changes
+        that could spoil it (unsetting a terminal, adding a node without a
+        transfer function) are still detected on the next read.
+        """
+        net = build_reference_network()
+        net.set_terminal_value('X', 42)
+        net.set_terminal_value('Y', 3.14)
+        net.get_output_port_value('formatter', 'msg')
+
+        net.set_terminal_value('Y', None)
+        with self.assertRaises(NetworkError) as cm:
+            net.get_output_port_value('formatter', 'msg')
+        self.assertEqual(
+            'No value has been been set for your terminal called <Y>.',
+            str(cm.exception), 'Wrong message.')
+        net.set_terminal_value('Y', 3.14)
+        net.get_output_port_value('formatter', 'msg')
+
+        net.register_node('latecomer')
+        with self.assertRaises(NetworkError) as cm:
+            net.get_output_port_value('formatter', 'msg')
+        self.assertEqual(
+            'No transfer function has been set for your node called '
+            '<latecomer>.', str(cm.exception), 'Wrong message.')
@@ -0,0 +1,75 @@
+
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+
+
+class TestEvaluationPlan(unittest.TestCase):
+    """
+    Tests that reads are evaluated from the compiled plan, without recursion,
+    and that the plan keeps up with changes to the topology.
+    """
+
+    def test_very_deep_chain_does_not_hit_recursion_limit(self):
+        # Build a daisy-chain far deeper than Python's recursion limit.
+        # (The terminal is written before the chain is wired, so that only
+        # the read path is exercised here.)
+        depth = 5000
+        net = NetworkFactory('TERM:seed > n0:in').build()
+        net.set_terminal_value('seed', 0)
+        for i in range(1, depth):
+            net.register_node('n{}'.format(i))
+            net.register_input_port('n{}'.format(i), 'in')
+            net.register_output_port('n{}'.format(i - 1), 'out')
+            net.create_output_to_input_edge(
+                'n{}'.format(i - 1), 'out', 'n{}'.format(i), 'in')
+        net.register_output_port('n{}'.format(depth - 1), 'out')
+        for name in net.nodes:
+            net.set_xfn(name, increment_xfn)
+        last = 'n{}'.format(depth - 1)
+        self.assertEqual(depth, net.get_output_port_value(last, 'out'),
+                         'Wrong output from Network')
+
+        # And that a terminal write dirties, and so re-evaluates, the whole
+        # chain again.
+        net.set_terminal_value('seed', 10)
+        self.assertEqual(depth + 10, net.get_output_port_value(last, 'out'),
+                         'Wrong output from Network')
+
+    def test_plan_is_recompiled_when_topology_changes(self):
+        net = NetworkFactory("""
+            TERM:seed > a:in
+            a:out     > DANGLING
+        """).build()
+        net.set_xfn('a', increment_xfn)
+        net.set_terminal_value('seed', 1)
+        self.assertEqual(2, net.get_output_port_value('a', 'out'))
+
+        net.register_node('b')
+        net.register_input_port('b', 'in')
+        net.register_output_port('b', 'out')
+        net.create_output_to_input_edge('a', 'out', 'b', 'in')
+        net.set_xfn('b', increment_xfn)
+        self.assertEqual(3, net.get_output_port_value('b', 'out'))
+
+    def test_cycle_is_reported(self):
+        net = NetworkFactory("""
+            TERM:seed > a:in_1
+            a:out     > b:in
+        """).build()
+        net.set_terminal_value('seed', 1)
+        net.register_input_port('a', 'in_2')
+        net.register_output_port('b', 'out')
+        net.create_output_to_input_edge('b', 'out', 'a', 'in_2')
+        net.set_xfn('a', increment_xfn)
+        net.set_xfn('b', increment_xfn)
+        with self.assertRaises(NetworkError) as cm:
+            net.get_output_port_value('b', 'out')
+        self.assertEqual(
+            'The network contains a cycle through the node called <a>.',
+            str(cm.exception), 'Wrong message.')
+
+
+def increment_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', input_values_dict['in'] + 1)
@@ -0,0 +1,98 @@
+
+import unittest
+
+from dataflow.api.memo_cache import MemoCache
+from dataflow.api.network_factory import NetworkFactory
+
+
+class TestMemoization(unittest.TestCase):
+
+    def setUp(self):
+        self.net = NetworkFactory("""
+            TERM:T     > square:in
+            square:out > DANGLING
+        """).build()
+        self.counter = CountingSquareXfn()
+        self.net.set_xfn('square', self.counter.xfn)
+
+    def read(self, value):
+        self.net.set_terminal_value('T', value)
+        return self.net.get_output_port_value('square', 'out')
+
+    def test_recurring_inputs_are_served_from_cache(self):
+        cache = MemoCache(max_entries=4)
+        self.net.set_memo_cache('square', cache)
+        results = [self.read(v) for v in (2, 3, 2, 3, 2)]
+        self.assertEqual([4, 9, 4, 9, 4], results, 'Wrong output from Network')
+        self.assertEqual(2, self.counter.fired_count, 'Wrong number of calls.')
+        self.assertEqual({'entries': 2, 'hits': 3, 'misses': 2,
+                          'evictions': 0, 'total_size': 0}, cache.stats())
+
+    def test_least_recently_used_is_evicted(self):
+        cache = MemoCache(max_entries=2)
+        self.net.set_memo_cache('square', cache)
+        for v in (1, 2, 1, 3):  # 2 is the least recently used when 3 arrives.
+            self.read(v)
+        self.assertEqual(3, self.counter.fired_count)
+        self.read(1)
+        self.assertEqual(3, self.counter.fired_count, 'Wrong entry evicted.')
+        self.read(2)
+        self.assertEqual(4, self.counter.fired_count, 'Wrong entry evicted.')
+        self.assertEqual(2, cache.evictions)
+
+    def test_size_budget(self):
+        cache = MemoCache(max_entries=None, max_size=2,
+                          size_fn=lambda output_values: 1)
+        self.net.set_memo_cache('square', cache)
+        for v in (1, 2, 3):
+            self.read(v)
+        self.assertEqual(2, len(cache), 'Size budget not respected.')
+
+    def test_cheapest_entry_is_evicted_first(self):
+        cache = MemoCache(max_entries=2, eviction='cheapest')
+        cache.store({'in': 1}, {'out': 1}, compute_seconds=5.0)
+        cache.store({'in': 2}, {'out': 4}, compute_seconds=0.1)
+        cache.store({'in': 3}, {'out': 9}, compute_seconds=1.0)
+        self.assertEqual({'out': 1}, cache.lookup({'in': 1}))
+        self.assertIsNone(cache.lookup({'in': 2}), 'Wrong entry evicted.')
+
+    def test_unhashable_inputs_are_not_cached(self):
+        self.net.set_memo_cache('square', MemoCache())
+        self.net.set_xfn('square', self.counter.xfn_for_lists)
+        self.read([2])
+        self.read([2])
+        self.assertEqual(2, self.counter.fired_count, 'Wrong number of calls.')
+
+    def test_equal_values_of_different_types_are_told_apart(self):
+        cache = MemoCache()
+        self.net.set_memo_cache('square', cache)
+        results = [self.read(v) for v in (1, 1.0, True)]
+        self.assertEqual([int, float, int], [type(r) for r in results])
+        self.assertEqual(3, self.counter.fired_count, 'Wrong number of calls.')
+        cache.store({'in': (1, 'a')}, {'out': 'int'})
+        self.assertIsNone(cache.lookup({'in': (1.0, 'a')}))
+        self.assertEqual({'out': 'int'}, cache.lookup({'in': (1, 'a')}))
+        cache.store({'in': frozenset({(1, 'a')})}, {'out': 'int'})
+        self.assertIsNone(cache.lookup({'in': frozenset({(1.0, 'a')})}))
+        self.assertEqual({'out': 'int'},
+                         cache.lookup({'in': frozenset({(1, 'a')})}))
+
+    def test_changing_the_xfn_forgets_old_results(self):
+        self.net.set_memo_cache('square', MemoCache())
+        self.read(2)
+        self.net.set_xfn('square', lambda inputs, setter: setter('out', 0))
+        self.assertEqual(0, self.read(2), 'Served a stale result.')
+
+
+class CountingSquareXfn:
+
+    def __init__(self):
+        self.fired_count = 0
+
+    def xfn(self, input_values_dict, output_setter_fn):
+        self.fired_count += 1
+        output_setter_fn('out', input_values_dict['in'] ** 2)
+
+    def xfn_for_lists(self, input_values_dict, output_setter_fn):
+        self.fired_count += 1
+        output_setter_fn('out', [v ** 2 for v in input_values_dict['in']])
@@ -0,0 +1,103 @@
+
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import build_reference_network
+
+_WIDE_SCRIPT = """
+    TERM:T   > a:in
+             > b:in
+             > c:in
+             > d:in
+    a:out    > total:in_a
+    b:out    > total:in_b
+    c:out    > total:in_c
+    d:out    > total:in_d
+    total:out > DANGLING
+"""
+
+
+class TestParallelExecution(unittest.TestCase):
+
+    def test_thread_pool_gives_same_result(self):
+        net = build_reference_network()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            net.set_executor(executor)
+            net.set_terminal_values({'X': 42, 'Y': 3.14})
+            msg = net.get_output_port_value('formatter', 'msg')
+        self.assertEqual('sum: 45.14, mult: 131.88', msg,
+                         'Wrong output from Network')
+
+    def test_process_pool_gives_same_result(self):
+        net = build_reference_network()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            net.set_executor(executor)
+            net.set_terminal_values({'X': 42, 'Y': 3.14})
+            msg = net.get_output_port_value('formatter', 'msg')
+            # And again, after a change.
+            net.set_terminal_value('X', 1)
+            msg_2 = net.get_output_port_value('formatter', 'msg')
+        self.assertEqual('sum: 45.14, mult: 131.88', msg,
+                         'Wrong output from Network')
+        self.assertEqual('sum: 4.140000000000001, mult: 3.14', msg_2,
+                         'Wrong output from Network')
+
+    def test_independent_nodes_run_concurrently(self):
+        # Each of a,b,c,d waits until all four are running at once, which
+        # could never happen if they were executed one at a time.
+        net = NetworkFactory(_WIDE_SCRIPT).build()
+        barrier = threading.Barrier(4, timeout=5)
+
+        def rendezvous_xfn(input_values_dict, output_setter_fn):
+            barrier.wait()
+            output_setter_fn('out', input_values_dict['in'])
+
+        for name in 'abcd':
+            net.set_xfn(name, rendezvous_xfn)
+        net.set_xfn('total', total_xfn)
+        net.set_terminal_value('T', 2)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            net.set_executor(executor)
+            self.assertEqual(8, net.get_output_port_value('total', 'out'))
+
+    def test_errors_are_propagated(self):
+        net = NetworkFactory(_WIDE_SCRIPT).build()
+        for name in 'abcd':
+            net.set_xfn(name, copy_xfn)
+        net.set_xfn('c', failing_xfn)
+        net.set_xfn('total', total_xfn)
+        net.set_terminal_value('T', 2)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            net.set_executor(executor)
+            with self.assertRaises(ValueError) as cm:
+                net.get_output_port_value('total', 'out')
+            self.assertEqual('c is broken', str(cm.exception))
+            # The failing node stays dirty, while its siblings are clean.
+            self.assertTrue(net.nodes['c'].is_dirty)
+            self.assertFalse(net.nodes['d'].is_dirty)
+
+            # Unknown output ports are reported just as in serial execution.
+            net.set_xfn('c', copy_to_fibble_xfn)
+            with self.assertRaises(NetworkError) as cm:
+                net.get_output_port_value('total', 'out')
+            self.assertEqual('Unknown output port name: <fibble> for node: <c>',
+                             str(cm.exception), 'Wrong message.')
+
+
+def copy_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', input_values_dict['in'])
+
+
+def copy_to_fibble_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('fibble', input_values_dict['in'])
+
+
+def failing_xfn(input_values_dict, output_setter_fn):
+    raise ValueError('c is broken')
+
+
+def total_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', sum(input_values_dict.values()))
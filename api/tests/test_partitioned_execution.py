@@ -0,0 +1,120 @@
+import os
+import unittest
+from unittest import mock
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.partitioned_executor import PartitionedExecutor
+from dataflow.implementation.detached_xfn import run_detached_xfn
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestPartitionedExecution(unittest.TestCase):
+    """
+    Tests that a network whose nodes are divided between worker processes
+    behaves just as it does when it is evaluated serially.
+    """
+
+    def setUp(self):
+        # Two separate subgraphs, each of which reports the process it ran in.
+        self.net = NetworkFactory("""
+            TERM:P    > A1:in
+            A1:out    > A2:in
+            A2:out    > DANGLING
+            TERM:Q    > B1:in
+            B1:out    > B2:in
+            B2:out    > DANGLING
+        """).build()
+        for node_name in self.net.nodes:
+            self.net.set_xfn(node_name, append_pid_xfn)
+        self.net.set_terminal_values({'P': (), 'Q': ()})
+        self.executor = PartitionedExecutor(self.net, n_partitions=2,
+                                            share_threshold=1024)
+        self.net.set_executor(self.executor)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_connected_subgraphs_share_a_process(self):
+        self.assertEqual([['A1', 'A2'], ['B1', 'B2']],
+                         sorted(self.executor.partitions()))
+        a_pids, b_pids = self.net.get_output_port_values(
+            [('A2', 'out'), ('B2', 'out')])
+        self.assertEqual(1, len(set(a_pids)))
+        self.assertEqual(1, len(set(b_pids)))
+        self.assertNotEqual(a_pids[0], b_pids[0])
+        self.assertNotIn(os.getpid(), a_pids + b_pids)
+
+    def test_same_results_as_serial_execution(self):
+        net = build_reference_network()
+        net.set_terminal_values({'X': 1, 'Y': 2})
+        expected = net.get_output_port_value('formatter', 'msg')
+        with PartitionedExecutor(net, n_partitions=2,
+                                 strategy='cost') as executor:
+            net.set_executor(executor)
+            net.set_terminal_values({'X': 2, 'Y': 1})
+            net.get_output_port_value('formatter', 'msg')
+            net.set_terminal_values({'X': 1, 'Y': 2})
+            self.assertEqual(expected,
+                             net.get_output_port_value('formatter', 'msg'))
+
+    def test_large_payloads_round_trip(self):
+        payload = bytes(range(256)) * 64
+        self.net.set_xfn('A1', reverse_xfn)
+        self.net.set_xfn('A2', reverse_xfn)
+        self.net.set_terminal_value('P', payload)
+        self.assertEqual(payload, self.net.get_output_port_value('A2', 'out'))
+        self.net.set_terminal_value('P', bytearray(payload))
+        self.assertEqual(bytearray(payload),
+                         self.net.get_output_port_value('A2', 'out'))
+
+    def test_transfer_functions_keep_their_state_in_the_worker(self):
+        self.net.set_xfn('B1', CountingXfn())
+        self.assertEqual(1, self.net.get_output_port_value('B1', 'out'))
+        self.net.set_terminal_value('Q', ())
+        self.assertEqual(2, self.net.get_output_port_value('B1', 'out'))
+
+    def test_errors_are_raised_to_the_reader(self):
+        self.net.set_xfn('A2', failing_xfn)
+        with self.assertRaises(ValueError):
+            self.net.get_output_port_value('A2', 'out')
+        self.net.set_xfn('A2', append_pid_xfn)
+        self.assertEqual(2, len(self.net.get_output_port_value('A2', 'out')))
+
+    def test_failures_to_receive_outputs_are_raised(self):
+        # E.g. because the shared memory segment has gone. (Reading first
+        # starts the worker, which would otherwise inherit the patch).
+        self.net.get_output_port_value('A2', 'out')
+        with mock.patch(
+                'dataflow.api.partitioned_executor.unshare_values',
+                side_effect=FileNotFoundError('Gone.')):
+            future = self.executor.submit(
+                run_detached_xfn, 'A1', append_pid_xfn, {'in': ()},
+                frozenset(['out']))
+            with self.assertRaises(FileNotFoundError):
+                future.result(timeout=30)
+
+
+def append_pid_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', tuple(input_values_dict['in']) + (os.getpid(),))
+
+
+def reverse_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', input_values_dict['in'][::-1])
+
+
+def failing_xfn(input_values_dict, output_setter_fn):
+    raise ValueError('Failed.')
+
+
+class CountingXfn:
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input_values_dict, output_setter_fn):
+        self.calls += 1
+        output_setter_fn('out', self.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
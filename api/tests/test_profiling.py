@@ -0,0 +1,70 @@
+
+import csv
+import io
+import json
+import operator
+import unittest
+
+from dataflow.api.memo_cache import MemoCache
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.net = build_reference_network()
+        self.profiler = self.net.enable_profiling()
+        self.net.set_terminal_values({'X': 42, 'Y': 3.14})
+        self.net.get_output_port_value('formatter', 'msg')
+
+    def test_executions_and_times_are_recorded(self):
+        self.net.set_terminal_value('X', 1)
+        self.net.get_output_port_value('adder', 'sum')
+
+        report = self.profiler.report()
+        nodes = report['nodes']
+        self.assertEqual(['adder', 'formatter', 'multiplier'], list(nodes))
+        self.assertEqual(2, nodes['adder']['executions'])
+        self.assertEqual(1, nodes['formatter']['executions'])
+        self.assertEqual(1, nodes['adder']['times_dirtied'])
+        self.assertGreater(nodes['adder']['wall_seconds'], 0.0)
+
+        network = report['network']
+        self.assertEqual(2, network['evaluations'])
+        self.assertEqual(2, network['propagations'])
+        self.assertAlmostEqual(
+            network['evaluation_seconds'],
+            network['xfn_seconds'] + network['overhead_seconds'])
+
+    def test_cache_hits_and_cutoffs_are_recorded(self):
+        self.net.set_memo_cache('adder', MemoCache())
+        self.net.set_output_port_comparator('adder', 'sum', operator.eq)
+        self.net.set_output_port_comparator('multiplier', 'prod', operator.eq)
+        for value in (1, 42, 1):
+            self.net.set_terminal_value('X', value)
+            self.net.get_output_port_value('formatter', 'msg')
+        # The adder has seen X=1 before the third time round.
+        nodes = self.profiler.report()['nodes']
+        self.assertEqual(1, nodes['adder']['cache_hits'])
+
+        # Rewriting Y with the same value re-evaluates the adder and multiplier,
+        # but they produce the same outputs, so the formatter is cut off.
+        self.net.set_terminal_value('Y', 3.14)
+        self.net.get_output_port_value('formatter', 'msg')
+        nodes = self.profiler.report()['nodes']
+        self.assertEqual(1, nodes['formatter']['cutoffs'])
+
+    def test_exports(self):
+        report = json.loads(self.profiler.to_json())
+        self.assertEqual(1, report['nodes']['adder']['executions'])
+        rows = list(csv.DictReader(io.StringIO(self.profiler.to_csv())))
+        self.assertEqual(['adder', 'formatter', 'multiplier'],
+                         [row['node'] for row in rows])
+        self.assertEqual('1', rows[0]['executions'])
+
+    def test_disable_profiling(self):
+        self.net.disable_profiling()
+        self.net.set_terminal_value('X', 1)
+        self.net.get_output_port_value('formatter', 'msg')
+        self.assertEqual(1, self.profiler.report()['nodes']['adder']
+                         ['executions'], 'Still recording.')
@@ -0,0 +1,156 @@
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.result_store import ResultStore
+
+_SCRIPT = """
+    TERM:T     > square:in
+    square:out > DANGLING
+"""
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._temp_dir.name
+        self.counter = CountingSquareXfn()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def build(self, store, xfn_version='1'):
+        # Each call stands in for a fresh process, sharing the store directory.
+        net = NetworkFactory(_SCRIPT).build()
+        net.set_xfn('square', self.counter.xfn)
+        net.set_result_store('square', store, xfn_version=xfn_version)
+        return net
+
+    def read(self, net, value):
+        net.set_terminal_value('T', value)
+        return net.get_output_port_value('square', 'out')
+
+    def test_results_survive_a_restart(self):
+        self.assertEqual(9, self.read(self.build(ResultStore(self.directory)), 3))
+        self.assertEqual(1, self.counter.fired_count)
+
+        store = ResultStore(self.directory)
+        net = self.build(store)
+        self.assertEqual(9, self.read(net, 3), 'Wrong output from Network')
+        self.assertEqual(1, self.counter.fired_count, 'Wrong number of calls.')
+        self.assertEqual(1, store.hits)
+
+        # Inputs not seen before are still computed.
+        self.assertEqual(16, self.read(net, 4), 'Wrong output from Network')
+        self.assertEqual(2, self.counter.fired_count, 'Wrong number of calls.')
+
+    def test_new_xfn_version_does_not_use_old_results(self):
+        self.read(self.build(ResultStore(self.directory)), 3)
+        self.read(self.build(ResultStore(self.directory), xfn_version='2'), 3)
+        self.assertEqual(2, self.counter.fired_count, 'Used a stale result.')
+
+    def test_least_recently_used_files_are_evicted(self):
+        store = ResultStore(self.directory)
+        net = self.build(store)
+        self.read(net, 1)
+        one_file_size = store.total_bytes
+
+        store = ResultStore(self.directory, max_bytes=2 * one_file_size)
+        net = self.build(store)
+        for value in (2, 3):
+            self.read(net, value)
+        self.assertEqual(2, len(os.listdir(self.directory)),
+                         'Size limit not respected.')
+        self.assertEqual(1, store.evictions)
+        self.assertEqual(2 * one_file_size, store.total_bytes)
+
+    def test_unpicklable_inputs_are_not_stored(self):
+        store = ResultStore(self.directory)
+        net = self.build(store)
+        net.set_xfn('square', lambda inputs, setter: setter('out', 0))
+        self.read(net, lambda: None)
+        self.assertEqual([], os.listdir(self.directory), 'Stored something.')
+
+    def test_closures_with_the_same_name_do_not_share_results(self):
+        store = ResultStore(self.directory)
+        net = NetworkFactory(_SCRIPT).build()
+        net.set_result_store('square', store)
+        net.set_xfn('square', make_multiplier(2))
+        self.assertEqual(6, self.read(net, 3))
+        net.set_xfn('square', make_multiplier(3))
+        self.assertEqual(9, self.read(net, 3))
+        self.assertEqual(0, store.hits)
+
+    def test_set_xfn_forgets_the_xfn_version(self):
+        store = ResultStore(self.directory)
+        net = self.build(store, xfn_version='1')
+        self.assertEqual(9, self.read(net, 3))
+        net.set_xfn('square', make_multiplier(2))
+        self.assertEqual(6, self.read(net, 3))
+        self.assertEqual(0, store.hits)
+
+    def test_unreadable_files_are_misses(self):
+        store = ResultStore(self.directory)
+        net = self.build(store)
+        self.read(net, 3)
+        # A pickle of a class that no longer exists.
+        [name] = os.listdir(self.directory)
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(pickle.dumps(CountingSquareXfn).replace(
+                b'CountingSquareXfn', b'RenamedSquareXfn1'))
+        self.assertEqual(9, self.read(self.build(store), 3))
+        self.assertEqual(2, self.counter.fired_count)
+
+    def test_failed_writes_leave_no_temporary_files(self):
+        store = ResultStore(self.directory)
+        net = self.build(store)
+        real_replace = os.replace
+
+        def failing_replace(*args):
+            raise OSError('Disk full.')
+
+        os.replace = failing_replace
+        try:
+            with self.assertRaises(OSError):
+                self.read(net, 3)
+        finally:
+            os.replace = real_replace
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_files_evicted_by_another_process_after_a_hit(self):
+        store = ResultStore(self.directory)
+        self.read(self.build(store), 3)
+        real_utime = os.utime
+
+        def evict_then_utime(path, *args, **kwargs):
+            # Another process sharing the store gets in first.
+            os.remove(path)
+            real_utime(path, *args, **kwargs)
+
+        os.utime = evict_then_utime
+        try:
+            self.assertEqual(9, self.read(self.build(store), 3))
+        finally:
+            os.utime = real_utime
+        self.assertEqual(1, self.counter.fired_count)
+        self.assertEqual(1, store.hits)
+
+
+def make_multiplier(factor):
+    def xfn(input_values_dict, output_setter_fn):
+        output_setter_fn('out', input_values_dict['in'] * factor)
+    return xfn
+
+
+class CountingSquareXfn:
+
+    def __init__(self):
+        self.fired_count = 0
+
+    def xfn(self, input_values_dict, output_setter_fn):
+        self.fired_count += 1
+        output_setter_fn('out', input_values_dict['in'] ** 2)
@@ -0,0 +1,227 @@
+import gc
+import time
+import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.retention_policy import RetentionPolicy
+
+
+class TestRetentionPolicy(unittest.TestCase):
+    """
+    Tests that output values are evicted to keep within a memory budget, and
+    recomputed transparently when they are needed again.
+    """
+
+    def setUp(self):
+        # A daisy-chain in which each node adds one to its input, and counts
+        # its calls.
+        self.net = NetworkFactory("""
+            TERM:T   > A:in
+            A:out    > B:in
+            B:out    > C:in
+            C:out    > DANGLING
+        """).build()
+        self.calls = []
+        for node_name in ('A', 'B', 'C'):
+            self.net.set_xfn(node_name, self._make_increment(node_name))
+        self.net.set_terminal_value('T', 0)
+
+    def test_unread_values_are_evicted(self):
+        policy = self._set_policy(max_bytes=0)
+        self.assertEqual(3, self.net.get_output_port_value('C', 'out'))
+        self.assertIsNone(self.net.nodes['A'].output_ports['out'].get_value())
+        self.assertIsNone(self.net.nodes['B'].output_ports['out'].get_value())
+        self.assertTrue(self.net.nodes['B'].is_evicted)
+        self.assertEqual(2, policy.evictions)
+
+        # What was read is kept, so reading it again executes nothing.
+        self.calls = []
+        self.assertEqual(3, self.net.get_output_port_value('C', 'out'))
+        self.assertEqual([], self.calls)
+
+    def test_evicted_values_are_freed(self):
+        # Nothing else, (such as a copy in a downstream input port), may keep
+        # an evicted value alive.
+        payloads = {}
+
+        def make_payload_xfn(node_name):
+            def xfn(input_values_dict, output_setter_fn):
+                payload = payloads[node_name] = Payload()
+                output_setter_fn('out', payload)
+            return xfn
+
+        for node_name in ('A', 'B', 'C'):
+            self.net.set_xfn(node_name, make_payload_xfn(node_name))
+        self._set_policy(max_bytes=0)
+        self.net.get_output_port_value('C', 'out')
+        self.assertTrue(self.net.nodes['B'].is_evicted)
+        refs = {name: weakref.ref(payload)
+                for name, payload in payloads.items()}
+        payloads.clear()
+        gc.collect()
+        self.assertIsNone(refs['A']())
+        self.assertIsNone(refs['B']())
+        self.assertIsNotNone(refs['C']())
+
+    def test_no_eviction_within_budget(self):
+        policy = self._set_policy(max_bytes=10)
+        self.net.get_output_port_value('C', 'out')
+        self.assertEqual(0, policy.evictions)
+        self.assertEqual(2, policy.total_bytes)
+
+    def test_evicted_values_are_recomputed_on_demand(self):
+        policy = self._set_policy(max_bytes=0)
+        self.net.get_output_port_value('C', 'out')
+        c_version = self.net.nodes['C'].output_ports['out'].version
+        self.calls = []
+        self.assertEqual(2, self.net.get_output_port_value('B', 'out'))
+        self.assertEqual(['A', 'B'], self.calls)
+        self.assertEqual(2, policy.recomputations)
+        self.assertFalse(self.net.nodes['B'].is_evicted)
+
+        # Getting back the same values is not a change, so C is untouched.
+        self.assertEqual(c_version,
+                         self.net.nodes['C'].output_ports['out'].version)
+        self.calls = []
+        self.assertEqual(3, self.net.get_output_port_value('C', 'out'))
+        self.assertEqual([], self.calls)
+
+    def test_terminal_changes_still_propagate(self):
+        self._set_policy(max_bytes=0)
+        self.net.get_output_port_value('C', 'out')
+        self.calls = []
+        self.net.set_terminal_value('T', 10)
+        self.assertEqual(13, self.net.get_output_port_value('C', 'out'))
+        self.assertEqual(['A', 'B', 'C'], self.calls)
+
+    def test_wide_fan_out_is_pinned(self):
+        net = NetworkFactory("""
+            TERM:T   > A:in
+            A:out    > B:in
+            A:out    > C:in
+            B:out    > D:b
+            C:out    > D:c
+            D:out    > DANGLING
+        """).build()
+        for node_name in ('A', 'B', 'C'):
+            net.set_xfn(node_name, self._make_increment(node_name))
+        net.set_xfn('D', sum_xfn)
+        net.set_terminal_value('T', 0)
+        policy = RetentionPolicy(max_bytes=0, size_fn=lambda value: 1,
+                                 pin_fan_out=2)
+        net.set_retention_policy(policy)
+        self.assertEqual(4, net.get_output_port_value('D', 'out'))
+        self.assertFalse(net.nodes['A'].is_evicted)
+        self.assertTrue(net.nodes['B'].is_evicted)
+        self.assertTrue(net.nodes['C'].is_evicted)
+
+    def test_cheapest_eviction_spares_slow_nodes(self):
+        for eviction, evicted in (('lru', 'SLOW'), ('cheapest', 'FAST')):
+            net = NetworkFactory("""
+                TERM:T     > SLOW:in
+                TERM:T     > FAST:in
+                SLOW:out   > D:b
+                FAST:out   > D:c
+                D:out      > DANGLING
+            """).build()
+            net.set_xfn('SLOW', slow_increment_xfn)
+            net.set_xfn('FAST', self._make_increment('FAST'))
+            net.set_xfn('D', sum_xfn)
+            net.set_terminal_value('T', 0)
+            net.set_retention_policy(RetentionPolicy(
+                max_bytes=1, size_fn=lambda value: 1, eviction=eviction))
+            self.assertEqual(2, net.get_output_port_value('D', 'out'))
+            self.assertTrue(net.nodes[evicted].is_evicted, eviction)
+            self.assertEqual(1, sum(node.is_evicted
+                                    for node in net.nodes.values()))
+
+    def test_budget_holds_during_a_long_evaluation(self):
+        lines = ['TERM:T > N0:in']
+        lines += ['N{}:out > N{}:in'.format(i, i + 1) for i in range(49)]
+        lines += ['N49:out > DANGLING']
+        net = NetworkFactory('\n'.join(lines)).build()
+        for node_name in net.nodes:
+            net.set_xfn(node_name, self._make_increment(node_name))
+        net.set_terminal_value('T', 0)
+        peaks = []
+        policy = RetentionPolicy(max_bytes=2, size_fn=lambda value: 1)
+        policy_enforce = policy.enforce
+
+        def enforce(in_use=()):
+            policy_enforce(in_use)
+            peaks.append(policy.total_bytes)
+        policy.enforce = enforce
+        net.set_retention_policy(policy)
+        self.assertEqual(50, net.get_output_port_value('N49', 'out'))
+        self.assertLessEqual(max(peaks), 2)
+
+    def test_with_an_executor(self):
+        policy = self._set_policy(max_bytes=0)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.net.set_executor(executor)
+            self.assertEqual(3, self.net.get_output_port_value('C', 'out'))
+            self.assertEqual(2, self.net.get_output_port_value('B', 'out'))
+        self.assertEqual(2, policy.recomputations)
+
+    def test_sweeps(self):
+        # Making Q clean during the sweep must not evict P, which the sweep
+        # reads too.
+        net = NetworkFactory("""
+            TERM:K   > P:in
+            TERM:J   > Q:in
+            P:out    > V:p
+            Q:out    > V:q
+            TERM:X   > V:x
+            V:out    > DANGLING
+        """).build()
+        for node_name in ('P', 'Q'):
+            net.set_xfn(node_name, self._make_increment(node_name))
+        net.set_xfn('V', sum_xfn)
+        net.set_terminal_values({'K': 10, 'J': 0, 'X': 0})
+        policy = RetentionPolicy(max_bytes=10, size_fn=lambda value: 1)
+        net.set_retention_policy(policy)
+        net.get_output_port_value('V', 'out')
+        net.set_terminal_value('J', 18)
+        policy.max_bytes = 1
+        self.assertEqual([[31, 32]], net.sweep({'X': [1, 2]}, [('V', 'out')]))
+
+    def test_stats(self):
+        policy = self._set_policy(max_bytes=1)
+        self.net.get_output_port_value('C', 'out')
+        self.assertEqual({'resident_nodes': 1, 'pinned_nodes': 1,
+                          'evictions': 1, 'recomputations': 0,
+                          'total_bytes': 1}, policy.stats())
+
+    def test_unknown_eviction_policy(self):
+        with self.assertRaises(ValueError):
+            RetentionPolicy(max_bytes=0, eviction='random')
+
+    def _set_policy(self, max_bytes):
+        policy = RetentionPolicy(max_bytes=max_bytes, size_fn=lambda value: 1)
+        self.net.set_retention_policy(policy)
+        return policy
+
+    def _make_increment(self, node_name):
+        def xfn(input_values_dict, output_setter_fn):
+            self.calls.append(node_name)
+            output_setter_fn('out', input_values_dict['in'] + 1)
+        return xfn
+
+
+class Payload:
+    pass
+
+
+def sum_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', sum(input_values_dict.values()))
+
+
+def slow_increment_xfn(input_values_dict, output_setter_fn):
+    time.sleep(0.05)
+    output_setter_fn('out', input_values_dict['in'] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
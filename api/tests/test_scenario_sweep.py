@@ -0,0 +1,121 @@
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.vectorized_xfn import vectorized_xfn
+from dataflow.implementation.reference_network import build_reference_network
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The *scale* node depends only on S, so it is the same in every scenario when
+# only X is varied.
+_SCRIPT = """
+    TERM:X       > shifter:in
+    TERM:S       > scale:in
+    scale:out    > scaled_shifter:factor
+    shifter:out  > scaled_shifter:in
+    scaled_shifter:out > DANGLING
+"""
+
+
+class TestScenarioSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.net = NetworkFactory(_SCRIPT).build()
+        self.net.set_xfn('scale', self._scale_xfn)
+        self.net.set_xfn('shifter', self._shifter_xfn)
+        self.net.set_xfn('scaled_shifter', self._scaled_shifter_xfn)
+        self.net.set_terminal_values({'X': 0, 'S': 2})
+
+    def test_sweep_gives_the_same_answers_as_one_at_a_time(self):
+        net = build_reference_network()
+        net.set_terminal_values({'X': 0, 'Y': 0})
+        xs = [1, 2, 3, 4]
+        ys = [0.5, 1.5, 2.5, 3.5]
+        sums, msgs = net.sweep({'X': xs, 'Y': ys},
+                               [('adder', 'sum'), ('formatter', 'msg')])
+        expected_sums = []
+        expected_msgs = []
+        for x, y in zip(xs, ys):
+            net.set_terminal_values({'X': x, 'Y': y})
+            expected_sums.append(net.get_output_port_value('adder', 'sum'))
+            expected_msgs.append(net.get_output_port_value('formatter', 'msg'))
+        self.assertEqual(expected_sums, sums)
+        self.assertEqual(expected_msgs, msgs)
+
+    def test_invariant_nodes_are_evaluated_once(self):
+        [out] = self.net.sweep({'X': [1, 2, 3]},
+                               [('scaled_shifter', 'out')])
+        self.assertEqual([22, 24, 26], out)
+        self.assertEqual(1, self.calls.count('scale'))
+        self.assertEqual(3, self.calls.count('shifter'))
+
+    def test_vectorized_xfns_are_called_once(self):
+        self.net.set_xfn('shifter', self._vectorized_shifter_xfn)
+        [out] = self.net.sweep({'X': [1, 2, 3]},
+                               [('scaled_shifter', 'out')])
+        self.assertEqual([22, 24, 26], out)
+        self.assertEqual(1, self.calls.count('vectorized_shifter'))
+        self.assertEqual(3, self.calls.count('scaled_shifter'))
+
+    def test_invariant_outputs_are_repeated(self):
+        [out] = self.net.sweep({'X': [1, 2, 3]}, [('scale', 'out')])
+        self.assertEqual([2, 2, 2], out)
+
+    def test_sweep_leaves_the_network_as_it_was(self):
+        before = self.net.get_output_port_value('scaled_shifter', 'out')
+        self.calls.clear()
+        self.net.sweep({'X': [1, 2, 3]}, [('scaled_shifter', 'out')])
+        self.assertEqual(0, self.net.terminals['X'].value)
+        self.calls.clear()
+        self.assertEqual(before,
+                         self.net.get_output_port_value('scaled_shifter', 'out'))
+        self.assertEqual([], self.calls, 'Should still have been clean.')
+
+    def test_varied_terminals_need_not_be_set(self):
+        net = NetworkFactory(_SCRIPT).build()
+        net.set_xfn('scale', self._scale_xfn)
+        net.set_xfn('shifter', self._shifter_xfn)
+        net.set_xfn('scaled_shifter', self._scaled_shifter_xfn)
+        net.set_terminal_value('S', 1)
+        [out] = net.sweep({'X': [0, 1]}, [('scaled_shifter', 'out')])
+        self.assertEqual([10, 11], out)
+
+    def test_columns_must_be_the_same_length(self):
+        with self.assertRaises(NetworkError):
+            self.net.sweep({'X': [1, 2], 'S': [1]},
+                           [('scaled_shifter', 'out')])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy_columns_give_numpy_results(self):
+        self.net.set_xfn('shifter', self._vectorized_shifter_xfn)
+        [out] = self.net.sweep({'X': numpy.arange(3)},
+                               [('scaled_shifter', 'out')])
+        self.assertIsInstance(out, numpy.ndarray)
+        self.assertEqual([20, 22, 24], out.tolist())
+
+    def _scale_xfn(self, input_values_dict, output_setter_fn):
+        self.calls.append('scale')
+        output_setter_fn('out', input_values_dict['in'])
+
+    def _shifter_xfn(self, input_values_dict, output_setter_fn):
+        self.calls.append('shifter')
+        output_setter_fn('out', input_values_dict['in'] + 10)
+
+    @vectorized_xfn
+    def _vectorized_shifter_xfn(self, input_values_dict, output_setter_fn):
+        self.calls.append('vectorized_shifter')
+        output_setter_fn('out', [x + 10 for x in input_values_dict['in']])
+
+    def _scaled_shifter_xfn(self, input_values_dict, output_setter_fn):
+        self.calls.append('scaled_shifter')
+        output_setter_fn('out',
+                         input_values_dict['in'] * input_values_dict['factor'])
+
+
+if __name__ == '__main__':
+    unittest.main()
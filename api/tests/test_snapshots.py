@@ -0,0 +1,152 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import REF_SCRIPT
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestSnapshots(unittest.TestCase):
+    """
+    Tests that a network's runtime state can be captured and restored, so that
+    a new network built from the same script starts clean.
+    """
+
+    def setUp(self):
+        self.net = build_reference_network()
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        self.msg = self.net.get_output_port_value('formatter', 'msg')
+
+    def test_restored_network_is_clean(self):
+        replica = build_reference_network()
+        calls = []
+        replica.set_xfn('adder', lambda *args: calls.append(args))
+        replica.restore(self.net.snapshot())
+        self.assertEqual(2, replica.terminals['Y'].value)
+        self.assertFalse(any(node.is_dirty for node in replica.nodes.values()))
+        self.assertEqual(self.msg,
+                         replica.get_output_port_value('formatter', 'msg'))
+        self.assertEqual([], calls)
+
+    def test_dirty_nodes_stay_dirty(self):
+        self.net.set_terminal_value('X', 10)
+        replica = build_reference_network()
+        replica.restore(self.net.snapshot())
+        self.assertTrue(replica.nodes['adder'].is_dirty)
+        self.assertEqual(self.net.get_output_port_value('formatter', 'msg'),
+                         replica.get_output_port_value('formatter', 'msg'))
+
+    def test_snapshots_taken_during_a_transaction(self):
+        with self.net.terminal_transaction():
+            self.net.set_terminal_value('X', 10)
+            data = self.net.snapshot()
+        replica = build_reference_network()
+        replica.restore(data)
+        self.assertTrue(replica.nodes['adder'].is_dirty)
+        self.assertEqual(12, replica.get_output_port_value('adder', 'sum'))
+
+    def test_a_different_topology_is_refused(self):
+        other = NetworkFactory(REF_SCRIPT.replace('formatter', 'printer'))
+        with self.assertRaises(NetworkError) as cm:
+            other.build().restore(self.net.snapshot())
+        self.assertEqual('The snapshot was taken of a network with a '
+                         'different topology.', str(cm.exception))
+        with self.assertRaises(NetworkError):
+            self.net.restore(b'rubbish')
+
+    def test_custom_serializers(self):
+        serializers = {('adder', 'sum'): json, 'X': json}
+        data = self.net.snapshot(serializers)
+        replica = build_reference_network()
+        with self.assertRaises(NetworkError):
+            replica.restore(data)
+        replica.restore(data, serializers)
+        self.assertEqual(3, replica.get_output_port_value('adder', 'sum'))
+        self.assertEqual(1, replica.terminals['X'].value)
+
+    def test_a_failing_serializer_leaves_the_network_unchanged(self):
+        data = self.net.snapshot({('multiplier', 'prod'): json})
+        replica = build_reference_network()
+        replica.set_terminal_values({'X': 5, 'Y': 5})
+        expected = replica.get_output_port_value('formatter', 'msg')
+        with self.assertRaises(ValueError):
+            replica.restore(data, {('multiplier', 'prod'): BrokenSerializer()})
+        self.assertEqual(5, replica.terminals['X'].value)
+        self.assertEqual(10, replica.get_output_port_value('adder', 'sum'))
+        self.assertEqual(expected,
+                         replica.get_output_port_value('formatter', 'msg'))
+
+    def test_truncated_snapshots_are_refused(self):
+        data = self.net.snapshot()
+        for length in (10, len(data) // 2, len(data) - 1):
+            with self.assertRaises(NetworkError) as cm:
+                build_reference_network().restore(data[:length])
+            self.assertEqual('The snapshot is truncated or corrupt.',
+                             str(cm.exception))
+
+    def test_files_with_memory_mapped_buffers(self):
+        blob = Blob(b'0123456789' * 1000)
+        net = build_reference_network()
+        net.set_xfn('multiplier', ConstantXfn(blob))
+        net.set_terminal_values({'X': 1, 'Y': 2})
+        net.get_output_port_value('formatter', 'msg')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'state.snapshot')
+            net.save_snapshot(path)
+            for mmap_arrays in (False, True):
+                replica = build_reference_network()
+                replica.load_snapshot(path, mmap_arrays=mmap_arrays)
+                restored = replica.get_output_port_value('multiplier', 'prod')
+                self.assertEqual(blob, restored)
+                if mmap_arrays:
+                    # A view onto the file, not a copy.
+                    self.assertIsInstance(restored.data, memoryview)
+                del restored, replica
+
+    def test_subscribers_get_the_restored_values(self):
+        replica = build_reference_network()
+        notifications = []
+        replica.subscribe('adder', 'sum',
+                          lambda *args: notifications.append(args))
+        replica.restore(self.net.snapshot())
+        self.assertEqual([('adder', 'sum', 3)], notifications)
+
+
+class Blob:
+    """
+    A value that supports out-of-band pickling, (as NumPy arrays do).
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __reduce_ex__(self, protocol):
+        if protocol >= 5:
+            return Blob, (pickle.PickleBuffer(self.data),)
+        return Blob, (bytes(self.data),)
+
+    def __eq__(self, other):
+        return bytes(self.data) == bytes(other.data)
+
+
+class BrokenSerializer:
+
+    def loads(self, text):
+        raise ValueError('Cannot deserialize.')
+
+
+class ConstantXfn:
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, input_values_dict, output_setter_fn):
+        output_setter_fn('prod', self.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
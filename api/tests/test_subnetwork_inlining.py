@@ -0,0 +1,165 @@
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.network_to_xfn import Network2Xfn
+from dataflow.implementation.reference_network import build_reference_network
+
+_SUPER_SCRIPT = """
+    TERM:A                  > NetworkInANode:A
+    TERM:B                  > NetworkInANode:B
+    NetworkInANode:sentence > shouter:in
+    shouter:out             > DANGLING
+"""
+
+# Two independent branches, so that changing one input should only disturb
+# one of them.
+_BRANCHES_SCRIPT = """
+    TERM:P       > left:in
+    TERM:Q       > right:in
+    TERM:OFFSET  > right:offset
+    left:out     > DANGLING
+    right:out    > DANGLING
+"""
+
+
+class TestSubnetworkInlining(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def test_inlined_network_gives_the_same_answer(self):
+        net = self._build_super_network()
+        Network2Xfn(build_reference_network(), {'A': 'X', 'B': 'Y'},
+                    {('formatter', 'msg'): 'sentence'}).inline_into(
+            net, 'NetworkInANode')
+        net.set_terminal_values({'A': 42, 'B': 3.14})
+        self.assertEqual('sum: 45.14, mult: 131.88',
+                         net.get_output_port_value('NetworkInANode', 'sentence'))
+        self.assertEqual('SUM: 45.14, MULT: 131.88',
+                         net.get_output_port_value('shouter', 'out'))
+        self.assertIn('NetworkInANode.adder', net.nodes)
+
+    def test_only_the_affected_inner_nodes_are_recomputed(self):
+        net = NetworkFactory("""
+            TERM:A     > wrapper:a
+            TERM:B     > wrapper:b
+            wrapper:l  > DANGLING
+            wrapper:r  > DANGLING
+        """).build()
+        net.inline_subnetwork(
+            'wrapper', self._build_branches_network(), {'a': 'P', 'b': 'Q'},
+            {('left', 'out'): 'l', ('right', 'out'): 'r'})
+        net.set_terminal_values({'A': 1, 'B': 2})
+        self.assertEqual([1, 12], net.get_output_port_values(
+            [('wrapper', 'l'), ('wrapper', 'r')]))
+        self.assertEqual(['left', 'right'], sorted(self.calls))
+
+        self.calls.clear()
+        net.set_terminal_value('A', 5)
+        self.assertEqual([5, 12], net.get_output_port_values(
+            [('wrapper', 'l'), ('wrapper', 'r')]))
+        self.assertEqual(['left'], self.calls)
+
+    def test_unmapped_inner_terminals_are_copied_with_a_prefix(self):
+        net = NetworkFactory("""
+            TERM:A     > wrapper:a
+            TERM:B     > wrapper:b
+            wrapper:r  > DANGLING
+        """).build()
+        net.inline_subnetwork(
+            'wrapper', self._build_branches_network(), {'a': 'P', 'b': 'Q'},
+            {('right', 'out'): 'r'}, prefix='w')
+        net.set_terminal_values({'A': 1, 'B': 2})
+        self.assertEqual(12, net.get_output_port_value('wrapper', 'r'))
+        net.set_terminal_value('w.OFFSET', 100)
+        self.assertEqual(102, net.get_output_port_value('wrapper', 'r'))
+
+    def test_nested_wrappers_are_flattened_too(self):
+        middle = NetworkFactory("""
+            TERM:M         > inner_wrapper:x
+            inner_wrapper:y > DANGLING
+        """).build()
+        innermost = self._build_branches_network()
+        innermost.set_terminal_value('P', 0)
+        middle.set_xfn('inner_wrapper', Network2Xfn(
+            innermost, {'x': 'Q'}, {('right', 'out'): 'y'}).xfn)
+
+        net = NetworkFactory("""
+            TERM:A     > wrapper:a
+            wrapper:r  > DANGLING
+        """).build()
+        net.inline_subnetwork('wrapper', middle, {'a': 'M'},
+                              {('inner_wrapper', 'y'): 'r'})
+        self.assertIn('wrapper.inner_wrapper.right', net.nodes)
+        net.set_terminal_value('A', 3)
+        self.assertEqual(13, net.get_output_port_value('wrapper', 'r'))
+
+    def test_evaluated_outputs_are_recomputed_after_inlining(self):
+        net = self._build_super_network()
+        wrapper = Network2Xfn(build_reference_network(), {'A': 'X', 'B': 'Y'},
+                              {('formatter', 'msg'): 'sentence'})
+        net.set_xfn('NetworkInANode', lambda i, o: o('sentence', 'stale'))
+        net.set_terminal_values({'A': 42, 'B': 3.14})
+        self.assertEqual('STALE', net.get_output_port_value('shouter', 'out'))
+        wrapper.inline_into(net, 'NetworkInANode')
+        self.assertEqual('SUM: 45.14, MULT: 131.88',
+                         net.get_output_port_value('shouter', 'out'))
+
+    def test_name_clashes_are_refused(self):
+        net = self._build_super_network()
+        net.register_node('NetworkInANode.adder')
+        with self.assertRaises(NetworkError):
+            Network2Xfn(build_reference_network(), {'A': 'X', 'B': 'Y'},
+                        {('formatter', 'msg'): 'sentence'}).inline_into(
+                net, 'NetworkInANode')
+
+    def test_unknown_node_names_are_refused(self):
+        net = self._build_super_network()
+        with self.assertRaises(NetworkError) as cm:
+            net.inline_subnetwork('fibble', build_reference_network(),
+                                  {'A': 'X', 'B': 'Y'},
+                                  {('formatter', 'msg'): 'sentence'})
+        self.assertEqual('Unknown node name: <fibble>', str(cm.exception))
+
+    def test_bad_mappings_are_refused_before_anything_changes(self):
+        for input_mapping, output_mapping in (
+                ({'A': 'X', 'B': 'Z'}, {('formatter', 'msg'): 'sentence'}),
+                ({'A': 'X', 'B': 'Y'}, {('formater', 'msg'): 'sentence'}),
+                ({'A': 'X', 'B': 'Y'}, {('formatter', 'mgs'): 'sentence'})):
+            net = self._build_super_network()
+            node_names = set(net.nodes)
+            with self.assertRaises(NetworkError):
+                net.inline_subnetwork('NetworkInANode',
+                                      build_reference_network(),
+                                      input_mapping, output_mapping)
+            self.assertEqual(node_names, set(net.nodes))
+            self.assertEqual({'A', 'B'}, set(net.terminals))
+            self.assertEqual(
+                {'A', 'B'},
+                set(net.nodes['NetworkInANode'].input_ports))
+
+    def _build_super_network(self):
+        net = NetworkFactory(_SUPER_SCRIPT).build()
+        net.set_xfn('shouter', lambda i, o: o('out', i['in'].upper()))
+        return net
+
+    def _build_branches_network(self):
+        net = NetworkFactory(_BRANCHES_SCRIPT).build()
+        net.set_xfn('left', self._left_xfn)
+        net.set_xfn('right', self._right_xfn)
+        net.set_terminal_value('OFFSET', 10)
+        return net
+
+    def _left_xfn(self, input_values_dict, output_setter_fn):
+        self.calls.append('left')
+        output_setter_fn('out', input_values_dict['in'])
+
+    def _right_xfn(self, input_values_dict, output_setter_fn):
+        self.calls.append('right')
+        output_setter_fn('out', input_values_dict['in'] +
+                         input_values_dict['offset'])
+
+
+if __name__ == '__main__':
+    unittest.main()
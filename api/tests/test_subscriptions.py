@@ -0,0 +1,133 @@
+import operator
+import unittest
+
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestSubscriptions(unittest.TestCase):
+
+    def setUp(self):
+        self.net = build_reference_network()
+        self.notifications = []
+
+    def test_subscribed_output_is_pushed_after_a_write(self):
+        self.net.set_terminal_value('X', 1)
+        self.net.subscribe('adder', 'sum', self._record)
+        self.net.set_terminal_value('Y', 2)
+        self.assertEqual([('adder', 'sum', 3)], self.notifications)
+        # Only the subscribed cone was evaluated.
+        self.assertFalse(self.net.nodes['adder'].is_dirty)
+        self.assertTrue(self.net.nodes['multiplier'].is_dirty)
+        self.assertTrue(self.net.nodes['formatter'].is_dirty)
+
+    def test_a_transaction_is_notified_once(self):
+        self.net.subscribe('adder', 'sum', self._record)
+        with self.net.terminal_transaction():
+            self.net.set_terminal_value('X', 1)
+            self.net.set_terminal_value('Y', 2)
+            self.net.set_terminal_value('X', 10)
+        self.assertEqual([('adder', 'sum', 12)], self.notifications)
+
+    def test_unchanged_values_are_not_notified_with_a_comparator(self):
+        self.net.set_output_port_comparator('adder', 'sum', operator.eq)
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        self.net.get_output_port_value('adder', 'sum')
+        self.net.subscribe('adder', 'sum', self._record)
+        self.net.set_terminal_values({'X': 2, 'Y': 1})
+        self.assertEqual([], self.notifications)
+        self.net.set_terminal_value('X', 5)
+        self.assertEqual([('adder', 'sum', 6)], self.notifications)
+
+    def test_cancel_stops_notifications(self):
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        subscription = self.net.subscribe('adder', 'sum', self._record)
+        subscription.cancel()
+        self.net.set_terminal_value('X', 5)
+        self.assertEqual([], self.notifications)
+
+    def test_min_interval_holds_back_changes_until_flushed(self):
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        self.net.subscribe('adder', 'sum', self._record, min_interval=3600)
+        self.net.set_terminal_value('X', 5)
+        self.net.set_terminal_value('X', 6)
+        self.net.set_terminal_value('X', 7)
+        self.assertEqual([('adder', 'sum', 7)], self.notifications)
+        self.net.set_terminal_value('X', 8)
+        self.net.set_terminal_value('X', 9)
+        self.assertEqual(1, len(self.notifications))
+        self.net.flush_notifications()
+        self.assertEqual([('adder', 'sum', 7), ('adder', 'sum', 11)],
+                         self.notifications)
+
+    def test_nothing_is_pushed_until_the_network_is_complete(self):
+        self.net.subscribe('formatter', 'msg', self._record)
+        self.net.set_terminal_value('X', 42)
+        self.assertEqual([], self.notifications)
+        self.net.set_terminal_value('Y', 3.14)
+        self.assertEqual(
+            [('formatter', 'msg', 'sum: 45.14, mult: 131.88')],
+            self.notifications)
+
+    def test_callbacks_may_write_to_terminals(self):
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+
+        def feed_back(node_name, port_name, value):
+            self.notifications.append(value)
+            if value < 10:
+                self.net.set_terminal_value('X', value)
+
+        self.net.subscribe('adder', 'sum', feed_back)
+        self.net.set_terminal_value('X', 2)
+        self.assertEqual([4, 6, 8, 10], self.notifications)
+
+    def test_callback_errors_come_out_of_the_write(self):
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+
+        def failing_callback(node_name, port_name, value):
+            raise ValueError('Callback failed.')
+
+        self.net.subscribe('adder', 'sum', failing_callback)
+        self.net.subscribe('multiplier', 'prod', self._record)
+        with self.assertRaises(ValueError):
+            self.net.set_terminal_value('X', 5)
+        # The value was written, and the other subscriber notified.
+        self.assertEqual(5, self.net.terminals['X'].value)
+        self.assertEqual([('multiplier', 'prod', 10)], self.notifications)
+
+    def test_callback_errors_do_not_stop_the_passes_callbacks_ask_for(self):
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+
+        def writing_then_failing_callback(node_name, port_name, value):
+            if self.net.terminals['Y'].value != 10:
+                self.net.set_terminal_value('Y', 10)
+            raise ValueError('Callback failed.')
+
+        self.net.subscribe('adder', 'sum', writing_then_failing_callback)
+        self.net.subscribe('multiplier', 'prod', self._record)
+        with self.assertRaises(ValueError):
+            self.net.set_terminal_value('X', 5)
+        self.assertEqual([('multiplier', 'prod', 50)], self.notifications)
+
+    def test_xfn_errors_come_out_of_the_write(self):
+        self.net.set_terminal_values({'X': 1, 'Y': 2})
+        self.net.subscribe('adder', 'sum', self._record)
+        self.net.set_xfn('adder', failing_xfn)
+        with self.assertRaises(ValueError):
+            self.net.set_terminal_value('X', 5)
+        self.assertEqual([], self.notifications)
+        # Notified once the output can be evaluated again.
+        self.net.set_xfn('adder', lambda inputs, setter: setter(
+            'sum', inputs['in_1'] + inputs['in_2']))
+        self.net.set_terminal_value('X', 6)
+        self.assertEqual([('adder', 'sum', 8)], self.notifications)
+
+    def _record(self, node_name, port_name, value):
+        self.notifications.append((node_name, port_name, value))
+
+
+def failing_xfn(input_values_dict, output_setter_fn):
+    raise ValueError('Failed.')
+
+
+if __name__ == '__main__':
+    unittest.main()
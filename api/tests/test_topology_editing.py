@@ -0,0 +1,148 @@
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+
+
+class TestTopologyEditing(unittest.TestCase):
+    """
+    Tests that nodes, terminals, ports and edges can be removed and rewired in
+    a live network, dirtying only what is downstream of the change.
+    """
+
+    def setUp(self):
+        # Two independent branches, which come together in D.
+        self.net = NetworkFactory("""
+            TERM:X   > A:in
+            TERM:Y   > B:in
+            TERM:Z   > E:in
+            A:out    > C:in
+            B:out    > D:b
+            C:out    > D:c
+            E:out    > DANGLING
+            D:out    > DANGLING
+        """).build()
+        self.calls = []
+        for node_name in ('A', 'B', 'C', 'E'):
+            self.net.set_xfn(node_name, self._make_increment(node_name))
+        self.net.set_xfn('D', self._make_sum('D'))
+        self.net.set_terminal_values({'X': 0, 'Y': 10, 'Z': 100})
+        # 0+1+1 + 10+1
+        self.assertEqual(13, self.net.get_output_port_value('D', 'out'))
+        self.assertEqual(101, self.net.get_output_port_value('E', 'out'))
+        self.plan = self.net.evaluation_plan()
+        self.calls = []
+
+    def test_rewire_dirties_only_downstream(self):
+        self.net.rewire_input_to_terminal('C', 'in', 'Z')
+        self.assertEqual(['C', 'D'], self._dirty_node_names())
+        self.assertEqual(112, self.net.get_output_port_value('D', 'out'))
+        self.assertEqual(['C', 'D'], self.calls)
+        # The plan was updated, not recompiled.
+        self.assertIs(self.plan, self.net.evaluation_plan())
+        self.assertEqual(['C', 'E'], [n.name for n in
+                                      self.plan.downstream_nodes[
+                                          self.net.terminals['Z']]])
+
+    def test_rewire_to_an_output(self):
+        self.net.rewire_input_to_output('C', 'in', 'E', 'out')
+        self.assertEqual(113, self.net.get_output_port_value('D', 'out'))
+        self.assertEqual(['C', 'D'], self.calls)
+        self.assertEqual((), self.plan.downstream_nodes[self.net.nodes['A']])
+        order = self.plan.order
+        self.assertLess(order.index(self.net.nodes['E']),
+                        order.index(self.net.nodes['C']))
+
+    def test_rewire_is_not_cut_off_by_coincident_versions(self):
+        # X and Y have both been written once, so have the same version.
+        self.net.rewire_input_to_terminal('A', 'in', 'Y')
+        self.assertEqual(23, self.net.get_output_port_value('D', 'out'))
+
+    def test_rewire_that_makes_a_cycle_is_refused(self):
+        with self.assertRaises(NetworkError) as cm:
+            self.net.rewire_input_to_output('A', 'in', 'D', 'out')
+        self.assertEqual(
+            'Cannot add an edge from <D> to <A>, because it would make a '
+            'cycle.', str(cm.exception))
+        self.assertEqual([], self._dirty_node_names())
+        self.assertIs(self.net.terminals['X'],
+                      self.net.nodes['A'].input_ports['in'].source)
+
+    def test_rewire_that_makes_a_cycle_is_refused_before_evaluation(self):
+        net = NetworkFactory("""
+            TERM:X   > A:in
+            A:out    > B:in
+            B:out    > DANGLING
+        """).build()
+        with self.assertRaises(NetworkError):
+            net.rewire_input_to_output('A', 'in', 'B', 'out')
+        self.assertIs(net.terminals['X'], net.edges[0].source)
+        for node_name in ('A', 'B'):
+            net.set_xfn(node_name, self._make_increment(node_name))
+        net.set_terminal_value('X', 0)
+        self.assertEqual(2, net.get_output_port_value('B', 'out'))
+
+    def test_remove_node(self):
+        self.net.remove_node('B')
+        self.assertNotIn('B', self.net.nodes)
+        self.assertEqual(['D'], self._dirty_node_names())
+        self.net.remove_input_port('D', 'b')
+        self.assertEqual(2, self.net.get_output_port_value('D', 'out'))
+        self.assertEqual(['D'], self.calls)
+        self.assertNotIn(self.net.nodes['D'], self.plan.downstream_nodes[
+            self.net.terminals['Y']])
+
+    def test_remove_terminal_leaves_inputs_unfed(self):
+        self.net.remove_terminal('Y')
+        self.assertNotIn('Y', self.net.terminals)
+        self.assertEqual(['B', 'D'], self._dirty_node_names())
+        with self.assertRaises(RuntimeError):
+            self.net.get_output_port_value('D', 'out')
+        self.net.rewire_input_to_terminal('B', 'in', 'Z')
+        self.assertEqual(103, self.net.get_output_port_value('D', 'out'))
+
+    def test_remove_edges(self):
+        self.net.remove_terminal_edge('X', 'A', 'in')
+        self.assertIsNone(self.net.nodes['A'].input_ports['in'].source)
+        self.net.remove_output_to_input_edge('B', 'out', 'D', 'b')
+        self.assertEqual(['A', 'C', 'D'], self._dirty_node_names())
+        self.assertEqual(101, self.net.get_output_port_value('E', 'out'))
+        with self.assertRaises(NetworkError) as cm:
+            self.net.remove_terminal_edge('X', 'A', 'in')
+        self.assertEqual('There is no edge from <X> to <A:in>.',
+                         str(cm.exception))
+
+    def test_remove_output_port_cancels_subscriptions(self):
+        notifications = []
+        self.net.subscribe('E', 'out', lambda *args: notifications.append(args))
+        self.net.remove_output_port('E', 'out')
+        self.net.set_terminal_value('Z', 5)
+        self.assertEqual([], notifications)
+
+    def test_unknown_names(self):
+        with self.assertRaises(NetworkError):
+            self.net.remove_node('nope')
+        with self.assertRaises(NetworkError):
+            self.net.remove_terminal('nope')
+        with self.assertRaises(NetworkError):
+            self.net.rewire_input_to_output('C', 'in', 'A', 'nope')
+
+    def _dirty_node_names(self):
+        return sorted(name for name, node in self.net.nodes.items()
+                      if node.is_dirty)
+
+    def _make_increment(self, node_name):
+        def xfn(input_values_dict, output_setter_fn):
+            self.calls.append(node_name)
+            output_setter_fn('out', input_values_dict['in'] + 1)
+        return xfn
+
+    def _make_sum(self, node_name):
+        def xfn(input_values_dict, output_setter_fn):
+            self.calls.append(node_name)
+            output_setter_fn('out', sum(input_values_dict.values()))
+        return xfn
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+def vectorized_xfn(xfn):
+    """
+    A decorator that marks a transfer function as able to evaluate a whole
+    column of scenarios in one call, during a Network.sweep(). Like this:
+
+        @vectorized_xfn
+        def adder_xfn(input_values_dict, output_setter_fn):
+            output_setter_fn('sum', input_values_dict['in_1'] +
+                                    input_values_dict['in_2'])
+
+    During a sweep, such a function is called just once. It receives, for each
+    input that varies between the scenarios, the whole column of its values,
+    (the list or NumPy array given to the sweep, or produced upstream), and
+    for the other inputs, their single value. It must set each output port
+    to a column with one value per scenario. With NumPy arrays, ordinary
+    arithmetic like the above often does this already.
+
+    Outside a sweep, it is called with single values as usual. (It can also be
+    used on methods in a class body).
+    """
+    xfn.accepts_columns = True
+    return xfn
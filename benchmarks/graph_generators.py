@@ -0,0 +1,125 @@
+"""
+Generators of synthetic networks, of any size, for benchmarking.
+
+Each of the *_script() functions returns a script for the NetworkFactory, in
+which every node has one or more input ports (called in_0, in_1...) and a
+single output port called *out*, and the terminals are called T0, T1....
+Use set_sum_xfns() to give every node of the resulting network a transfer
+function, (which outputs the sum of its inputs).
+"""
+import random
+
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.network_to_xfn import Network2Xfn
+
+
+def chain_script(n_nodes):
+    """
+    A daisy-chain of nodes, fed by a single terminal.
+    """
+    lines = ['TERM:T0 > n0:in_0']
+    for i in range(1, n_nodes):
+        lines.append('n{}:out > n{}:in_0'.format(i - 1, i))
+    lines.append('n{}:out > DANGLING'.format(n_nodes - 1))
+    return '\n'.join(lines)
+
+
+def fan_out_script(n_nodes):
+    """
+    A single root node, (fed by a single terminal), whose output feeds every
+    one of the other nodes.
+    """
+    lines = ['TERM:T0 > root:in_0', 'root:out > n1:in_0']
+    for i in range(2, n_nodes):
+        lines.append('         > n{}:in_0'.format(i))
+    for i in range(1, n_nodes):
+        lines.append('n{}:out > DANGLING'.format(i))
+    return '\n'.join(lines)
+
+
+def diamonds_script(n_nodes):
+    """
+    A ladder of diamonds, (each a node feeding a left and a right node, which
+    both feed the next node), with roughly n_nodes nodes in total. The number
+    of distinct paths through it doubles with every rung.
+    """
+    n_rungs = max(1, (n_nodes - 1) // 3)
+    lines = ['TERM:T0 > d0:in_0']
+    for i in range(n_rungs):
+        lines.append('d{}:out > l{}:in_0'.format(i, i))
+        lines.append('        > r{}:in_0'.format(i))
+        lines.append('l{}:out > d{}:in_0'.format(i, i + 1))
+        lines.append('r{}:out > d{}:in_1'.format(i, i + 1))
+    lines.append('d{}:out > DANGLING'.format(n_rungs))
+    return '\n'.join(lines)
+
+
+def layered_dag_script(n_nodes, width=None, fan_in=3, n_terminals=None,
+                       seed=0):
+    """
+    A random DAG of n_nodes nodes arranged in layers of the given width, in
+    which every node takes (up to) fan_in inputs from randomly chosen nodes
+    in the layer before. The first layer is fed from randomly chosen terminals.
+    The same seed always produces the same script.
+    """
+    rng = random.Random(seed)
+    width = width or max(1, int(n_nodes ** 0.5))
+    n_terminals = n_terminals or width
+    lines = []
+    layers = [['n{}'.format(i) for i in range(start, min(start + width,
+                                                           n_nodes))]
+              for start in range(0, n_nodes, width)]
+    for name in layers[0]:
+        lines.append('TERM:T{} > {}:in_0'.format(
+            rng.randrange(n_terminals), name))
+    for previous, layer in zip(layers, layers[1:]):
+        for name in layer:
+            sources = rng.sample(previous, min(fan_in, len(previous)))
+            for port_index, source in enumerate(sources):
+                lines.append('{}:out > {}:in_{}'.format(
+                    source, name, port_index))
+    for name in layers[-1]:
+        lines.append('{}:out > DANGLING'.format(name))
+    return '\n'.join(lines)
+
+
+def set_sum_xfns(net):
+    """
+    Give every node in the network the sum_xfn.
+    """
+    for name in net.nodes:
+        net.set_xfn(name, sum_xfn)
+
+
+def sum_xfn(input_values_dict, output_setter_fn):
+    output_setter_fn('out', sum(input_values_dict.values()))
+
+
+def hierarchical_network(depth, nodes_per_level=3):
+    """
+    A network-of-networks nested depth levels deep using Network2Xfn. Every
+    level is a chain of nodes_per_level nodes, the middle one of which wraps
+    the level below, (except at the bottom level). Returns the top level
+    network, with its xfns set, whose single terminal is T0, and whose last
+    node is called n<nodes_per_level - 1>.
+    """
+    net = NetworkFactory(chain_script(nodes_per_level)).build()
+    set_sum_xfns(net)
+    last = 'n{}'.format(nodes_per_level - 1)
+    for _ in range(depth - 1):
+        inner = net
+        net = NetworkFactory(chain_script(nodes_per_level)).build()
+        set_sum_xfns(net)
+        net2xfn = Network2Xfn(inner, {'in_0': 'T0'}, {(last, 'out'): 'out'})
+        net.set_xfn('n{}'.format(nodes_per_level // 2), net2xfn.xfn)
+    return net
+
+
+# The generators of flat scripts, keyed on name.
+SCRIPT_GENERATORS = {
+    'chain': chain_script,
+    'fan_out': fan_out_script,
+    'diamonds': diamonds_script,
+    'layered_dag': layered_dag_script,
+}
@@ -0,0 +1,245 @@
+"""
+Measures how the costs of building and operating networks scale with their
+size, using the synthetic networks from graph_generators.
+
+Usage (from the directory containing the dataflow package):
+
+    python -m dataflow.benchmarks.run_benchmarks --sizes 10 100 1000 \\
+        --output this_revision.json --compare last_revision.json
+
+For every kind of graph and every size it measures:
+
+    build_seconds       NetworkFactory(script).build()
+    cold_read_seconds   The first read of all the sink outputs, (including
+                        compiling the evaluation plan).
+    write_seconds       A set_terminal_value() on a fully clean network.
+    recompute_seconds   Reading the sink outputs after that write.
+    warm_read_seconds   Reading them again, with nothing dirty.
+    peak_memory_bytes   The peak memory allocated while building and reading.
+
+The results are printed, and optionally saved as JSON, so that they can be
+compared with those from another revision.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from time import perf_counter
+
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.benchmarks.graph_generators import SCRIPT_GENERATORS
+from dataflow.benchmarks.graph_generators import hierarchical_network
+from dataflow.benchmarks.graph_generators import set_sum_xfns
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+
+def benchmark_script(graph, size, script, repeat=1):
+    """
+    The measurements for one script, (the best of repeat attempts each).
+    """
+    best = {}
+    for _ in range(repeat):
+        for key, value in _measure_script_once(script).items():
+            best[key] = min(value, best.get(key, value))
+    best['peak_memory_bytes'] = _peak_memory(lambda: _build(script), _sinks)
+    return dict(graph=graph, size=size, **best)
+
+
+def benchmark_hierarchy(depth, repeat=1):
+    """
+    The read measurements for a network-of-networks nested depth deep.
+    """
+    best = {}
+    for _ in range(repeat):
+        started = perf_counter()
+        net = hierarchical_network(depth)
+        build_seconds = perf_counter() - started
+        measured = _measure_operation(net, _HIERARCHY_SINKS)
+        measured['build_seconds'] = build_seconds
+        for key, value in measured.items():
+            best[key] = min(value, best.get(key, value))
+    best['peak_memory_bytes'] = _peak_memory(
+        lambda: hierarchical_network(depth), lambda net: _HIERARCHY_SINKS)
+    return dict(graph='hierarchy', size=depth, **best)
+
+
+def run(sizes, graphs=None, repeat=1):
+    """
+    All the measurements, for the given sizes and kinds of graph.
+    """
+    graphs = graphs or list(SCRIPT_GENERATORS) + ['hierarchy']
+    results = []
+    for graph in graphs:
+        depths = set()
+        for size in sizes:
+            if graph == 'hierarchy':
+                # Each level of the hierarchy is three nodes, and the depth is
+                # limited by the Python stack, (each level's xfn evaluates
+                # the level below from inside the one above).
+                depth = max(1, min(size // 3, _MAX_HIERARCHY_DEPTH))
+                if depth not in depths:
+                    depths.add(depth)
+                    results.append(benchmark_hierarchy(depth, repeat))
+            else:
+                script = SCRIPT_GENERATORS[graph](size)
+                results.append(benchmark_script(graph, size, script, repeat))
+    return {
+        'revision': _git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+
+def compare(current, previous):
+    """
+    Lines of text comparing the current results with previous ones, giving
+    the ratio current/previous for every measurement found in both.
+    """
+    previous_by_key = {(r['graph'], r['size']): r
+                       for r in previous['results']}
+    lines = ['Compared with revision {}:'.format(previous.get('revision'))]
+    for result in current['results']:
+        old = previous_by_key.get((result['graph'], result['size']))
+        if old is None:
+            continue
+        ratios = ['{}={:.2f}'.format(key, result[key] / old[key])
+                  for key in _MEASUREMENTS if old.get(key)]
+        lines.append('{:12} {:>7}  {}'.format(
+            result['graph'], result['size'], ' '.join(ratios)))
+    return lines
+
+
+def format_results(results):
+    lines = ['{:12} {:>7}  {}'.format('graph', 'size', ' '.join(
+        '{:>18}'.format(key) for key in _MEASUREMENTS))]
+    for result in results['results']:
+        lines.append('{:12} {:>7}  {}'.format(
+            result['graph'], result['size'], ' '.join(
+                '{:>18.6g}'.format(result.get(key, float('nan')))
+                for key in _MEASUREMENTS)))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(DEFAULT_SIZES))
+    parser.add_argument('--graphs', nargs='+',
+                        choices=list(SCRIPT_GENERATORS) + ['hierarchy'])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help='Save the results to this file.')
+    parser.add_argument('--compare', help='Compare with results saved in '
+                        'this file.')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.graphs, args.repeat)
+    print('\n'.join(format_results(results)))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print('\n'.join(compare(results, json.load(f))))
+
+
+#---------------------------------------------------------------------------
+# Private below.
+#---------------------------------------------------------------------------
+
+_MAX_HIERARCHY_DEPTH = 50
+_HIERARCHY_SINKS = [('n2', 'out')]
+
+_MEASUREMENTS = ('build_seconds', 'cold_read_seconds', 'write_seconds',
+                 'recompute_seconds', 'warm_read_seconds', 'peak_memory_bytes')
+
+
+def _build(script):
+    net = NetworkFactory(script).build()
+    set_sum_xfns(net)
+    return net
+
+
+def _measure_script_once(script):
+    started = perf_counter()
+    net = NetworkFactory(script).build()
+    build_seconds = perf_counter() - started
+    set_sum_xfns(net)
+    measured = _measure_operation(net, _sinks(net))
+    measured['build_seconds'] = build_seconds
+    return measured
+
+
+def _measure_operation(net, sinks):
+    net.set_terminal_values({name: 1 for name in net.terminals})
+
+    started = perf_counter()
+    net.get_output_port_values(sinks)
+    cold_read_seconds = perf_counter() - started
+
+    # Not every terminal of a random DAG need be used, so write to one that
+    # is known to be.
+    terminal = sorted(net.terminals)[0]
+    started = perf_counter()
+    net.set_terminal_value(terminal, 2)
+    write_seconds = perf_counter() - started
+
+    started = perf_counter()
+    net.get_output_port_values(sinks)
+    recompute_seconds = perf_counter() - started
+
+    started = perf_counter()
+    net.get_output_port_values(sinks)
+    warm_read_seconds = perf_counter() - started
+
+    return {
+        'cold_read_seconds': cold_read_seconds,
+        'write_seconds': write_seconds,
+        'recompute_seconds': recompute_seconds,
+        'warm_read_seconds': warm_read_seconds,
+    }
+
+
+def _peak_memory(make_network, sinks_fn):
+    """
+    The peak memory allocated while making a network and reading its sinks.
+    """
+    tracemalloc.start()
+    try:
+        net = make_network()
+        net.set_terminal_values({name: 1 for name in net.terminals})
+        net.get_output_port_values(sinks_fn(net))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _sinks(net):
+    """
+    The (node_name, port_name) tuples of all the output ports not routed
+    anywhere.
+    """
+    return [(node.name, port.name)
+            for node in net.nodes.values()
+            for port in node.output_ports.values()
+            if not net.edge_index.edges_from(port)]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.benchmarks import run_benchmarks
+from dataflow.benchmarks.graph_generators import SCRIPT_GENERATORS
+from dataflow.benchmarks.graph_generators import hierarchical_network
+from dataflow.benchmarks.graph_generators import set_sum_xfns
+
+
+class TestGraphGenerators(unittest.TestCase):
+
+    def test_chain_sums_through(self):
+        net = self._build('chain', 20)
+        self.assertEqual(20, len(net.nodes))
+        net.set_terminal_value('T0', 5)
+        self.assertEqual(5, net.get_output_port_value('n19', 'out'))
+
+    def test_fan_out_feeds_every_leaf(self):
+        net = self._build('fan_out', 10)
+        self.assertEqual(10, len(net.nodes))
+        net.set_terminal_value('T0', 3)
+        self.assertEqual(
+            [3] * 9,
+            net.get_output_port_values([('n{}'.format(i), 'out')
+                                        for i in range(1, 10)]))
+
+    def test_diamonds_double_every_rung(self):
+        net = self._build('diamonds', 10)
+        net.set_terminal_value('T0', 1)
+        self.assertEqual(8, net.get_output_port_value('d3', 'out'))
+
+    def test_layered_dag_is_reproducible_and_evaluates(self):
+        generate = SCRIPT_GENERATORS['layered_dag']
+        self.assertEqual(generate(50, seed=7), generate(50, seed=7))
+        net = self._build('layered_dag', 50)
+        self.assertEqual(50, len(net.nodes))
+        net.set_terminal_values({name: 0 for name in net.terminals})
+        outputs = net.get_output_port_values(run_benchmarks._sinks(net))
+        self.assertEqual({0}, set(outputs))
+
+    def test_hierarchical_network_evaluates_through_every_level(self):
+        net = hierarchical_network(4)
+        net.set_terminal_value('T0', 2)
+        self.assertEqual(2, net.get_output_port_value('n2', 'out'))
+
+    def _build(self, graph, size):
+        net = NetworkFactory(SCRIPT_GENERATORS[graph](size)).build()
+        set_sum_xfns(net)
+        return net
+
+
+class TestRunBenchmarks(unittest.TestCase):
+
+    def test_run_measures_every_graph_at_every_size(self):
+        results = run_benchmarks.run([6, 12])
+        measured = [(r['graph'], r['size']) for r in results['results']]
+        self.assertEqual(2 * (len(SCRIPT_GENERATORS) + 1), len(measured))
+        for result in results['results']:
+            for key in run_benchmarks._MEASUREMENTS:
+                self.assertGreaterEqual(result[key], 0, msg=key)
+        self.assertIn('timestamp', results)
+
+    def test_compare_gives_ratios_for_matching_results(self):
+        current = run_benchmarks.run([6], ['chain'])
+        previous = {'revision': 'abc', 'results': [
+            dict(current['results'][0], build_seconds=
+                 current['results'][0]['build_seconds'] / 2)]}
+        lines = run_benchmarks.compare(current, previous)
+        self.assertIn('abc', lines[0])
+        self.assertIn('build_seconds=2.00', lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
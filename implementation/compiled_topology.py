@@ -0,0 +1,266 @@
+import gc
+import marshal
+import sys
+from array import array
+
+
+from dataflow.api.network import Network
+from dataflow.implementation.edge import Edge
+from dataflow.implementation.input_port import InputPort
+from dataflow.implementation.node import Node
+from dataflow.implementation.output_port import OutputPort
+from dataflow.implementation.terminal import Terminal
+
+
+class CompiledTopology:
+    """
+    A Network's topology flattened into tables of names and integer ids, which
+    can be serialized compactly with to_bytes(), and loaded again with
+    from_bytes(). Building a Network from it creates the graph objects in bulk,
+    without parsing anything, and without the checks the registration API
+    makes, (it was checked when it was first built).
+
+    The tables are:
+
+        node_names        The node names, (a node's id is its index).
+        terminal_names    The terminal names, (ditto).
+        port_names        The distinct port names, (ditto).
+        input_ports       (node id, port name id) pairs, flattened into one
+                          array, (a port's id is the index of its pair).
+        output_ports      Ditto.
+        edge_sources      For every edge, the id of the output port it leaves,
+                          or -1 - the terminal id for a terminal.
+        edge_dests        For every edge, the id of the input port it feeds.
+
+    Only the topology is captured, not transfer functions or values.
+    """
+
+    def __init__(self, node_names, terminal_names, port_names, input_ports,
+                 output_ports, edge_sources, edge_dests):
+        self.node_names = node_names
+        self.terminal_names = terminal_names
+        self.port_names = port_names
+        self.input_ports = input_ports
+        self.output_ports = output_ports
+        self.edge_sources = edge_sources
+        self.edge_dests = edge_dests
+
+    @classmethod
+    def from_network(cls, net):
+        node_ids = {name: i for i, name in enumerate(net.nodes)}
+        terminal_ids = {name: i for i, name in enumerate(net.terminals)}
+        port_name_ids = {}
+        input_ports = array('i')
+        output_ports = array('i')
+        input_port_ids = {}
+        output_port_ids = {}
+        for node in net.nodes.values():
+            node_id = node_ids[node.name]
+            for table, ids, ports in (
+                    (input_ports, input_port_ids, node.input_ports),
+                    (output_ports, output_port_ids, node.output_ports)):
+                for port in ports.values():
+                    ids[port] = len(table) // 2
+                    table.append(node_id)
+                    table.append(port_name_ids.setdefault(
+                        port.name, len(port_name_ids)))
+        edge_sources = array('i')
+        edge_dests = array('i')
+        for edge in net.edges:
+            if isinstance(edge.source, Terminal):
+                edge_sources.append(-1 - terminal_ids[edge.source.name])
+            else:
+                edge_sources.append(output_port_ids[edge.source])
+            edge_dests.append(input_port_ids[edge.dest])
+        return cls(list(net.nodes), list(net.terminals), list(port_name_ids),
+                   input_ports, output_ports, edge_sources, edge_dests)
+
+    def to_bytes(self):
+        payload = marshal.dumps((
+            self.node_names, self.terminal_names, self.port_names,
+            self.input_ports.tobytes(), self.output_ports.tobytes(),
+            self.edge_sources.tobytes(), self.edge_dests.tobytes()))
+        return _MAGIC + payload
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        The CompiledTopology serialized in data by to_bytes(). Raises
+        ValueError if data is not in the current format.
+        """
+        if not data.startswith(_MAGIC):
+            raise ValueError('Not a compiled network (or an old format, or '
+                             'one compiled by a different Python version).')
+        try:
+            (node_names, terminal_names, port_names, input_ports,
+             output_ports, edge_sources, edge_dests) = marshal.loads(
+                data[len(_MAGIC):])
+            topology = cls(node_names, terminal_names, port_names,
+                           _to_array(input_ports), _to_array(output_ports),
+                           _to_array(edge_sources), _to_array(edge_dests))
+            topology._validate()
+        except (EOFError, TypeError, ValueError) as e:
+            raise ValueError('Corrupt compiled network: {}'.format(e))
+        return topology
+
+    def build_network(self):
+        """
+        A new Network with this topology.
+        """
+        # None of the objects created can be garbage yet, so spare the
+        # collector from repeatedly scanning them as they pile up.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._build_network()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _validate(self):
+        """
+        Raises ValueError unless the tables are of the right types, and every
+        id in them is in range, (so that building the network cannot fail).
+        """
+        for names in (self.node_names, self.terminal_names, self.port_names):
+            if type(names) is not list or not all(
+                    type(name) is str for name in names):
+                raise ValueError('The names must be lists of strings.')
+        if len(self.input_ports) % 2 or len(self.output_ports) % 2:
+            raise ValueError('The port tables must hold pairs.')
+        if len(self.edge_sources) != len(self.edge_dests):
+            raise ValueError('The edge tables differ in length.')
+        for ids, lowest, limit in (
+                (self.input_ports[0::2], 0, len(self.node_names)),
+                (self.input_ports[1::2], 0, len(self.port_names)),
+                (self.output_ports[0::2], 0, len(self.node_names)),
+                (self.output_ports[1::2], 0, len(self.port_names)),
+                (self.edge_sources, -len(self.terminal_names),
+                 len(self.output_ports) // 2),
+                (self.edge_dests, 0, len(self.input_ports) // 2)):
+            if ids and (min(ids) < lowest or max(ids) >= limit):
+                raise ValueError('An id is out of range.')
+
+    def _build_network(self):
+        net = Network()
+        nodes = [Node(name) for name in self.node_names]
+        net.nodes = dict(zip(self.node_names, nodes))
+        terminals = [Terminal(name) for name in self.terminal_names]
+        net.terminals = dict(zip(self.terminal_names, terminals))
+        input_ports = self._make_ports(nodes, self.input_ports, InputPort,
+                                       'input_ports')
+        output_ports = self._make_ports(nodes, self.output_ports, OutputPort,
+                                        'output_ports')
+        edges = [Edge(terminals[-1 - s] if s < 0 else output_ports[s],
+                      input_ports[d])
+                 for s, d in zip(self.edge_sources, self.edge_dests)]
+        net.edges = edges
+        net.edge_index.add_all(edges)
+        return net
+
+    def _make_ports(self, nodes, table, port_class, attribute):
+        port_names = self.port_names
+        ports = []
+        for i in range(0, len(table), 2):
+            node = nodes[table[i]]
+            name = port_names[table[i + 1]]
+            port = port_class(name, node)
+            getattr(node, attribute)[name] = port
+            ports.append(port)
+        return ports
+
+
+def _to_array(raw):
+    if type(raw) is not bytes:
+        raise TypeError('An id table is not bytes.')
+    ids = array('i')
+    ids.frombytes(raw)
+    return ids
+
+
+# Identifies the format, (bump the digit when it changes), and the version of
+# Python, because marshal's format can change from one to the next.
+_MAGIC = b'DFNET1:py%d.%d:' % sys.version_info[:2]
+
+
+class TopologyBuilder:
+    """
+    Accumulates a topology one port and edge at a time, straight into the
+    tables of a CompiledTopology, (see topology()). This is much cheaper than
+    registering the same things with a Network one at a time, and so is what
+    the NetworkFactory uses while it reads a script.
+
+    Registering something that already exists is harmless, like it is for the
+    Network. Adding an edge that already exists raises ValueError.
+    """
+
+    def __init__(self):
+        self._node_ids = {}
+        self._terminal_ids = {}
+        self._port_name_ids = {}
+        # Port ids keyed on (node name, port name).
+        self._input_port_ids = {}
+        self._output_port_ids = {}
+        self._input_ports = array('i')
+        self._output_ports = array('i')
+        # (source, dest) tuples, coded like edge_sources and edge_dests.
+        self._edges = set()
+        self._edge_sources = array('i')
+        self._edge_dests = array('i')
+
+    def register_terminal(self, name):
+        return self._terminal_ids.setdefault(name, len(self._terminal_ids))
+
+    def register_input_port(self, node_name, port_name):
+        return self._register_port(node_name, port_name, self._input_port_ids,
+                                   self._input_ports)
+
+    def register_output_port(self, node_name, port_name):
+        return self._register_port(node_name, port_name,
+                                   self._output_port_ids, self._output_ports)
+
+    def add_terminal_edge(self, terminal_name, node_name, port_name):
+        dest = self.register_input_port(node_name, port_name)
+        source = -1 - self.register_terminal(terminal_name)
+        self._add_edge(source, dest, terminal_name, port_name)
+
+    def add_output_to_input_edge(self, upstream_node_name, upstream_port_name,
+                                 downstream_node_name, downstream_port_name):
+        dest = self.register_input_port(downstream_node_name,
+                                        downstream_port_name)
+        source = self.register_output_port(upstream_node_name,
+                                           upstream_port_name)
+        self._add_edge(source, dest, upstream_port_name, downstream_port_name)
+
+    def topology(self):
+        return CompiledTopology(
+            list(self._node_ids), list(self._terminal_ids),
+            list(self._port_name_ids), self._input_ports, self._output_ports,
+            self._edge_sources, self._edge_dests)
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _register_port(self, node_name, port_name, port_ids, table):
+        key = (node_name, port_name)
+        port_id = port_ids.get(key)
+        if port_id is None:
+            port_id = port_ids[key] = len(port_ids)
+            table.append(self._node_ids.setdefault(
+                node_name, len(self._node_ids)))
+            table.append(self._port_name_ids.setdefault(
+                port_name, len(self._port_name_ids)))
+        return port_id
+
+    def _add_edge(self, source, dest, source_name, dest_name):
+        if (source, dest) in self._edges:
+            raise ValueError('Encountered duplicate edge from: {} to {}'.format(
+                source_name, dest_name))
+        self._edges.add((source, dest))
+        self._edge_sources.append(source)
+        self._edge_dests.append(dest)
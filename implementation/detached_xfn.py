@@ -0,0 +1,81 @@
+import inspect
+from time import perf_counter
+from time import thread_time
+
+
+from dataflow.api.network_error import NetworkError
+
+
+def run_detached_xfn(node_name, xfn, input_values_dict, output_port_names):
+    """
+    Runs a node's transfer function away from the node itself - e.g. in a
+    worker thread or process - and returns a tuple of:
+
+        o  the values it set, as a dictionary keyed on output port name,
+        o  the wall-clock time it took (in seconds),
+        o  the CPU time it took (in seconds).
+
+    (See Node.detached_execution_args()). The transfer function sees the same
+    calling convention and the same errors as it would when executed by the
+    node.
+    """
+    output_values = {}
+    output_setter_fn = _make_output_setter(node_name, output_port_names,
+                                           output_values)
+    wall_started, cpu_started = perf_counter(), thread_time()
+    result = xfn(input_values_dict, output_setter_fn)
+    assert_not_awaitable(node_name, result)
+    return (output_values, perf_counter() - wall_started,
+            thread_time() - cpu_started)
+
+
+async def arun_detached_xfn(node_name, xfn, input_values_dict,
+                            output_port_names):
+    """
+    The same as run_detached_xfn(), except that the transfer function may be
+    a coroutine function, (i.e. an *async def*), in which case it is awaited.
+    (And the CPU time is given as None, since other coroutines run while it is
+    being awaited).
+    """
+    output_values = {}
+    output_setter_fn = _make_output_setter(node_name, output_port_names,
+                                           output_values)
+    wall_started = perf_counter()
+    result = xfn(input_values_dict, output_setter_fn)
+    if inspect.isawaitable(result):
+        await result
+    return output_values, perf_counter() - wall_started, None
+
+
+def is_async_xfn(xfn):
+    """
+    Is the given transfer function a coroutine function, (or a callable object
+    whose __call__ is)?
+    """
+    return inspect.iscoroutinefunction(xfn) or \
+        inspect.iscoroutinefunction(getattr(xfn, '__call__', None))
+
+
+def assert_not_awaitable(node_name, result):
+    """
+    Raises NetworkError if a transfer function returned something awaitable,
+    because that means it was a coroutine function called from a synchronous
+    evaluation, and so it has not really been run.
+    """
+    if inspect.isawaitable(result):
+        if inspect.iscoroutine(result):
+            result.close()
+        raise NetworkError(
+            ('The transfer function for the node called <{}> is asynchronous, '
+             'so its outputs must be read with aget_output_port_value().'
+             ).format(node_name))
+
+
+def _make_output_setter(node_name, output_port_names, output_values):
+    def output_setter_fn(port_name, value):
+        if port_name not in output_port_names:
+            raise NetworkError(
+                'Unknown output port name: <{}> for node: <{}>'.format(
+                    port_name, node_name))
+        output_values[port_name] = value
+    return output_setter_fn
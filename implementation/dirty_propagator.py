@@ -1,17 +1,109 @@
-from dataflow.implementation.walker_downstream import WalkerDownstream
 
 class DirtyPropagator:
     """
     Takes responsibility for propagating a dirty status downstream from a
-    terminal to all dependent downstream nodes recursively.
+    terminal to all dependent downstream nodes.
+
+    It walks the downstream node lists held in the Network's EvaluationPlan
+    using an explicit stack, visiting each node at most once, and it does not
+    walk beyond nodes that are already dirty - because everything downstream
+    of a dirty node is always dirty too. So the cost of a propagation is
+    proportional to the number of nodes it newly dirties.
+
+    When there is a DirtyTracer, it walks the same way, but tells the tracer
+    what caused each node to be dirty, (including the nodes that are already
+    dirty where it stops).
     """
 
     def __init__(self, graph):
         self._graph = graph
+        # An optional NetworkProfiler. (See Network.enable_profiling()).
+        self.profiler = None
+        # An optional DirtyTracer. (See Network.enable_tracing()).
+        self.tracer = None
 
     def propagate(self, terminal):
-        # Use a visitor to traverse the dependencies, with a callback
-        # that does the 'dirty' work.
-        callback = lambda node: setattr(node, 'is_dirty', True)
-        walker = WalkerDownstream(self._graph, callback)
-        walker.walk_from_terminal(terminal)
+        self.propagate_from_terminals([terminal])
+
+    def propagate_from_terminals(self, terminals):
+        """
+        Propagates dirty status from several terminals in one walk, so that the
+        parts of the network downstream of more than one of them are visited
+        only once.
+        """
+        if self.profiler is None:
+            self._propagate_from_terminals(terminals)
+            return
+        with self.profiler.timing_propagation():
+            self._propagate_from_terminals(terminals)
+
+    def propagate_from_nodes(self, nodes):
+        """
+        Makes the given nodes dirty, along with everything downstream of them.
+        For when something other than a terminal write makes their outputs
+        stale, (like a change to the topology).
+        """
+        # The nodes may already be dirty, (new nodes always are), but after a
+        # change to the topology, what is downstream of them need not be.
+        if self.tracer is not None:
+            self._propagate_traced(
+                [(node, ('topology change', None, None)) for node in nodes],
+                force=True)
+            return
+        downstream_nodes = self._graph.evaluation_plan().downstream_nodes
+        for node in nodes:
+            node.is_dirty = True
+        self._propagate([n for node in nodes for n in downstream_nodes[node]
+                         if not n.is_dirty])
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _propagate_from_terminals(self, terminals):
+        downstream_nodes = self._graph.evaluation_plan().downstream_nodes
+        if self.tracer is not None:
+            self._propagate_traced(
+                [(node, ('TERM:' + terminal.name, None, None))
+                 for terminal in terminals
+                 for node in downstream_nodes.get(terminal, ())])
+            return
+        self._propagate([node for terminal in terminals
+                         for node in downstream_nodes.get(terminal, ())
+                         if not node.is_dirty])
+
+    def _propagate(self, stack):
+        profiler = self.profiler
+        downstream_nodes = self._graph.evaluation_plan().downstream_nodes
+        while stack:
+            node = stack.pop()
+            if node.is_dirty:
+                continue
+            node.is_dirty = True
+            if profiler is not None:
+                profiler.record_dirtied(node.name)
+            stack.extend(n for n in downstream_nodes[node] if not n.is_dirty)
+
+    def _propagate_traced(self, stack, force=False):
+        """
+        The equivalent of _propagate() when there is a tracer. The stack holds
+        (node, cause) tuples, (see DirtyTracer.add_cause()). With force, the
+        nodes initially on the stack are walked beyond, even if they are
+        already dirty.
+        """
+        profiler = self.profiler
+        tracer = self.tracer
+        downstream_nodes = self._graph.evaluation_plan().downstream_nodes
+        forced = set(node for node, _ in stack) if force else set()
+        while stack:
+            node, cause = stack.pop()
+            causes = tracer.add_cause(node.name, cause)
+            if node in forced:
+                forced.discard(node)
+            elif node.is_dirty:
+                continue
+            elif profiler is not None:
+                profiler.record_dirtied(node.name)
+            node.is_dirty = True
+            cause = (None, causes, node.name)
+            stack.extend((n, cause) for n in downstream_nodes[node])
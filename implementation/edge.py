@@ -3,6 +3,8 @@ class Edge:
     """
     """
 
+    __slots__ = ('source', 'dest')
+
     def __init__(self, source, dest):
         """
         Source should be either a Terminal or an OutputPort.
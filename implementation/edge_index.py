@@ -0,0 +1,115 @@
+from operator import attrgetter
+
+
+class EdgeIndex:
+    """
+    Keeps the Network's edges indexed in the ways that the Network needs to
+    query them, so that no query has to scan the full list of edges.
+
+    It knows:
+
+        o  Which edge feeds a given InputPort.
+        o  Which edges leave a given source (Terminal or OutputPort).
+        o  Whether an edge between a given source and dest already exists.
+
+    And it keeps (lazily) a copy of the nodes fed by each source, sorted by
+    name, to save the Network from re-sorting fan-out lists on every query.
+    """
+
+    def __init__(self):
+        self._edge_by_dest = {}  # Edge keyed on InputPort.
+        # Lists of any further edges feeding the same InputPort. (Only the
+        # first counts, but the others are needed to detect duplicates).
+        self._extra_edges_by_dest = {}
+        self._edges_by_source = {}  # List of Edge keyed on Terminal/OutputPort.
+        self._sorted_fan_out = {}  # Sorted list of Node keyed on source.
+
+    def add(self, edge):
+        """
+        Add the given edge to the index. The caller is expected to have
+        checked for duplicates using contains() first.
+        """
+        # When an input port is fed more than once, the first edge wins.
+        if self._edge_by_dest.setdefault(edge.dest, edge) is not edge:
+            self._extra_edges_by_dest.setdefault(edge.dest, []).append(edge)
+        self._edges_by_source.setdefault(edge.source, []).append(edge)
+        self._sorted_fan_out.pop(edge.source, None)
+
+    def add_all(self, edges):
+        """
+        Add many edges at once, (the same as calling add() for each, only
+        cheaper).
+        """
+        edge_by_dest = self._edge_by_dest
+        edges_by_source = self._edges_by_source
+        for edge in edges:
+            if edge_by_dest.setdefault(edge.dest, edge) is not edge:
+                self._extra_edges_by_dest.setdefault(
+                    edge.dest, []).append(edge)
+            edges_by_source.setdefault(edge.source, []).append(edge)
+        self._sorted_fan_out.clear()
+
+    def remove(self, edge):
+        """
+        Remove the given edge, (which must be in the index).
+        """
+        dest = edge.dest
+        extras = self._extra_edges_by_dest.get(dest)
+        if self._edge_by_dest.get(dest) is edge:
+            if extras:
+                # The next edge to have been added takes over.
+                self._edge_by_dest[dest] = extras.pop(0)
+            else:
+                del self._edge_by_dest[dest]
+        elif extras:
+            extras.remove(edge)
+        if extras is not None and not extras:
+            del self._extra_edges_by_dest[dest]
+        from_source = self._edges_by_source[edge.source]
+        from_source.remove(edge)
+        if not from_source:
+            del self._edges_by_source[edge.source]
+        self._sorted_fan_out.pop(edge.source, None)
+
+    def contains(self, source, dest):
+        edge = self._edge_by_dest.get(dest)
+        if edge is None:
+            return False
+        if edge.source is source:
+            return True
+        return any(e.source is source
+                   for e in self._extra_edges_by_dest.get(dest, ()))
+
+    def edge_for_input(self, input_port):
+        """
+        The edge that feeds the given InputPort, or None if there isn't one.
+        """
+        return self._edge_by_dest.get(input_port)
+
+    def edges_into(self, input_port):
+        """
+        All the edges feeding the given InputPort, (normally at most one), the
+        one that counts first.
+        """
+        edge = self._edge_by_dest.get(input_port)
+        if edge is None:
+            return []
+        return [edge] + self._extra_edges_by_dest.get(input_port, [])
+
+    def edges_from(self, source):
+        """
+        The edges leaving the given Terminal or OutputPort (in creation order).
+        """
+        return self._edges_by_source.get(source, ())
+
+    def nodes_fed_by(self, source):
+        """
+        The nodes fed by the given Terminal or OutputPort, sorted by name.
+        A node appears once for each of its input ports that the source feeds.
+        """
+        nodes = self._sorted_fan_out.get(source)
+        if nodes is None:
+            nodes = sorted([e.dest.node for e in self.edges_from(source)],
+                           key=attrgetter('name'))
+            self._sorted_fan_out[source] = nodes
+        return nodes
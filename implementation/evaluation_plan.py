@@ -0,0 +1,283 @@
+from operator import attrgetter
+
+
+from dataflow.api.network_error import NetworkError
+from dataflow.implementation.terminal import Terminal
+
+
+class EvaluationPlan:
+    """
+    A compiled form of a Network's topology, which the Evaluator uses so that it
+    does not have to re-discover the shape of the network every time it
+    evaluates a node.
+
+    It holds:
+
+        o  For each node, its *feeds* - i.e. (input_port, source, is_terminal)
+           tuples, sorted by input port name.
+        o  For each node, the distinct nodes immediately upstream of it (in the
+           same input port order).
+        o  For each node and each terminal, the distinct nodes immediately
+           downstream of it, (sorted by name).
+        o  A topological order for all the nodes in the network.
+
+    Once compiled, a plan is kept up to date as the topology changes, (see the
+    Network Editing API), by the methods below that re-derive just the entries
+    affected by each change, rather than by compiling it all over again.
+    Compiling a plan raises NetworkError if the network contains a cycle, and
+    so does check_new_edge() for an edge that would make one.
+    """
+
+    def __init__(self, network):
+        self._network = network
+        self.feeds = {}  # Keyed on Node.
+        self.upstream_nodes = {}  # Keyed on Node.
+        self.downstream_nodes = {}  # Keyed on Node or Terminal.
+        self._downstream_closures = {}  # Keyed on Terminal.
+        # The topological order, (see the order property), or None when a
+        # change to the topology may have invalidated it.
+        self._order = None
+        self._position = None
+        self._compile()
+
+    @property
+    def order(self):
+        """
+        All the nodes in the network, in topological order.
+        """
+        if self._order is None:
+            self._compile_order()
+        return self._order
+
+    @property
+    def position(self):
+        """
+        The index into order, keyed on Node.
+        """
+        if self._position is None:
+            self._position = {node: i for i, node in enumerate(self.order)}
+        return self._position
+
+    def upstream_cone_within(self, nodes, members):
+        """
+        The nodes among the given set of members that the given nodes depend
+        upon, through members only, (including the given nodes themselves,
+        if they are members), in topological order.
+        """
+        return self._post_order(nodes, lambda n: n in members)
+
+    def downstream_closure(self, terminal):
+        """
+        All the nodes that depend upon the given terminal, (computed on first
+        request and then remembered).
+        """
+        closure = self._downstream_closures.get(terminal)
+        if closure is None:
+            closure = []
+            seen = set()
+            stack = list(self.downstream_nodes.get(terminal, ()))
+            while stack:
+                node = stack.pop()
+                if node in seen:
+                    continue
+                seen.add(node)
+                closure.append(node)
+                stack.extend(self.downstream_nodes[node])
+            self._downstream_closures[terminal] = closure
+        return closure
+
+    def dirty_schedule(self, nodes):
+        """
+        The dirty nodes that must be executed (in this order) to make the given
+        nodes clean, (including any whose output values have been evicted).
+        The traversal stops at clean nodes, because a clean node does not need
+        its upstream to be executed.
+        """
+        return self._post_order(nodes, lambda n: n.is_stale)
+
+    #------------------------------------------------------------------------
+    # API to keep the plan up to date, (see TopologyEditor).
+    #------------------------------------------------------------------------
+
+    def add_node(self, node):
+        """
+        Add a new node, (which has no edges yet). It can go at the end of the
+        topological order.
+        """
+        self.feeds[node] = ()
+        self.upstream_nodes[node] = ()
+        self.downstream_nodes[node] = ()
+        if self._order is not None:
+            if self._position is not None:
+                self._position[node] = len(self._order)
+            self._order.append(node)
+
+    def remove_node(self, node):
+        """
+        Remove a node, (whose edges have already been removed).
+        """
+        for table in (self.feeds, self.upstream_nodes, self.downstream_nodes):
+            table.pop(node, None)
+        self._order = None
+        self._position = None
+
+    def remove_terminal(self, terminal):
+        """
+        Remove a terminal, (whose edges have already been removed).
+        """
+        self.downstream_nodes.pop(terminal, None)
+        self._downstream_closures.pop(terminal, None)
+
+    def update_feeds(self, node):
+        """
+        Re-derive the entries for a node whose input ports have changed.
+        """
+        self._compile_feeds(node)
+        self._downstream_closures.clear()
+
+    def update_edges(self, edges):
+        """
+        Re-derive the entries affected by the given edges having been added or
+        removed, (only those for the nodes and terminals at their ends).
+        """
+        dest_nodes = set()
+        owners = set()
+        for edge in edges:
+            dest_nodes.add(edge.dest.node)
+            source = edge.source
+            owners.add(source if isinstance(source, Terminal) else source.node)
+        for node in dest_nodes:
+            if node in self.feeds:
+                self._compile_feeds(node)
+        for owner in owners:
+            if owner in self.downstream_nodes:
+                self._compile_downstream(owner)
+        self._downstream_closures.clear()
+
+    def check_new_edge(self, source, dest):
+        """
+        Raises NetworkError if an edge from the given source to the given
+        InputPort would make a cycle. (When the source comes before the dest
+        in the topological order there can be no cycle, and the order stays
+        valid. Otherwise it has to be checked by walking upstream from the
+        source, and the order is worked out again later).
+        """
+        if isinstance(source, Terminal):
+            return
+        upstream_node = source.node
+        downstream_node = dest.node
+        if self._order is not None:
+            position = self.position
+            if position[upstream_node] < position[downstream_node]:
+                return
+        if downstream_node is upstream_node or downstream_node in set(
+                self._post_order([upstream_node], lambda n: True)):
+            raise NetworkError(
+                'Cannot add an edge from <{}> to <{}>, because it would make '
+                'a cycle.'.format(upstream_node.name, downstream_node.name))
+        self._order = None
+        self._position = None
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _compile(self):
+        network = self._network
+        for node in network.nodes.values():
+            self._compile_feeds(node)
+            self._compile_downstream(node)
+        for terminal in network.terminals.values():
+            self._compile_downstream(terminal)
+        self._compile_order()
+
+    def _compile_order(self):
+        """
+        Works out the topological order, (raising NetworkError if there is a
+        cycle).
+        """
+        roots = sorted(self._network.nodes.values(), key=lambda n: n.name)
+        self._order = self._post_order(roots, lambda n: True,
+                                       detect_cycles=True)
+        self._position = None
+
+    def _compile_feeds(self, node):
+        edge_index = self._network.edge_index
+        feeds = []
+        upstream = []
+        seen = set()
+        for input_port in node.sorted_input_ports():
+            edge = edge_index.edge_for_input(input_port)
+            if edge is None:
+                # Leave it to the Evaluator to complain, if and when this
+                # node actually gets evaluated.
+                input_port.source = None
+                feeds.append((input_port, None, False))
+                continue
+            source = edge.source
+            input_port.source = source
+            is_terminal = isinstance(source, Terminal)
+            feeds.append((input_port, source, is_terminal))
+            if not is_terminal and source.node not in seen:
+                seen.add(source.node)
+                upstream.append(source.node)
+        # (Tuples, because large networks have a great many of these).
+        self.feeds[node] = tuple(feeds)
+        self.upstream_nodes[node] = tuple(upstream)
+
+    def _compile_downstream(self, owner):
+        """
+        Works out the nodes immediately downstream of a Node or Terminal.
+        """
+        edges_from = self._network.edge_index.edges_from
+        if isinstance(owner, Terminal):
+            edges = edges_from(owner)
+        else:
+            edges = [edge for output_port in owner.output_ports.values()
+                     for edge in edges_from(output_port)]
+        self.downstream_nodes[owner] = self._distinct(
+            edge.dest.node for edge in edges)
+
+    @staticmethod
+    def _distinct(nodes):
+        """
+        The given nodes without repeats, sorted by name.
+        """
+        return tuple(sorted(set(nodes), key=attrgetter('name')))
+
+    def _post_order(self, nodes, should_visit, detect_cycles=False):
+        """
+        A depth-first post-order traversal upstream from the given nodes, using
+        an explicit stack (so that there is no limit on the network's depth).
+        Only nodes for which should_visit(node) is True are visited.
+        """
+        upstream_nodes = self.upstream_nodes
+        visited = set()
+        on_stack = set()
+        result = []
+        for start in nodes:
+            if start in visited or not should_visit(start):
+                continue
+            visited.add(start)
+            on_stack.add(start)
+            stack = [(start, iter(upstream_nodes[start]))]
+            while stack:
+                node, upstream = stack[-1]
+                for upstream_node in upstream:
+                    if detect_cycles and upstream_node in on_stack:
+                        raise NetworkError(
+                            'The network contains a cycle through the node '
+                            'called <{}>.'.format(upstream_node.name))
+                    if upstream_node in visited or \
+                            not should_visit(upstream_node):
+                        continue
+                    visited.add(upstream_node)
+                    on_stack.add(upstream_node)
+                    stack.append(
+                        (upstream_node, iter(upstream_nodes[upstream_node])))
+                    break
+                else:
+                    stack.pop()
+                    on_stack.discard(node)
+                    result.append(node)
+        return result
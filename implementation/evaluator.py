@@ -0,0 +1,307 @@
+import asyncio
+from time import perf_counter
+from time import thread_time
+
+
+from dataflow.implementation.detached_xfn import arun_detached_xfn
+from dataflow.implementation.detached_xfn import is_async_xfn
+from dataflow.implementation.detached_xfn import run_detached_xfn
+
+
+class Evaluator:
+    """
+    Takes responsibility for making nodes clean, by executing the transfer
+    functions of whichever dirty nodes they depend upon, in dependency order.
+
+    It works from the Network's compiled EvaluationPlan, and runs as a loop
+    over an explicit schedule rather than by recursing upstream, so there is
+    no limit on how deep a network can be.
+
+    It also implements *early cutoff*. When none of the terminals and output
+    ports feeding a dirty node have changed since the node last ran (i.e. their
+    versions are the same as they were then), the node is simply marked clean
+    without running its transfer function. So an upstream recomputation that
+    produces an identical value stops there. (Terminals and ports only keep
+    their versions unchanged like this when they have a comparator).
+
+    When there is a RetentionPolicy, nodes whose output values have been
+    evicted are executed again when they are needed, and the policy is told
+    about each execution and enforced as the evaluation goes along, (taking
+    care not to evict values that nodes later in the schedule have yet to
+    read).
+    """
+
+    def __init__(self, network):
+        self._network = network
+        # An optional concurrent.futures.Executor. (See Network.set_executor()).
+        self.executor = None
+        # An optional NetworkProfiler. (See Network.enable_profiling()).
+        self.profiler = None
+        # An optional DirtyTracer. (See Network.enable_tracing()).
+        self.tracer = None
+        # An optional RetentionPolicy. (See Network.set_retention_policy()).
+        self.retention = None
+
+    def evaluate(self, nodes):
+        """
+        Make the given nodes clean, executing each dirty node they depend upon
+        exactly once.
+        """
+        if self.tracer is not None:
+            self.tracer.record_read(node.name for node in nodes)
+        if self.profiler is None:
+            self._evaluate(nodes)
+            return
+        with self.profiler.timing_evaluation():
+            self._evaluate(nodes)
+
+    async def aevaluate(self, nodes):
+        """
+        The asynchronous equivalent of evaluate(), in which transfer functions
+        may be coroutine functions. The nodes in each dependency level are
+        executed concurrently (using asyncio.gather()). Plain transfer
+        functions are called directly, unless there is an executor, in which
+        case they are run in that.
+        """
+        if self.tracer is not None:
+            self.tracer.record_read(node.name for node in nodes)
+        if self.profiler is None:
+            await self._aevaluate(nodes)
+            return
+        with self.profiler.timing_evaluation():
+            await self._aevaluate(nodes)
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _evaluate(self, nodes):
+        plan = self._network.evaluation_plan()
+        schedule = plan.dirty_schedule(nodes)
+        if self.executor is not None:
+            self._evaluate_level_by_level(plan, nodes, schedule)
+            return
+        feeds = plan.feeds
+        pending_uses = self._pending_uses(plan, nodes, schedule)
+        for node in schedule:
+            recomputing = self._is_recomputing(node)
+            versions = self._prepare(node, feeds[node])
+            if versions is not None:
+                wall_seconds = self._execute(node)
+                node.input_versions = versions
+                if self.tracer is not None:
+                    self.tracer.record_outcome(node.name, 'executed')
+                self._record_execution(plan, node, wall_seconds, recomputing)
+            self._release_inputs(plan, [node], pending_uses)
+
+    async def _aevaluate(self, nodes):
+        plan = self._network.evaluation_plan()
+        schedule = plan.dirty_schedule(nodes)
+        feeds = plan.feeds
+        loop = asyncio.get_running_loop()
+        pending_uses = self._pending_uses(plan, nodes, schedule)
+        for level in self._dependency_levels(plan, schedule):
+            prepared = []
+            awaitables = []
+            for node in level:
+                recomputing = self._is_recomputing(node)
+                versions = self._prepare(node, feeds[node])
+                if versions is None:
+                    continue
+                args = node.detached_execution_args()
+                if self.executor is not None and not is_async_xfn(node.xfn):
+                    awaitables.append(loop.run_in_executor(
+                        self.executor, run_detached_xfn, *args))
+                else:
+                    awaitables.append(arun_detached_xfn(*args))
+                prepared.append((node, versions, recomputing))
+            results = await asyncio.gather(*awaitables,
+                                           return_exceptions=True)
+            self._complete_level(plan, prepared, results)
+            self._release_inputs(plan, level, pending_uses)
+
+    def _execute(self, node):
+        """
+        Executes the node's transfer function, and returns how long it took,
+        (in wall clock seconds, or zero if nobody needs to know).
+        """
+        profiler = self.profiler
+        if profiler is None and self.retention is None:
+            # This autonomously sets the node to being clean again.
+            node.execute_transfer_function()
+            return 0.0
+        wall_started, cpu_started = perf_counter(), thread_time()
+        node.execute_transfer_function()
+        wall_seconds = perf_counter() - wall_started
+        if profiler is not None:
+            profiler.record_execution(node.name, wall_seconds,
+                                      thread_time() - cpu_started)
+        return wall_seconds
+
+    def _evaluate_level_by_level(self, plan, nodes, schedule):
+        """
+        Executes the schedule using the executor. The nodes are grouped into
+        dependency levels, and all the nodes in one level are submitted to run
+        concurrently, after the previous level has completed.
+
+        Should any of the transfer functions in a level raise an exception, the
+        other nodes in that level are completed nonetheless, and then the
+        exception from the first failing node (in schedule order) is re-raised.
+        """
+        feeds = plan.feeds
+        pending_uses = self._pending_uses(plan, nodes, schedule)
+        for level in self._dependency_levels(plan, schedule):
+            submitted = []
+            for node in level:
+                recomputing = self._is_recomputing(node)
+                versions = self._prepare(node, feeds[node])
+                if versions is None:
+                    continue
+                future = self.executor.submit(
+                    run_detached_xfn, *node.detached_execution_args())
+                submitted.append((node, versions, recomputing, future))
+            results = []
+            for *_, future in submitted:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+            self._complete_level(
+                plan, [prepared[:3] for prepared in submitted], results)
+            self._release_inputs(plan, level, pending_uses)
+
+    def _complete_level(self, plan, prepared, results):
+        """
+        Applies the results of the detached executions of one level's nodes.
+        The results are either what the run_detached_xfn() functions return, or
+        an exception. The latter are re-raised, after all the successful nodes
+        have been completed.
+        """
+        profiler = self.profiler
+        first_error = None
+        for (node, versions, recomputing), result in zip(prepared, results):
+            if isinstance(result, BaseException):
+                if first_error is None:
+                    first_error = result
+                continue
+            output_values, wall_seconds, cpu_seconds = result
+            node.accept_output_values(output_values, wall_seconds)
+            node.input_versions = versions
+            if profiler is not None:
+                profiler.record_execution(node.name, wall_seconds, cpu_seconds)
+            if self.tracer is not None:
+                self.tracer.record_outcome(node.name, 'executed')
+            self._record_execution(plan, node, wall_seconds, recomputing)
+        if first_error is not None:
+            raise first_error
+
+    def _dependency_levels(self, plan, schedule):
+        """
+        Groups the (topologically ordered) schedule into lists of nodes that
+        do not depend upon one another. Level 0 holds those with no dirty
+        upstream nodes, level 1 those that depend only on level 0 and so on.
+        """
+        upstream_nodes = plan.upstream_nodes
+        level_of = {}
+        levels = []
+        for node in schedule:
+            level = 1 + max((level_of[u] for u in upstream_nodes[node]
+                             if u in level_of), default=-1)
+            level_of[node] = level
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(node)
+        return levels
+
+    def _prepare(self, node, feeds):
+        """
+        Gets a dirty node ready to be executed, by checking its inputs, and
+        returns the versions of its inputs. Unless early cutoff applies, in
+        which case the node is marked clean instead, or the node's outputs can
+        be served from its MemoCache; in both these cases None is returned.
+        """
+        versions = self._input_versions(feeds)
+        # (Evicted outputs cannot be cut off; they have to be recomputed).
+        if versions == node.input_versions and not node.is_evicted:
+            node.is_dirty = False
+            if self.profiler is not None:
+                self.profiler.record_cutoff(node.name)
+            if self.tracer is not None:
+                self.tracer.record_outcome(node.name, 'cut off')
+            return None
+        recomputing = self._is_recomputing(node)
+        self._check_inputs(feeds)
+        if node.execute_from_cache():
+            node.input_versions = versions
+            if self.profiler is not None:
+                self.profiler.record_cache_hit(node.name)
+            if self.tracer is not None:
+                self.tracer.record_outcome(node.name, 'cache hit')
+            self._record_execution(self._network.evaluation_plan(), node, 0.0,
+                                   recomputing)
+            return None
+        return versions
+
+    def _input_versions(self, feeds):
+        return [None if source is None else source.version
+                for _, source, _ in feeds]
+
+    def _check_inputs(self, feeds):
+        """
+        Makes sure that every input port of a node is fed. (There is nothing to
+        copy; the input ports read their values straight from the terminals and
+        (already clean) output ports that feed them, (see InputPort.source)).
+        """
+        retention = self.retention
+        for input_port, source, is_terminal in feeds:
+            if source is None:
+                # Raises the appropriate error.
+                self._network.edge_for_input(input_port)
+            if retention is not None and not is_terminal:
+                retention.record_use(source.node)
+
+    @staticmethod
+    def _is_recomputing(node):
+        """
+        Is the node to be executed only to get back its evicted output values?
+        """
+        return node.is_evicted and not node.is_dirty
+
+    def _record_execution(self, plan, node, wall_seconds, recomputing):
+        if self.retention is not None:
+            self.retention.record_execution(
+                node, wall_seconds, len(plan.downstream_nodes[node]),
+                recomputing)
+
+    def _pending_uses(self, plan, nodes, schedule):
+        """
+        How many of the nodes in the schedule have yet to read the outputs of
+        each upstream node, (keyed on node, and only when there is a
+        RetentionPolicy). The nodes being made clean count as used throughout,
+        because the caller is about to read them.
+        """
+        pending_uses = {}
+        if self.retention is not None:
+            pending_uses.update((node, 1) for node in nodes)
+            for node in schedule:
+                for upstream_node in plan.upstream_nodes[node]:
+                    pending_uses[upstream_node] = \
+                        pending_uses.get(upstream_node, 0) + 1
+        return pending_uses
+
+    def _release_inputs(self, plan, nodes, pending_uses):
+        """
+        Notes that the given nodes have finished with their inputs, and then
+        enforces the RetentionPolicy, sparing the nodes whose outputs are
+        still to be read.
+        """
+        if self.retention is None:
+            return
+        for node in nodes:
+            for upstream_node in plan.upstream_nodes[node]:
+                remaining = pending_uses.get(upstream_node, 0) - 1
+                if remaining > 0:
+                    pending_uses[upstream_node] = remaining
+                else:
+                    pending_uses.pop(upstream_node, None)
+        self.retention.enforce(in_use=pending_uses)
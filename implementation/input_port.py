@@ -2,9 +2,19 @@
 class InputPort:
     """
     """
-    # Todo consider merit of input ports and outputs sharing memory for their
-    #  value. Plus does this challenge edges?
-    # todo, also it's not quite NICE that ports know what node they belong to.
+    # todo, it's not quite NICE that ports know what node they belong to.
+
+    __slots__ = ('node', 'name', 'source')
+
     def __init__(self, name, node):
         self.node = node
         self.name = name
+        # The Terminal or OutputPort that feeds this port, (or None). The port
+        # has no value of its own; it shares that of its source. (Bound by the
+        # EvaluationPlan, which is always compiled before anything executes).
+        self.source = None
+
+    @property
+    def value(self):
+        source = self.source
+        return None if source is None else source.value
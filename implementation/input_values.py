@@ -0,0 +1,34 @@
+from collections.abc import Mapping
+
+
+class InputValues(Mapping):
+    """
+    A read-only, dictionary-like view of the values of a node's input ports,
+    keyed on port name. This is what a transfer function receives as its
+    *input_values_dict*.
+
+    The values are not copied. Each is read, when asked for, straight from the
+    terminal or output port feeding the input port, (see InputPort.source).
+    So a node needs just one of these for its whole life, and executing it
+    does not cost a dictionary per call, nor a copy per edge. (It follows that
+    a transfer function should not hold on to it after it returns. Make a
+    dict() of it if you need to).
+    """
+
+    __slots__ = ('_input_ports',)
+
+    def __init__(self, input_ports):
+        # The node's InputPort(s) keyed on name, (shared, not copied).
+        self._input_ports = input_ports
+
+    def __getitem__(self, port_name):
+        return self._input_ports[port_name].value
+
+    def __iter__(self):
+        return iter(self._input_ports)
+
+    def __len__(self):
+        return len(self._input_ports)
+
+    def __repr__(self):
+        return 'InputValues({!r})'.format(dict(self))
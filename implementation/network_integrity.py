@@ -23,9 +23,13 @@ class NetworkIntegrity:
     """
 
     @classmethod
-    def check_now(cls, network):
+    def check_now(cls, network, ignore_terminals=()):
+        """
+        The terminals in ignore_terminals are allowed to be unset, (for when
+        their values are to be supplied some other way).
+        """
         cls._assert_no_missing_xfns(network)
-        cls._assert_no_unset_terminals(network)
+        cls._assert_no_unset_terminals(network, ignore_terminals)
 
     #------------------------------------------------------------------------
     # Private below.
@@ -44,13 +48,13 @@ class NetworkIntegrity:
                     'called <{}>.').format(node_name))
 
     @classmethod 
-    def _assert_no_unset_terminals(cls, network):
+    def _assert_no_unset_terminals(cls, network, ignore_terminals):
         """
         See if the there any terminals in the network, which haven't had their
         value set yet.
         """
         for terminal_name, terminal in network.terminals.items():
-            if terminal.value is None:
+            if terminal.value is None and terminal not in ignore_terminals:
                 raise NetworkError(
                     ('No value has been been set for your terminal '
                     'called <{}>.').format(terminal_name))
@@ -0,0 +1,98 @@
+import heapq
+
+
+from dataflow.api.network_error import NetworkError
+
+
+class NetworkPartitioner:
+    """
+    Takes responsibility for dividing the nodes of a Network between a number
+    of partitions, (see PartitionedExecutor), using one of these strategies:
+
+        'connected'  Keeps each connected subgraph whole, (so that the nodes
+                     that work on the same data share a process), and shares
+                     the subgraphs out so as to balance the cost.
+        'cost'       Ignores the connections, and shares the nodes out one by
+                     one, so as to balance the cost as evenly as possible.
+
+    Both assign the costliest first, each to the partition with the least cost
+    so far. The cost of a node is taken from node_costs, (e.g. its average
+    execution time as measured by a NetworkProfiler), and nodes without one
+    count as the average of those with one, (or 1 if there are none).
+    """
+
+    STRATEGIES = ('connected', 'cost')
+
+    @classmethod
+    def partition(cls, network, n_partitions, strategy='connected',
+                  node_costs=None):
+        """
+        Returns a dictionary of partition numbers, (0 to n_partitions - 1),
+        keyed on node name.
+        """
+        if n_partitions < 1:
+            raise NetworkError('There must be at least one partition.')
+        if strategy not in cls.STRATEGIES:
+            raise NetworkError(
+                'Unknown partitioning strategy: <{}>'.format(strategy))
+        cost_of = cls._cost_function(node_costs or {})
+        if strategy == 'cost':
+            groups = [[name] for name in network.nodes]
+        else:
+            groups = cls._connected_subgraphs(network)
+        weighted = sorted(
+            ((sum(cost_of(name) for name in group), sorted(group))
+             for group in groups),
+            key=lambda weighted_group: (-weighted_group[0], weighted_group[1]))
+
+        # A heap of (cost so far, partition number).
+        loads = [(0.0, i) for i in range(n_partitions)]
+        partition_of = {}
+        for cost, group in weighted:
+            load, partition = heapq.heappop(loads)
+            for name in group:
+                partition_of[name] = partition
+            heapq.heappush(loads, (load + cost, partition))
+        return partition_of
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _cost_function(node_costs):
+        default = sum(node_costs.values()) / len(node_costs) \
+            if node_costs else 1.0
+        return lambda name: node_costs.get(name, default)
+
+    @staticmethod
+    def _connected_subgraphs(network):
+        """
+        The names of the nodes in each (weakly) connected subgraph, where
+        nodes fed by the same terminal count as connected.
+        """
+        plan = network.evaluation_plan()
+        neighbours = {node: set(plan.upstream_nodes[node]) |
+                      set(plan.downstream_nodes[node])
+                      for node in network.nodes.values()}
+        for terminal in network.terminals.values():
+            fed = plan.downstream_nodes.get(terminal, ())
+            for node in fed:
+                neighbours[node].update(fed)
+        groups = []
+        seen = set()
+        for start in network.nodes.values():
+            if start in seen:
+                continue
+            seen.add(start)
+            group = []
+            stack = [start]
+            while stack:
+                node = stack.pop()
+                group.append(node.name)
+                for neighbour in neighbours[node]:
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        stack.append(neighbour)
+            groups.append(group)
+        return groups
@@ -0,0 +1,251 @@
+import hashlib
+import mmap
+import pickle
+import struct
+
+
+from dataflow.api.network_error import NetworkError
+from dataflow.implementation.terminal import Terminal
+
+
+class NetworkSnapshot:
+    """
+    The runtime state of a Network, (as opposed to its topology), captured so
+    that it can be restored later, into the same network or another one built
+    from the same script. (See Network.snapshot() and friends).
+
+    It holds the value and version of every terminal and output port, and for
+    every node, its dirty and evicted flags, and the versions of its inputs as
+    they were when it last ran (so that early cutoff still works). Nothing is
+    keyed on names; each is a list in a canonical order, and a fingerprint of
+    the topology makes sure that it is only restored into a network with the
+    same one.
+
+    The values are pickled, (protocol 5), except for those with a custom
+    serializer, (any object with dumps() and loads() - like the json module),
+    keyed on terminal name or (node_name, output_port_name) tuple.
+
+    Large buffers that support out-of-band pickling, (like NumPy arrays), are
+    not copied into the pickle, but stored alongside it, each aligned to
+    _ALIGNMENT bytes. So when a snapshot is read from a file with mmap_arrays,
+    they are restored as views onto the memory-mapped file, (copy on write),
+    and only read from disk as and when they are used.
+
+    The layout is:
+
+        _MAGIC, then the lengths of the pickled state and buffer table,
+        the pickled state,
+        the buffer table, (a pickled list of (offset, length) tuples),
+        padding up to a multiple of _ALIGNMENT, then the buffers.
+    """
+
+    def __init__(self, fingerprint, state):
+        self.fingerprint = fingerprint
+        # (terminal_states, port_states, node_states, custom_keys).
+        self.state = state
+
+    @classmethod
+    def capture(cls, net, serializers=None):
+        serializers = serializers or {}
+        terminals, ports, nodes = cls._canonical_order(net)
+        custom_keys = []
+
+        def serialized(key, value):
+            serializer = serializers.get(key)
+            if serializer is None:
+                return value
+            custom_keys.append(key)
+            return serializer.dumps(value)
+
+        terminal_states = [
+            (serialized(terminal.name, terminal.value), terminal.version)
+            for terminal in terminals]
+        port_states = [
+            (serialized((port.node.name, port.name), port.get_value()),
+             port.version)
+            for port in ports]
+        node_states = [(node.is_dirty, node.is_evicted, node.input_versions)
+                       for node in nodes]
+        return cls(cls.fingerprint_of(net),
+                   (terminal_states, port_states, node_states, custom_keys))
+
+    def restore_into(self, net, serializers=None):
+        if self.fingerprint != self.fingerprint_of(net):
+            raise NetworkError(
+                'The snapshot was taken of a network with a different '
+                'topology.')
+        serializers = serializers or {}
+        terminal_states, port_states, node_states, custom_keys = self.state
+        missing = [key for key in custom_keys if key not in serializers]
+        if missing:
+            raise NetworkError(
+                'The snapshot needs a serializer for: {}'.format(
+                    ', '.join('<{}>'.format(key) for key in missing)))
+        custom_keys = set(custom_keys)
+
+        def deserialized(key, value):
+            return serializers[key].loads(value) if key in custom_keys \
+                else value
+
+        terminals, ports, nodes = self._canonical_order(net)
+        # Everything is deserialized before anything is assigned, so that a
+        # serializer that fails leaves the network as it was.
+        terminal_values = [deserialized(terminal.name, value)
+                           for terminal, (value, _) in zip(terminals,
+                                                           terminal_states)]
+        port_values = [deserialized((port.node.name, port.name), value)
+                       for port, (value, _) in zip(ports, port_states)]
+        for terminal, value, (_, version) in zip(
+                terminals, terminal_values, terminal_states):
+            terminal.value = value
+            terminal.version = version
+        for port, value, (_, version) in zip(ports, port_values, port_states):
+            port.reinstate_value(value)
+            port.version = version
+        for node, (is_dirty, is_evicted, input_versions) in zip(
+                nodes, node_states):
+            node.is_dirty = is_dirty
+            node.is_evicted = is_evicted
+            node.input_versions = input_versions
+
+    def to_bytes(self):
+        return b''.join(self._parts())
+
+    def write(self, path):
+        with open(path, 'wb') as f:
+            for part in self._parts():
+                f.write(part)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        state, buffer_table, start = cls._parse(data)
+        # (Copies, so that the values restored are not read-only).
+        return cls._unpickle(state, [
+            bytearray(data[start + offset:start + offset + length])
+            for offset, length in buffer_table])
+
+    @classmethod
+    def read(cls, path, mmap_arrays=False):
+        if not mmap_arrays:
+            with open(path, 'rb') as f:
+                return cls.from_bytes(f.read())
+        with open(path, 'rb') as f:
+            # A private, copy on write mapping; it stays open for as long as
+            # any of the values restored from it are in use.
+            mapped = memoryview(mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_COPY))
+        state, buffer_table, start = cls._parse(mapped)
+        return cls._unpickle(state, [
+            mapped[start + offset:start + offset + length]
+            for offset, length in buffer_table])
+
+    @staticmethod
+    def fingerprint_of(net):
+        """
+        A digest of the network's topology, (its names and edges, but not the
+        order in which they were created).
+        """
+        digest = hashlib.sha256()
+        for name in sorted(net.nodes):
+            node = net.nodes[name]
+            digest.update(repr((name, sorted(node.input_ports),
+                                sorted(node.output_ports))).encode())
+        digest.update(repr(sorted(net.terminals)).encode())
+        edges = sorted(
+            (repr(_label(edge.source)), edge.dest.node.name, edge.dest.name)
+            for edge in net.edges)
+        digest.update(repr(edges).encode())
+        return digest.hexdigest()
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _canonical_order(net):
+        """
+        The terminals, output ports and nodes of the network, each sorted by
+        name.
+        """
+        terminals = [net.terminals[name] for name in sorted(net.terminals)]
+        nodes = [net.nodes[name] for name in sorted(net.nodes)]
+        ports = [node.output_ports[name] for node in nodes
+                 for name in sorted(node.output_ports)]
+        return terminals, ports, nodes
+
+    def _parts(self):
+        """
+        The pieces of the serialized form, in order, (without joining them
+        into one, potentially very large, bytes object).
+        """
+        buffers = []
+        state = pickle.dumps((self.fingerprint, self.state), protocol=5,
+                             buffer_callback=buffers.append)
+        raws = [buffer.raw() for buffer in buffers]
+        table = []
+        offset = 0
+        for raw in raws:
+            table.append((offset, raw.nbytes))
+            offset = _aligned(offset + raw.nbytes)
+        buffer_table = pickle.dumps(table, protocol=5)
+        header = _MAGIC + _LENGTHS.pack(len(state), len(buffer_table))
+        yield header
+        yield state
+        yield buffer_table
+        position = len(header) + len(state) + len(buffer_table)
+        start = _aligned(position)
+        for raw, (offset, _) in zip(raws, table):
+            padding = start + offset - position
+            if padding:
+                yield bytes(padding)
+            yield raw
+            position += padding + raw.nbytes
+
+    @staticmethod
+    def _parse(data):
+        """
+        Splits serialized data into the pickled state, the buffer table, and
+        where the buffers start.
+        """
+        if bytes(data[:len(_MAGIC)]) != _MAGIC:
+            raise NetworkError('This is not a network snapshot.')
+        try:
+            position = len(_MAGIC) + _LENGTHS.size
+            state_length, table_length = _LENGTHS.unpack(
+                data[len(_MAGIC):position])
+            state = data[position:position + state_length]
+            position += state_length
+            buffer_table = pickle.loads(data[position:position + table_length])
+            start = _aligned(position + table_length)
+            if len(state) != state_length or any(
+                    start + offset + length > len(data)
+                    for offset, length in buffer_table):
+                raise ValueError('Missing data.')
+        except Exception:
+            raise NetworkError('The snapshot is truncated or corrupt.')
+        return state, buffer_table, start
+
+    @classmethod
+    def _unpickle(cls, state, buffers):
+        try:
+            fingerprint, state = pickle.loads(state, buffers=buffers)
+        except Exception:
+            raise NetworkError('The snapshot is truncated or corrupt.')
+        return cls(fingerprint, state)
+
+
+def _label(source):
+    if isinstance(source, Terminal):
+        return source.name
+    return source.node.name, source.name
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+_MAGIC = b'DFSNAP1\n'
+_LENGTHS = struct.Struct('<QQ')
+# Enough for the widest SIMD loads on NumPy data.
+_ALIGNMENT = 64
@@ -2,8 +2,12 @@ from operator import attrgetter
 
 
 from dataflow.implementation.input_port import InputPort
+from dataflow.implementation.input_values import InputValues
 from dataflow.implementation.output_port import OutputPort
 from dataflow.api.network_error import NetworkError
+from dataflow.implementation.detached_xfn import assert_not_awaitable
+from dataflow.implementation.detached_xfn import run_detached_xfn
+from dataflow.implementation.stable_digest import xfn_fingerprint
 
 
 class Node:
@@ -21,6 +25,13 @@ class Node:
     completed.
     """
 
+    # Large networks have very many nodes and ports, so none of the graph
+    # classes carry a per-instance __dict__.
+    __slots__ = ('input_ports', 'output_ports', 'name', 'is_dirty',
+                 'is_evicted', 'xfn', 'input_versions', 'memo_cache',
+                 'result_store', 'xfn_version', 'input_values',
+                 'output_setter')
+
     #------------------------------------------------------------------------
     # API to get the Node set up.
     #------------------------------------------------------------------------
@@ -30,8 +41,31 @@ class Node:
         self.name = name
         self.is_dirty = True
 
+        # Set when the values in the output ports have been thrown away to
+        # save memory, (see RetentionPolicy), so that the node must be
+        # executed again before they can be read, even if it is clean.
+        self.is_evicted = False
+
         self.xfn = None # See set_xfn()
 
+        # The versions of the terminals and output ports feeding this node, as
+        # they were when the transfer function last ran. (See Evaluator).
+        self.input_versions = None
+
+        # An optional MemoCache. (See Network.set_memo_cache()).
+        self.memo_cache = None
+
+        # An optional ResultStore, and the version of the xfn to file results
+        # under. (See Network.set_result_store()).
+        self.result_store = None
+        self.xfn_version = None
+
+        # What the transfer function is called with, made once, (rather than
+        # on every call). A read-only view of the input port values, and the
+        # (bound) function to write the output port values with.
+        self.input_values = InputValues(self.input_ports)
+        self.output_setter = self._output_setter
+
     def register_input_port(self, port_name):
         return self.input_ports.setdefault(
                 port_name, InputPort(port_name, self))
@@ -45,25 +79,98 @@ class Node:
         See Network.set_xfn()
         """
         self.xfn = transfer_fn
+        # Its previous outputs say nothing about what a new xfn would produce,
+        # and the version given for the old one does not apply to it.
+        self.input_versions = None
+        self.xfn_version = None
+        if self.memo_cache is not None:
+            self.memo_cache.clear()
 
     #------------------------------------------------------------------------
     # API to execute the transfer function.
     #------------------------------------------------------------------------
 
     def execute_transfer_function(self):
+        if self.memo_cache is not None or self.result_store is not None:
+            self._execute_and_remember()
+            return
         # When we call back to the client's transfer function, we provide read
-        # access to the input port values by making a dictionary
-        # derived from our (private) input ports.
-        input_values_dict = self._snapshot_input_values()
-        # Similarly, we make it possible for it to write to the output
+        # access to the input port values with a view of our (private) input
+        # ports. Similarly, we make it possible for it to write to the output
         # ports by passing it a writer.
-        self.xfn(input_values_dict, self._output_setter)
-        self.is_dirty = False
+        result = self.xfn(self.input_values, self.output_setter)
+        assert_not_awaitable(self.name, result)
+        self._mark_executed()
+
+    def execute_from_cache(self):
+        """
+        If this node has a MemoCache or ResultStore that remembers the outputs
+        for the current input values, sets them on the output ports, (marking
+        the node clean) and returns True. Otherwise returns False.
+        """
+        if self.memo_cache is None and self.result_store is None:
+            return False
+        input_values_dict = self._snapshot_input_values()
+        if self.memo_cache is not None:
+            output_values = self.memo_cache.lookup(input_values_dict)
+            if output_values is not None:
+                self.accept_output_values(output_values, remember=False)
+                return True
+        xfn_version = self._effective_xfn_version()
+        if xfn_version is not None:
+            output_values = self.result_store.lookup(
+                self.name, xfn_version, input_values_dict)
+            if output_values is not None:
+                if self.memo_cache is not None:
+                    self.memo_cache.store(input_values_dict, output_values)
+                self.accept_output_values(output_values, remember=False)
+                return True
+        return False
+
+    def detached_execution_args(self):
+        """
+        The arguments for run_detached_xfn(), with which the transfer function
+        can be executed away from this node, (e.g. in a worker thread or
+        process). Pass the output values it returns to accept_output_values()
+        afterwards.
+        """
+        return (self.name, self.xfn, self._snapshot_input_values(),
+                frozenset(self.output_ports))
+
+    def accept_output_values(self, output_values, compute_seconds=0.0,
+                             remember=True):
+        """
+        Completes a detached execution, by writing the output values it
+        produced, (a dictionary keyed on output port name), to the output ports.
+        (And remembering them in the MemoCache and ResultStore if there are
+        any).
+        """
+        for port_name, value in output_values.items():
+            self._output_setter(port_name, value)
+        if remember:
+            self._remember(output_values, compute_seconds)
+        self._mark_executed()
+
+    def evict_output_values(self):
+        """
+        Throw away the values in the output ports, to save memory.
+        """
+        for output_port in self.output_ports.values():
+            output_port.clear_value()
+        self.is_evicted = True
 
     #------------------------------------------------------------------------
     # API with convenience queries.
     #------------------------------------------------------------------------
 
+    @property
+    def is_stale(self):
+        """
+        Must this node be executed before its outputs can be read? I.e. is it
+        dirty, or have its output values been evicted?
+        """
+        return self.is_dirty or self.is_evicted
+
     def sorted_input_ports(self):
         """
         This Node's input ports, sorted by name.
@@ -77,12 +184,65 @@ class Node:
 
     def _snapshot_input_values(self):
         """
-        Makes a dictionary of the current input port values, keyed on port name.
+        Makes a dictionary of the current input port values, keyed on port name,
+        (for when they must outlive the execution, or travel elsewhere).
+        """
+        return dict(self.input_values)
+
+    def _execute_and_remember(self):
+        """
+        Executes the transfer function in such a way that the output values
+        it sets are captured, so that they can be remembered in the MemoCache
+        and/or ResultStore.
         """
-        snapshot = {}
-        for name, port in self.input_ports.items():
-            snapshot[name] = port.value
-        return snapshot
+        output_values, wall_seconds, _ = run_detached_xfn(
+            *self.detached_execution_args())
+        self.accept_output_values(output_values, wall_seconds)
+
+    def _remember(self, output_values, compute_seconds):
+        if self.memo_cache is None and self.result_store is None:
+            return
+        input_values_dict = self._snapshot_input_values()
+        if self.memo_cache is not None:
+            self.memo_cache.store(input_values_dict, output_values,
+                                  compute_seconds)
+        xfn_version = self._effective_xfn_version()
+        if xfn_version is not None:
+            self.result_store.store(self.name, xfn_version,
+                                    input_values_dict, output_values)
+
+    def _effective_xfn_version(self):
+        """
+        The version given by the client, or failing that, one derived from the
+        transfer function's code and the values it closes over, (see
+        xfn_fingerprint()). None when there is no ResultStore, or no version
+        can be worked out, in which case the store is not used.
+        """
+        if self.result_store is None:
+            return None
+        if self.xfn_version is not None:
+            return self.xfn_version
+        try:
+            return xfn_fingerprint(self.xfn)
+        except TypeError:
+            return None
+
+    def _mark_executed(self):
+        if self._is_reinstating():
+            # Re-executed only to get back the evicted values, which (for a
+            # pure transfer function) are the same as before.
+            self.is_evicted = False
+            return
+        # Output ports that have no comparator to tell us otherwise, are
+        # assumed to have changed.
+        for output_port in self.output_ports.values():
+            if output_port.comparator is None:
+                output_port.version += 1
+        self.is_dirty = False
+        self.is_evicted = False
+
+    def _is_reinstating(self):
+        return self.is_evicted and not self.is_dirty
 
     def _output_setter(self, port_name, value):
         """
@@ -91,8 +251,12 @@ class Node:
         output ports. This is that function.
         """
         try:
-            self.output_ports[port_name].set_value(value)
+            output_port = self.output_ports[port_name]
         except KeyError:
             raise NetworkError(
                 'Unknown output port name: <{}> for node: <{}>'.format(
                     port_name, self.name))
+        if self._is_reinstating():
+            output_port.reinstate_value(value)
+        else:
+            output_port.set_value(value)
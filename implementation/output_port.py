@@ -3,13 +3,44 @@ class OutputPort:
     """
     """
 
+
+    __slots__ = ('node', 'name', '_value', 'comparator', 'version')
+
     def __init__(self, name, node):
         self.node = node
         self.name = name
         self._value = None
+        # An optional client-provided callable(old, new), that says if two
+        # values are equal, (see Network.set_output_port_comparator()).
+        self.comparator = None
+        # Incremented every time the value changes. Without a comparator, the
+        # port is assumed to change every time its node executes. (See
+        # Node.execute_transfer_function()).
+        self.version = 0
 
     def set_value(self, value):
+        comparator = self.comparator
+        if comparator is not None and not comparator(self._value, value):
+            self.version += 1
+        self._value = value
+
+    def reinstate_value(self, value):
+        """
+        Put back a value that was evicted, (see clear_value()), without
+        counting it as a change.
+        """
         self._value = value
 
+    def clear_value(self):
+        self._value = None
+
     def get_value(self):
         return self._value
+
+    @property
+    def value(self):
+        """
+        The same as get_value(), (so that Terminals and OutputPorts can be read
+        alike).
+        """
+        return self._value
@@ -0,0 +1,111 @@
+from multiprocessing.shared_memory import SharedMemory
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; without it only buffers are shared.
+    numpy = None
+
+
+class SharedPayload:
+    """
+    Stands in for a large value while it is passed between processes. The
+    value itself has been copied into a block of shared memory, so that only
+    this small (picklable) object has to be sent down the pipe.
+
+    The receiving process calls unshare_value(), which copies the value out
+    again and unlinks the block. So each block is read exactly once.
+    """
+
+    __slots__ = ('name', 'size', 'kind', 'shape', 'dtype')
+
+    def __init__(self, name, size, kind, shape=None, dtype=None):
+        self.name = name
+        self.size = size
+        self.kind = kind  # 'bytes', 'bytearray' or 'ndarray'.
+        self.shape = shape
+        self.dtype = dtype
+
+
+def share_value(value, threshold):
+    """
+    If the value is a bytes-like object or NumPy array of at least threshold
+    bytes, copy it into shared memory and return a SharedPayload for it.
+    Otherwise return the value unchanged, (to be pickled as usual).
+    """
+    if isinstance(value, (bytes, bytearray)):
+        if not value or len(value) < threshold:
+            return value
+        shm = SharedMemory(create=True, size=len(value))
+        try:
+            shm.buf[:len(value)] = value
+        finally:
+            shm.close()
+        return SharedPayload(shm.name, len(value), type(value).__name__)
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        if value.nbytes == 0 or value.nbytes < threshold or \
+                value.dtype.hasobject:
+            return value
+        shm = SharedMemory(create=True, size=value.nbytes)
+        try:
+            view = numpy.ndarray(value.shape, value.dtype, buffer=shm.buf)
+            view[...] = value
+            del view  # (The block cannot be closed while it is viewed).
+        finally:
+            shm.close()
+        return SharedPayload(shm.name, value.nbytes, 'ndarray', value.shape,
+                             value.dtype.str)
+    return value
+
+
+def unshare_value(value):
+    """
+    The reverse of share_value(). (Values that are not SharedPayloads are
+    returned unchanged).
+    """
+    if not isinstance(value, SharedPayload):
+        return value
+    shm = SharedMemory(name=value.name)
+    try:
+        if value.kind == 'ndarray':
+            view = numpy.ndarray(value.shape, numpy.dtype(value.dtype),
+                                 buffer=shm.buf)
+            result = view.copy()
+            del view
+        elif value.kind == 'bytearray':
+            result = bytearray(shm.buf[:value.size])
+        else:
+            result = bytes(shm.buf[:value.size])
+    finally:
+        shm.close()
+        shm.unlink()
+    return result
+
+
+def share_values(values, threshold):
+    """
+    share_value() for each value in a dictionary.
+    """
+    return {key: share_value(value, threshold)
+            for key, value in values.items()}
+
+
+def unshare_values(values):
+    """
+    unshare_value() for each value in a dictionary.
+    """
+    return {key: unshare_value(value) for key, value in values.items()}
+
+
+def discard_values(values):
+    """
+    Unlinks the shared memory of any SharedPayloads in a dictionary, (for when
+    they will never be received, e.g. because the receiver has died).
+    """
+    for value in values.values():
+        if isinstance(value, SharedPayload):
+            try:
+                shm = SharedMemory(name=value.name)
+            except FileNotFoundError:
+                continue
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,139 @@
+import hashlib
+import pickle
+import types
+
+
+def stable_digest(value):
+    """
+    A SHA-256 hex digest of the value, that is the same in every process, (so
+    unlike a pickle of it, it does not depend on the order in which a set or
+    dictionary happens to hold its members, which can vary with string hash
+    randomization). The types of values are part of it, so 1, 1.0 and True
+    have different digests.
+
+    None, bools, numbers, strings and bytes, tuples, lists, dictionaries and
+    sets are encoded canonically; anything else is pickled. Raises TypeError
+    if something can be neither.
+    """
+    return _digest(value, False)
+
+
+def xfn_fingerprint(xfn):
+    """
+    A digest of what a transfer function computes, as far as can be told
+    without running it: its module and qualified name, its bytecode and
+    constants, the names it uses, and the values of the variables it closes
+    over. (For a bound method, that of the function it is bound to, and for a
+    callable object, that of its class's __call__() method).
+
+    It cannot see the values of the globals the function uses, or the state of
+    the object a method is bound to. Raises TypeError when there is something
+    it cannot encode, (see stable_digest()).
+    """
+    fn = getattr(xfn, '__func__', xfn)
+    if not isinstance(fn, types.FunctionType) and isinstance(
+            type(xfn).__call__, types.FunctionType):
+        fn = type(xfn).__call__
+    return _digest(fn, True)
+
+
+#------------------------------------------------------------------------
+# Private below.
+#------------------------------------------------------------------------
+
+_SCALARS = (type(None), bool, int, float, complex, str, bytes)
+
+
+def _digest(value, by_code):
+    """
+    With by_code, functions are encoded by their code and closures, (rather
+    than pickled, by reference to their name).
+    """
+    digest = hashlib.sha256()
+    _encode(value, digest.update, set() if by_code else None)
+    return digest.hexdigest()
+
+
+def _encode(value, write, in_progress):
+    """
+    Writes the encoding of the value. The in_progress set holds the ids of the
+    values being encoded, (when functions are encoded by code; otherwise it is
+    None).
+    """
+    kind = type(value)
+    write(b'<' + _type_name(kind).encode() + b'>')
+    if kind in _SCALARS:
+        write(repr(value).encode())
+        return
+    by_code = in_progress is not None
+    if by_code and id(value) in in_progress:
+        # (E.g. a function that closes over itself, to recurse).
+        write(b'...')
+        return
+    if by_code:
+        in_progress.add(id(value))
+    try:
+        if kind in (tuple, list):
+            _encode_items(value, write, in_progress)
+        elif kind is dict:
+            _encode_unordered(
+                [(k, v) for k, v in value.items()], write, in_progress)
+        elif kind in (set, frozenset):
+            _encode_unordered(list(value), write, in_progress)
+        elif by_code and kind is types.FunctionType:
+            _encode_items(
+                (value.__module__, value.__qualname__, value.__code__,
+                 value.__defaults__, tuple(_cell_contents(value))),
+                write, in_progress)
+        elif by_code and kind is types.CodeType:
+            write(value.co_code)
+            _encode_items((value.co_consts, value.co_names), write,
+                          in_progress)
+        else:
+            try:
+                write(pickle.dumps(value, protocol=_PROTOCOL))
+            except Exception:
+                raise TypeError(
+                    'Cannot make a stable digest of a {}.'.format(
+                        _type_name(kind)))
+    finally:
+        if by_code:
+            in_progress.discard(id(value))
+
+
+def _encode_items(items, write, in_progress):
+    write(b'%d[' % len(items))
+    for item in items:
+        _encode(item, write, in_progress)
+    write(b']')
+
+
+def _encode_unordered(items, write, in_progress):
+    """
+    Encodes the items in the order of their own digests, which does not depend
+    on the order they came in.
+    """
+    encoded = []
+    for item in items:
+        digest = hashlib.sha256()
+        _encode(item, digest.update, in_progress)
+        encoded.append(digest.digest())
+    write(b'%d{' % len(encoded))
+    for item in sorted(encoded):
+        write(item)
+    write(b'}')
+
+
+def _cell_contents(fn):
+    for cell in fn.__closure__ or ():
+        try:
+            yield cell.cell_contents
+        except ValueError:  # (A cell that has not been filled yet).
+            yield None
+
+
+def _type_name(kind):
+    return '{}.{}'.format(kind.__module__, kind.__qualname__)
+
+
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
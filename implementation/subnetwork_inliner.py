@@ -0,0 +1,189 @@
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_to_xfn import Network2Xfn
+from dataflow.implementation.terminal import Terminal
+
+
+class SubnetworkInliner:
+    """
+    Takes responsibility for copying the nodes and edges of a subnetwork into
+    a Network, in place of a node that would otherwise have used the
+    subnetwork as its transfer function, (see Network.inline_subnetwork()).
+
+    The copied nodes are named <prefix>.<inner node name>. Each inner terminal
+    that the input mapping names is replaced by whatever feeds the
+    corresponding input port of the node being replaced. Any other inner
+    terminal is copied too, (with its value), as <prefix>.<terminal name>.
+
+    The node being replaced is kept, so that its outputs can still be read,
+    but it becomes a pass-through: its input ports are swapped for ones
+    named after its output ports, each fed by the inner output port mapped to
+    it, and its transfer function just copies them across.
+
+    Inner nodes whose own transfer functions are Network2Xfn wrappers are
+    inlined too, so a whole hierarchy is flattened in one go.
+    """
+
+    def __init__(self, network):
+        self._network = network
+
+    def inline(self, node_name, subnet, input_mapping, output_mapping,
+               prefix=None):
+        pending = [(node_name, subnet, input_mapping, output_mapping, prefix)]
+        replaced = []
+        # A worklist rather than recursion, so that the depth of the
+        # hierarchy is not limited.
+        while pending:
+            node_name, subnet, input_mapping, output_mapping, prefix = \
+                pending.pop()
+            try:
+                placeholder = self._network.nodes[node_name]
+            except KeyError:
+                raise NetworkError('Unknown node name: <{}>'.format(node_name))
+            pending.extend(self._inline_one(
+                placeholder, subnet, input_mapping, output_mapping,
+                prefix or node_name))
+            replaced.append(placeholder)
+        return replaced
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _inline_one(self, placeholder, subnet, input_mapping, output_mapping,
+                    prefix):
+        """
+        Inlines one subnetwork, and returns the inlining jobs for any of its
+        nodes that wrap subnetworks in turn. (Everything is checked before
+        anything is changed).
+        """
+        net = self._network
+        node_name = placeholder.name
+        self._assert_mappings_valid(node_name, subnet, input_mapping,
+                                    output_mapping)
+        names = {name: '{}.{}'.format(prefix, name) for name in subnet.nodes}
+        self._assert_no_clashes(node_name, names.values(), net.nodes, 'node')
+        sources = self._mapped_sources(placeholder, input_mapping)
+        terminal_names = ['{}.{}'.format(prefix, name)
+                          for name in subnet.terminals if name not in sources]
+        self._assert_no_clashes(node_name, terminal_names, net.terminals,
+                                'terminal')
+
+        nested = []
+        for inner in subnet.nodes.values():
+            self._copy_node(inner, names[inner.name])
+            wrapper = getattr(inner.xfn, '__self__', None)
+            if isinstance(wrapper, Network2Xfn) and \
+                    inner.xfn.__func__ is Network2Xfn.xfn:
+                nested.append((names[inner.name], wrapper.net,
+                               wrapper.input_mapping, wrapper.output_mapping,
+                               None))
+
+        for edge in subnet.edges:
+            dest = net.nodes[names[edge.dest.node.name]].input_ports[
+                edge.dest.name]
+            source = edge.source
+            if isinstance(source, Terminal):
+                if source.name in sources:
+                    source = sources[source.name]
+                    if source is None:
+                        # Left unfed, like the input port it was mapped from.
+                        continue
+                else:
+                    source = self._copy_terminal(source, prefix)
+            else:
+                source = net.nodes[names[source.node.name]].output_ports[
+                    source.name]
+            net.add_edge(source, dest)
+
+        self._make_pass_through(placeholder, output_mapping, names)
+        return nested
+
+    def _mapped_sources(self, placeholder, input_mapping):
+        """
+        What feeds the placeholder's mapped input ports, (or None for those
+        unfed), keyed on the name of the inner terminal each is mapped to.
+        """
+        sources = {}
+        for port_name, terminal_name in input_mapping.items():
+            port = placeholder.input_ports.get(port_name)
+            edge = None if port is None else \
+                self._network.edge_index.edge_for_input(port)
+            sources[terminal_name] = None if edge is None else edge.source
+        return sources
+
+    def _copy_node(self, inner, name):
+        net = self._network
+        net.register_node(name)
+        node = net.nodes[name]
+        for port_name in inner.input_ports:
+            net.register_input_port(name, port_name)
+        for port_name, inner_port in inner.output_ports.items():
+            net.register_output_port(name, port_name)
+            node.output_ports[port_name].comparator = inner_port.comparator
+        node.set_xfn(inner.xfn)
+        node.memo_cache = inner.memo_cache
+        node.result_store = inner.result_store
+        node.xfn_version = inner.xfn_version
+
+    def _copy_terminal(self, inner, prefix):
+        net = self._network
+        name = '{}.{}'.format(prefix, inner.name)
+        if name not in net.terminals:
+            net.register_terminal(name)
+            terminal = net.terminals[name]
+            terminal.value = inner.value
+            terminal.comparator = inner.comparator
+        return net.terminals[name]
+
+    def _make_pass_through(self, placeholder, output_mapping, names):
+        net = self._network
+        net.remove_edges([edge for port in placeholder.input_ports.values()
+                          for edge in net.edge_index.edges_into(port)])
+        placeholder.input_ports.clear()
+        plan = net.compiled_plan()
+        if plan is not None:
+            plan.update_feeds(placeholder)
+        for (inner_node_name, inner_port_name), port_name in \
+                output_mapping.items():
+            net.register_input_port(placeholder.name, port_name)
+            source = net.nodes[names[inner_node_name]].output_ports[
+                inner_port_name]
+            net.add_edge(source, placeholder.input_ports[port_name])
+        placeholder.set_xfn(pass_through_xfn)
+
+    @staticmethod
+    def _assert_mappings_valid(node_name, subnet, input_mapping,
+                               output_mapping):
+        for terminal_name in input_mapping.values():
+            if terminal_name not in subnet.terminals:
+                raise NetworkError(
+                    'Cannot inline a subnetwork for the node called <{}>, '
+                    'because its input mapping names a terminal <{}>, which '
+                    'the subnetwork does not have.'.format(
+                        node_name, terminal_name))
+        for inner_node_name, inner_port_name in output_mapping:
+            inner = subnet.nodes.get(inner_node_name)
+            if inner is None or inner_port_name not in inner.output_ports:
+                raise NetworkError(
+                    'Cannot inline a subnetwork for the node called <{}>, '
+                    'because its output mapping names an output port <{}> on '
+                    'a node <{}>, which the subnetwork does not have.'.format(
+                        node_name, inner_port_name, inner_node_name))
+
+    @staticmethod
+    def _assert_no_clashes(node_name, new_names, existing, kind):
+        for name in new_names:
+            if name in existing:
+                raise NetworkError(
+                    'Cannot inline a subnetwork for the node called <{}>, '
+                    'because there is already a {} called <{}>.'.format(
+                        node_name, kind, name))
+
+
+def pass_through_xfn(input_values_dict, output_setter_fn):
+    """
+    The transfer function given to a node replaced by an inlined subnetwork,
+    which copies each input to the output port of the same name.
+    """
+    for port_name, value in input_values_dict.items():
+        output_setter_fn(port_name, value)
@@ -0,0 +1,161 @@
+from time import monotonic
+
+
+from dataflow.api.network_error import NetworkError
+
+
+class Subscription:
+    """
+    A client's interest in the value of one output port, (see
+    Network.subscribe()). Call cancel() to stop the callbacks.
+    """
+
+    def __init__(self, manager, output_port, callback, min_interval):
+        self.output_port = output_port
+        self.callback = callback
+        self.min_interval = min_interval
+        # The port version last notified, (or None if there has not been a
+        # notification, and the node was dirty when the subscription began).
+        self.last_version = None if output_port.node.is_dirty else \
+            output_port.version
+        self.last_notified = None  # A time.monotonic() time.
+        self._manager = manager
+
+    def cancel(self):
+        self._manager.remove(self)
+
+    def is_due(self, now):
+        """
+        Has the subscription's min_interval passed since the last callback?
+        """
+        return not self.min_interval or self.last_notified is None or \
+            now - self.last_notified >= self.min_interval
+
+
+class SubscriptionManager:
+    """
+    Takes responsibility for pushing changed output values to subscribers.
+
+    The Network calls publish() after each terminal write, (or after each
+    terminal_transaction()), whenever there are subscriptions. It makes the
+    subscribed nodes clean, (which executes only the dirty nodes they depend
+    upon), and then calls back the subscribers whose port's version has
+    changed since they were last called. A subscriber with a min_interval is
+    not called back more often than that; the change is held back, and
+    delivered by a later publish(), or by flush().
+
+    Should a transfer function raise an exception while the subscribed nodes
+    are made clean, or a callback raise one, the other subscribers are
+    notified nonetheless, (those whose nodes were made clean), and then
+    the first exception is re-raised. Subscribers that were not notified
+    because of it are notified by a later publish().
+    """
+
+    def __init__(self, network):
+        self._network = network
+        self._subscriptions = []
+        # Guards against re-entry from callbacks that write to terminals.
+        self._publishing = False
+        self._publish_again = False
+
+    def add(self, output_port, callback, min_interval):
+        subscription = Subscription(self, output_port, callback, min_interval)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def remove(self, subscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def remove_for_port(self, output_port):
+        """
+        Cancels all the subscriptions to the given output port, (which is
+        being removed from the network).
+        """
+        self._subscriptions = [s for s in self._subscriptions
+                               if s.output_port is not output_port]
+
+    def forget_notified_versions(self):
+        """
+        Makes every subscription due to be notified at the next publish(), (for
+        when the port versions have been replaced wholesale, and so say nothing
+        about what the subscribers have seen).
+        """
+        for subscription in self._subscriptions:
+            subscription.last_version = None
+
+    def __bool__(self):
+        return bool(self._subscriptions)
+
+    def publish(self, force=False):
+        """
+        Brings the subscribed ports up to date and notifies the subscribers
+        of changes. When force is True, min_interval is ignored.
+
+        The first exception raised, by a transfer function or a callback, is
+        re-raised at the end, after any further passes that callbacks asked
+        for, (by writing to terminals), have been made too.
+        """
+        if self._publishing:
+            # A callback has written to a terminal; go round again afterwards,
+            # rather than notifying from inside a notification.
+            self._publish_again = True
+            return
+        self._publishing = True
+        first_error = None
+        try:
+            self._publish_again = True
+            while self._publish_again:
+                self._publish_again = False
+                error = self._publish_once(force)
+                if first_error is None:
+                    first_error = error
+        finally:
+            self._publishing = False
+        if first_error is not None:
+            raise first_error
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _publish_once(self, force):
+        """
+        Makes one pass over the subscriptions, and returns the first exception
+        raised along the way, (or None).
+        """
+        net = self._network
+        dirty = [s.output_port.node for s in self._subscriptions
+                 if s.output_port.node.is_stale]
+        first_error = None
+        if dirty:
+            try:
+                net.check_integrity_if_needed()
+            except NetworkError:
+                # The network is not ready to be evaluated yet, (e.g. some
+                # terminals are still unset), so there is nothing to publish.
+                return None
+            try:
+                net.evaluate(dirty)
+            except Exception as e:
+                first_error = e
+        now = monotonic()
+        # Copy, in case a callback cancels a subscription.
+        for subscription in list(self._subscriptions):
+            port = subscription.output_port
+            if port.node.is_stale:
+                # Its evaluation failed.
+                continue
+            if port.version == subscription.last_version:
+                continue
+            if not force and not subscription.is_due(now):
+                continue
+            subscription.last_version = port.version
+            subscription.last_notified = now
+            try:
+                subscription.callback(port.node.name, port.name,
+                                      port.get_value())
+            except Exception as e:
+                if first_error is None:
+                    first_error = e
+        return first_error
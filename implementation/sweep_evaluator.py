@@ -0,0 +1,158 @@
+try:
+    import numpy
+except ImportError:  # NumPy is optional; without it columns are lists.
+    numpy = None
+
+
+from dataflow.api.network_error import NetworkError
+from dataflow.implementation.detached_xfn import assert_not_awaitable
+from dataflow.implementation.detached_xfn import run_detached_xfn
+
+
+class SweepEvaluator:
+    """
+    Takes responsibility for evaluating a Network over many *scenarios* at
+    once, each scenario being a different set of values for some of its
+    terminals, (see Network.sweep()).
+
+    It splits the work in two:
+
+        o  The nodes that do not depend on any of the varied terminals are
+           made clean in the ordinary way, once, because they give the same
+           answer in every scenario.
+        o  The nodes that do depend on them, (and that the requested outputs
+           need), are evaluated column by column, in topological order. Each
+           such node is called once per scenario, or just once for all of
+           them if its transfer function accepts columns, (see
+           dataflow.api.vectorized_xfn).
+
+    The column by column evaluation is done on the side. It does not write to
+    the network's terminals, ports or nodes, which are left exactly as they
+    were, (except for the invariant nodes having been made clean).
+    """
+
+    def __init__(self, network):
+        self._network = network
+
+    def sweep(self, terminal_columns, output_ports):
+        """
+        The column of values taken by each of the given OutputPorts, across
+        the scenarios described by terminal_columns, (a dictionary of columns
+        of values keyed on Terminal).
+        """
+        net = self._network
+        n_scenarios = self._common_length(terminal_columns)
+        net.check_integrity_if_needed(ignore_terminals=terminal_columns)
+        plan = net.evaluation_plan()
+
+        varying = set()
+        for terminal in terminal_columns:
+            varying.update(plan.downstream_closure(terminal))
+        schedule = plan.upstream_cone_within(
+            [port.node for port in output_ports], varying)
+
+        # The invariant nodes that the varying ones, or the outputs, need.
+        invariant = {source.node
+                     for node in schedule
+                     for _, source, is_terminal in plan.feeds[node]
+                     if source is not None and not is_terminal
+                     and source.node not in varying}
+        invariant.update(port.node for port in output_ports
+                         if port.node not in varying)
+        # They are all evaluated together, (not just the stale ones), so that
+        # a RetentionPolicy counts them all as in use, and does not evict the
+        # clean ones to make room for the others.
+        if any(node.is_stale for node in invariant):
+            net.evaluate(list(invariant))
+
+        # Columns keyed on the varied terminals and the varying output ports.
+        columns = dict(terminal_columns)
+        for node in schedule:
+            self._evaluate_node(node, plan.feeds[node], columns, n_scenarios)
+
+        as_arrays = numpy is not None and any(
+            isinstance(column, numpy.ndarray)
+            for column in terminal_columns.values())
+        results = []
+        for port in output_ports:
+            column = columns.get(port)
+            if column is None:
+                column = [port.get_value()] * n_scenarios
+            results.append(numpy.asarray(column) if as_arrays
+                           else list(column))
+        return results
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _evaluate_node(self, node, feeds, columns, n_scenarios):
+        """
+        Works out the columns for the output ports of the given node, from
+        those of its inputs, and adds them to columns.
+        """
+        fixed_inputs = {}
+        varying_inputs = []
+        for input_port, source, is_terminal in feeds:
+            if source is None:
+                # Raises the appropriate error.
+                self._network.edge_for_input(input_port)
+            column = columns.get(source)
+            if column is not None:
+                varying_inputs.append((input_port.name, column))
+            elif is_terminal:
+                fixed_inputs[input_port.name] = source.value
+            else:
+                fixed_inputs[input_port.name] = source.get_value()
+
+        if getattr(node.xfn, 'accepts_columns', False):
+            input_values_dict = dict(fixed_inputs, **dict(varying_inputs))
+            output_columns = run_detached_xfn(
+                node.name, node.xfn, input_values_dict,
+                frozenset(node.output_ports))[0]
+            for port_name, column in output_columns.items():
+                if len(column) != n_scenarios:
+                    raise NetworkError(
+                        ('The transfer function for the node called <{}> set '
+                         'a column of {} values on its output port <{}>, '
+                         'instead of {}.').format(node.name, len(column),
+                                                  port_name, n_scenarios))
+        else:
+            output_columns = self._evaluate_per_scenario(
+                node, fixed_inputs, varying_inputs, n_scenarios)
+
+        for port_name, port in node.output_ports.items():
+            column = output_columns.get(port_name)
+            columns[port] = [None] * n_scenarios if column is None else column
+
+    def _evaluate_per_scenario(self, node, fixed_inputs, varying_inputs,
+                               n_scenarios):
+        xfn = node.xfn
+        output_columns = {name: [None] * n_scenarios
+                          for name in node.output_ports}
+        scenario = 0
+
+        def output_setter_fn(port_name, value):
+            try:
+                output_columns[port_name][scenario] = value
+            except KeyError:
+                raise NetworkError(
+                    'Unknown output port name: <{}> for node: <{}>'.format(
+                        port_name, node.name))
+
+        for scenario in range(n_scenarios):
+            input_values_dict = dict(fixed_inputs)
+            for port_name, column in varying_inputs:
+                input_values_dict[port_name] = column[scenario]
+            assert_not_awaitable(node.name,
+                                 xfn(input_values_dict, output_setter_fn))
+        return output_columns
+
+    @staticmethod
+    def _common_length(terminal_columns):
+        lengths = {len(column) for column in terminal_columns.values()}
+        if len(lengths) > 1:
+            raise NetworkError(
+                'The terminal value columns must all be the same length, '
+                'not: {}.'.format(sorted(lengths)))
+        return lengths.pop() if lengths else 0
@@ -6,6 +6,14 @@ class Terminal:
     of which causes an event to be emitted to subscribed clients.
     """
 
+
+    __slots__ = ('name', 'value', 'comparator', 'version')
+
     def __init__(self, name):
         self.name = name
         self.value = None
+        # An optional client-provided callable(old, new), that says if two
+        # values are equal, (see Network.set_terminal_comparator()).
+        self.comparator = None
+        # Incremented every time the value changes.
+        self.version = 0
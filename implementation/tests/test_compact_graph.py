@@ -0,0 +1,30 @@
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import REF_SCRIPT
+
+
+class TestCompactGraph(unittest.TestCase):
+
+    def test_graph_objects_have_no_instance_dict(self):
+        net = NetworkFactory(REF_SCRIPT).build()
+        adder = net.nodes['adder']
+        for graph_object in (adder, adder.input_ports['in_1'],
+                             adder.output_ports['sum'], net.terminals['X'],
+                             net.edges[0]):
+            self.assertFalse(hasattr(graph_object, '__dict__'),
+                             type(graph_object).__name__)
+
+    def test_plan_tables_are_tuples(self):
+        net = NetworkFactory(REF_SCRIPT).build()
+        plan = net.evaluation_plan()
+        formatter = net.nodes['formatter']
+        self.assertIsInstance(plan.feeds[formatter], tuple)
+        self.assertEqual(('adder', 'multiplier'),
+                         tuple(n.name for n in plan.upstream_nodes[formatter]))
+        self.assertEqual(('adder', 'multiplier'), tuple(
+            n.name for n in plan.downstream_nodes[net.terminals['X']]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.network_factory import ParseError
+from dataflow.implementation.compiled_topology import CompiledTopology
+from dataflow.implementation.reference_network import REF_SCRIPT
+from dataflow.implementation.reference_network import adder_xfn
+from dataflow.implementation.reference_network import format_xfn
+from dataflow.implementation.reference_network import mult_xfn
+
+
+class TestCompiledTopology(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_compiled_network_has_the_same_topology(self):
+        parsed = NetworkFactory(REF_SCRIPT).build()
+        loaded = NetworkFactory.from_compiled(
+            NetworkFactory(REF_SCRIPT).compile())
+        self.assertEqual(self._describe(parsed), self._describe(loaded))
+
+    def test_compiled_network_evaluates_like_a_parsed_one(self):
+        net = NetworkFactory.from_compiled(
+            NetworkFactory(REF_SCRIPT).compile())
+        self._set_xfns(net)
+        net.set_terminal_values({'X': 42, 'Y': 3.14})
+        self.assertEqual(
+            'sum: 45.14, mult: 131.88',
+            net.get_output_port_value('formatter', 'msg'))
+        self.assertEqual(['adder', 'multiplier'],
+                         [n.name for n in net.nodes_fed_by_terminal(
+                             net.terminals['X'])])
+
+    def test_build_uses_the_cache_file_for_the_script(self):
+        NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        files = os.listdir(self.cache_dir)
+        self.assertEqual(1, len(files))
+
+        # Prove the second build loads the cache file rather than parsing, by
+        # doctoring the file to describe a different topology.
+        doctored = CompiledTopology.from_network(
+            NetworkFactory('TERM:Z > only:in').build())
+        with open(os.path.join(self.cache_dir, files[0]), 'wb') as f:
+            f.write(doctored.to_bytes())
+        net = NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        self.assertEqual(['only'], list(net.nodes))
+
+    def test_a_changed_script_is_compiled_again(self):
+        NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        net = NetworkFactory(REF_SCRIPT + '\nTERM:Z > extra:in',
+                             cache_dir=self.cache_dir).build()
+        self.assertIn('extra', net.nodes)
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+
+    def test_a_corrupt_cache_file_is_replaced(self):
+        NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(path, 'wb') as f:
+            f.write(b'rubbish')
+        net = NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        self.assertEqual(self._describe(NetworkFactory(REF_SCRIPT).build()),
+                         self._describe(net))
+        with open(path, 'rb') as f:
+            CompiledTopology.from_bytes(f.read())
+
+    def test_from_compiled_rejects_rubbish(self):
+        with self.assertRaises(ParseError):
+            NetworkFactory.from_compiled(b'rubbish')
+
+    def test_ids_out_of_range_are_rejected(self):
+        good = CompiledTopology.from_network(NetworkFactory(REF_SCRIPT).build())
+        for table in ('input_ports', 'output_ports', 'edge_sources',
+                      'edge_dests'):
+            for bad_id in (-100, 100):
+                topology = CompiledTopology.from_bytes(good.to_bytes())
+                getattr(topology, table)[0] = bad_id
+                with self.assertRaises(ParseError):
+                    NetworkFactory.from_compiled(topology.to_bytes())
+        topology = CompiledTopology.from_bytes(good.to_bytes())
+        topology.node_names[0] = 42
+        with self.assertRaises(ValueError):
+            CompiledTopology.from_bytes(topology.to_bytes())
+
+    def test_a_cache_file_with_bad_ids_is_replaced(self):
+        NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(path, 'rb') as f:
+            topology = CompiledTopology.from_bytes(f.read())
+        topology.edge_dests[0] = 1000
+        with open(path, 'wb') as f:
+            f.write(topology.to_bytes())
+        net = NetworkFactory(REF_SCRIPT, cache_dir=self.cache_dir).build()
+        self.assertEqual(self._describe(NetworkFactory(REF_SCRIPT).build()),
+                         self._describe(net))
+
+    def test_other_python_versions_are_rejected(self):
+        data = NetworkFactory(REF_SCRIPT).compile()
+        self.assertTrue(data.startswith(b'DFNET1:py%d.%d:' %
+                                        sys.version_info[:2]))
+        with self.assertRaises(ParseError):
+            NetworkFactory.from_compiled(
+                data.replace(b':py', b':py9', 1))
+
+    def _describe(self, net):
+        return (
+            sorted((name, sorted(node.input_ports), sorted(node.output_ports))
+                   for name, node in net.nodes.items()),
+            sorted(net.terminals),
+            sorted((e.source.name, e.dest.node.name, e.dest.name)
+                   for e in net.edges))
+
+    def _set_xfns(self, net):
+        net.set_xfn('adder', adder_xfn)
+        net.set_xfn('multiplier', mult_xfn)
+        net.set_xfn('formatter', format_xfn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,3 +23,37 @@ class TestDirtyPropagator(TestCase):
                 'Wrong reply from which_nodes_are_dirty()')
 
 
+    def test_propagation_stops_at_dirty_nodes(self):
+        # Leave the nodes fed by X dirty, but (artificially) clean the
+        # formatter downstream of them. Since dirty nodes are known to have
+        # only dirty nodes downstream, the propagator should not walk past
+        # them, and so the formatter should be left untouched.
+        self.net.nodes['formatter'].is_dirty = False
+        self.net.set_terminal_value('X', 42)
+        self.assertFalse(self.net.nodes['formatter'].is_dirty,
+                         'Propagation walked beyond a dirty node.')
+
+    def test_diamonds_are_walked_once_per_node(self):
+        # A ladder of diamonds, which has 2**depth distinct paths from the
+        # terminal to the last node. (This would never finish if every path
+        # were walked).
+        depth = 40
+        lines = ['TERM:T > d0:in']
+        for i in range(depth):
+            lines.append('d{}:out > l{}:in'.format(i, i))
+            lines.append('        > r{}:in'.format(i))
+            lines.append('l{}:out > d{}:in_l'.format(i, i + 1))
+            lines.append('r{}:out > d{}:in_r'.format(i, i + 1))
+        net = NetworkFactory('\n'.join(lines)).build()
+        for node in net.nodes.values():
+            node.is_dirty = False
+        net.set_terminal_value('T', 1)
+        self.assertTrue(all(node.is_dirty for node in net.nodes.values()),
+                        'Not all nodes were set dirty.')
+
+    def test_downstream_closure(self):
+        plan = self.net.evaluation_plan()
+        closure = plan.downstream_closure(self.net.terminals['X'])
+        self.assertEqual(['adder', 'formatter', 'multiplier'],
+                         sorted(node.name for node in closure),
+                         'Wrong closure.')
@@ -0,0 +1,65 @@
+
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import REF_SCRIPT
+
+
+class TestEdgeIndex(unittest.TestCase):
+
+    def setUp(self):
+        builder = NetworkFactory(REF_SCRIPT)
+        self.net = builder.build()
+
+    def test_nodes_fed_by_terminal_are_sorted(self):
+        terminal = self.net.terminals['X']
+        names = [n.name for n in self.net.nodes_fed_by_terminal(terminal)]
+        self.assertEqual(['adder', 'multiplier'], names, 'Wrong fan-out.')
+
+    def test_fan_out_sees_edges_added_later(self):
+        # Query first, so that the sorted fan-out gets cached, then add
+        # another edge from the same source.
+        output_port = self.net.nodes['adder'].output_ports['sum']
+        self.net.nodes_fed_by_output_port(output_port)
+        self.net.register_node('bystander')
+        self.net.register_input_port('bystander', 'in_1')
+        self.net.create_output_to_input_edge(
+            'adder', 'sum', 'bystander', 'in_1')
+        names = [n.name for n in self.net.nodes_fed_by_output_port(output_port)]
+        self.assertEqual(['bystander', 'formatter'], names, 'Stale fan-out.')
+
+    def test_edge_for_input(self):
+        input_port = self.net.nodes['formatter'].input_ports['in_2']
+        edge = self.net.edge_for_input(input_port)
+        self.assertIs(self.net.nodes['multiplier'].output_ports['prod'],
+                      edge.source, 'Wrong edge.')
+
+    def test_duplicate_edge_is_rejected(self):
+        with self.assertRaises(RuntimeError) as cm:
+            self.net.create_terminal_edge('X', 'adder', 'in_1')
+        self.assertEqual('Encountered duplicate edge from: X to in_1',
+                         str(cm.exception), 'Wrong message.')
+
+    def test_duplicate_is_detected_behind_an_earlier_edge(self):
+        # in_1 is already fed by X, so an edge from Y is only an extra, but
+        # repeating it must still be caught.
+        self.net.create_terminal_edge('Y', 'adder', 'in_1')
+        input_port = self.net.nodes['adder'].input_ports['in_1']
+        self.assertIs(self.net.terminals['X'],
+                      self.net.edge_for_input(input_port).source,
+                      'The first edge should win.')
+        with self.assertRaises(RuntimeError):
+            self.net.create_terminal_edge('Y', 'adder', 'in_1')
+
+    def test_removing_the_first_edge_promotes_the_next(self):
+        self.net.create_terminal_edge('Y', 'adder', 'in_1')
+        input_port = self.net.nodes['adder'].input_ports['in_1']
+        first = self.net.edge_for_input(input_port)
+        self.net.edge_index.remove(first)
+        self.assertIs(self.net.terminals['Y'],
+                      self.net.edge_for_input(input_port).source)
+        self.assertFalse(self.net.edge_index.contains(
+            self.net.terminals['X'], input_port))
+        names = [n.name for n in self.net.nodes_fed_by_terminal(
+            self.net.terminals['X'])]
+        self.assertEqual(['multiplier'], names, 'Stale fan-out.')
@@ -1,7 +1,10 @@
-
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 from dataflow.api.network_factory import NetworkFactory
+from dataflow.api.network_factory import ParseError
 from dataflow.implementation.reference_network import REF_SCRIPT
 
 
@@ -11,3 +14,79 @@ class TestNetworkFactory(unittest.TestCase):
         builder = NetworkFactory(REF_SCRIPT)
         net = builder.build()
         self.assertIsNotNone(net, 'Builder returned None')
+
+    def test_from_lines_reads_a_generator(self):
+        def generate():
+            yield 'TERM:X > n0:in  # the start'
+            for i in range(1, 100):
+                yield 'n{}:out > n{}:in'.format(i - 1, i)
+        net = NetworkFactory.from_lines(generate()).build()
+        self.assertEqual(100, len(net.nodes))
+        self.assertEqual(['n0'], [n.name for n in net.nodes_fed_by_terminal(
+            net.terminals['X'])])
+
+    def test_from_file_builds_the_same_network_as_the_script(self):
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(REF_SCRIPT)
+            from_file = NetworkFactory.from_file(path).build()
+        finally:
+            os.remove(path)
+        from_script = NetworkFactory(REF_SCRIPT).build()
+        self.assertEqual(self._describe(from_script), self._describe(from_file))
+
+    def test_from_file_with_a_cache_reads_the_file_once(self):
+        # So that a concurrent edit cannot get one version of the script
+        # filed under the hash of another.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'script.txt')
+            with open(path, 'w') as f:
+                f.write(REF_SCRIPT)
+            opened = []
+            real_open = open
+
+            def counting_open(file, *args, **kwargs):
+                opened.append(file)
+                return real_open(file, *args, **kwargs)
+
+            with mock.patch('dataflow.api.network_factory.open',
+                            counting_open, create=True):
+                net = NetworkFactory.from_file(
+                    path, cache_dir=os.path.join(tmp_dir, 'cache')).build()
+        self.assertEqual(1, opened.count(path))
+        self.assertEqual(self._describe(NetworkFactory(REF_SCRIPT).build()),
+                         self._describe(net))
+
+    def test_errors_give_the_line_number(self):
+        lines = ['# comment', 'TERM:X > adder:in_1', 'adder:sum formatter:in_1']
+        with self.assertRaises(ParseError) as cm:
+            NetworkFactory.from_lines(lines).build()
+        self.assertTrue(str(cm.exception).startswith('Line 3: '),
+                        str(cm.exception))
+
+    def test_continuation_without_left_hand_side_gives_the_line_number(self):
+        with self.assertRaises(ParseError) as cm:
+            NetworkFactory('\n  > adder:in_1').build()
+        self.assertTrue(str(cm.exception).startswith('Line 2: '),
+                        str(cm.exception))
+
+    def test_duplicate_edge_gives_the_line_number(self):
+        script = 'TERM:X > adder:in_1\nTERM:X > adder:in_1'
+        with self.assertRaises(ParseError) as cm:
+            NetworkFactory(script).build()
+        self.assertEqual(
+            'Line 2: Encountered duplicate edge from: X to in_1',
+            str(cm.exception))
+
+    def _describe(self, net):
+        return (
+            list((name, list(node.input_ports), list(node.output_ports))
+                 for name, node in net.nodes.items()),
+            list(net.terminals),
+            list((e.source.name, e.dest.node.name, e.dest.name)
+                 for e in net.edges))
+
+
+if __name__ == '__main__':
+    unittest.main()
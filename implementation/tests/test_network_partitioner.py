@@ -0,0 +1,55 @@
+import unittest
+
+from dataflow.api.network_error import NetworkError
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.network_partitioner import NetworkPartitioner
+
+
+class TestNetworkPartitioner(unittest.TestCase):
+
+    def setUp(self):
+        # A connected pair, and two nodes on their own.
+        self.net = NetworkFactory("""
+            TERM:P    > A:in
+            A:out     > B:in
+            B:out     > DANGLING
+            TERM:Q    > C:in
+            C:out     > DANGLING
+            TERM:R    > D:in
+            D:out     > DANGLING
+        """).build()
+
+    def test_connected_subgraphs_are_kept_whole(self):
+        partition_of = NetworkPartitioner.partition(self.net, 2)
+        self.assertEqual(partition_of['A'], partition_of['B'])
+        self.assertNotEqual(partition_of['A'], partition_of['C'])
+        self.assertEqual(partition_of['C'], partition_of['D'])
+
+    def test_cost_balances_the_nodes(self):
+        costs = {'A': 10.0, 'B': 1.0, 'C': 6.0, 'D': 4.0}
+        partition_of = NetworkPartitioner.partition(
+            self.net, 2, strategy='cost', node_costs=costs)
+        loads = [0.0, 0.0]
+        for name, partition in partition_of.items():
+            loads[partition] += costs[name]
+        self.assertEqual([10.0, 11.0], sorted(loads))
+
+    def test_nodes_fed_by_one_terminal_are_connected(self):
+        net = NetworkFactory("""
+            TERM:P    > A:in
+                      > B:in
+            A:out     > DANGLING
+            B:out     > DANGLING
+        """).build()
+        partition_of = NetworkPartitioner.partition(net, 2)
+        self.assertEqual(partition_of['A'], partition_of['B'])
+
+    def test_bad_arguments(self):
+        with self.assertRaises(NetworkError):
+            NetworkPartitioner.partition(self.net, 0)
+        with self.assertRaises(NetworkError):
+            NetworkPartitioner.partition(self.net, 2, strategy='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from multiprocessing.shared_memory import SharedMemory
+
+from dataflow.implementation.shared_memory_transport import SharedPayload
+from dataflow.implementation.shared_memory_transport import discard_values
+from dataflow.implementation.shared_memory_transport import share_value
+from dataflow.implementation.shared_memory_transport import unshare_value
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestSharedMemoryTransport(unittest.TestCase):
+
+    def test_small_and_other_values_are_left_alone(self):
+        for value in (b'tiny', 'a string' * 1000, [1, 2, 3], None):
+            self.assertIs(value, share_value(value, threshold=100))
+            self.assertIs(value, unshare_value(value))
+
+    def test_large_buffers_round_trip_once(self):
+        value = bytes(range(200))
+        shared = share_value(value, threshold=100)
+        self.assertIsInstance(shared, SharedPayload)
+        self.assertEqual(value, unshare_value(shared))
+        # Reading it unlinks the shared memory.
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name=shared.name)
+
+    def test_bytearrays_stay_bytearrays(self):
+        value = bytearray(500)
+        self.assertEqual(value, unshare_value(share_value(value, 100)))
+        self.assertIsInstance(unshare_value(share_value(value, 100)),
+                              bytearray)
+
+    def test_discard(self):
+        shared = share_value(bytes(500), threshold=100)
+        discard_values({'in': shared, 'other': 1})
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name=shared.name)
+        # Discarding twice is harmless.
+        discard_values({'in': shared})
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy_arrays_round_trip(self):
+        value = numpy.arange(1000, dtype=numpy.float64).reshape(10, 100).T
+        shared = share_value(value, threshold=100)
+        self.assertIsInstance(shared, SharedPayload)
+        numpy.testing.assert_array_equal(value, unshare_value(shared))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from dataflow.api.network_factory import NetworkFactory
+from dataflow.implementation.reference_network import build_reference_network
+
+
+class TestSharedValueSlots(unittest.TestCase):
+    """
+    Tests that input ports share the values of whatever feeds them, and that
+    transfer functions get a reusable read-only view of them.
+    """
+
+    def test_input_ports_read_from_their_source(self):
+        net = build_reference_network()
+        net.set_terminal_values({'X': 1, 'Y': 2})
+        net.get_output_port_value('formatter', 'msg')
+        formatter = net.nodes['formatter']
+        sum_port = net.nodes['adder'].output_ports['sum']
+        self.assertIs(sum_port, formatter.input_ports['in_1'].source)
+        self.assertIs(net.terminals['X'],
+                      net.nodes['adder'].input_ports['in_1'].source)
+        self.assertEqual(3, formatter.input_ports['in_1'].value)
+
+    def test_values_are_not_copied(self):
+        net = NetworkFactory("""
+            TERM:T   > A:in
+            A:out    > B:in
+            B:out    > DANGLING
+        """).build()
+        seen = []
+        payload = ['big']
+
+        def a_xfn(input_values_dict, output_setter_fn):
+            output_setter_fn('out', payload)
+
+        def b_xfn(input_values_dict, output_setter_fn):
+            seen.append((input_values_dict, input_values_dict['in']))
+            output_setter_fn('out', len(input_values_dict))
+
+        net.set_xfn('A', a_xfn)
+        net.set_xfn('B', b_xfn)
+        net.set_terminal_value('T', 1)
+        net.get_output_port_value('B', 'out')
+        net.set_terminal_value('T', 2)
+        net.get_output_port_value('B', 'out')
+
+        (first_view, first_value), (second_view, _) = seen
+        self.assertIs(payload, first_value)
+        # The same view is used for every call.
+        self.assertIs(first_view, second_view)
+        self.assertEqual({'in': payload}, dict(first_view))
+
+    def test_view_is_read_only(self):
+        net = build_reference_network()
+        errors = []
+
+        def xfn(input_values_dict, output_setter_fn):
+            try:
+                input_values_dict['in_1'] = 0
+            except TypeError as e:
+                errors.append(e)
+            output_setter_fn('sum', sum(input_values_dict.values()))
+
+        net.set_xfn('adder', xfn)
+        net.set_terminal_values({'X': 1, 'Y': 2})
+        self.assertEqual(3, net.get_output_port_value('adder', 'sum'))
+        self.assertEqual(1, len(errors))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from dataflow.implementation.stable_digest import stable_digest
+from dataflow.implementation.stable_digest import xfn_fingerprint
+
+
+class TestStableDigest(unittest.TestCase):
+
+    def test_types_are_distinguished(self):
+        digests = {stable_digest(value) for value in (1, 1.0, True, '1', b'1')}
+        self.assertEqual(5, len(digests))
+        self.assertEqual(stable_digest({'a': 1, 'b': (2, 3)}),
+                         stable_digest({'b': (2, 3), 'a': 1}))
+
+    def test_the_same_in_every_process(self):
+        code = ('from dataflow.implementation.stable_digest import '
+                'stable_digest; '
+                'print(stable_digest({"k": {"apple", "pear", "plum"}}))')
+        digests = set()
+        for seed in ('1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=seed,
+                       PYTHONPATH=os.pathsep.join(sys.path))
+            digests.add(subprocess.run(
+                [sys.executable, '-c', code], env=env, check=True,
+                capture_output=True, text=True).stdout)
+        self.assertEqual(1, len(digests))
+
+    def test_closures_with_the_same_name_are_told_apart(self):
+        double, triple = make_multiplier(2), make_multiplier(3)
+        self.assertEqual(double.__qualname__, triple.__qualname__)
+        self.assertNotEqual(xfn_fingerprint(double), xfn_fingerprint(triple))
+        self.assertEqual(xfn_fingerprint(double),
+                         xfn_fingerprint(make_multiplier(2)))
+        self.assertNotEqual(xfn_fingerprint(lambda i, o: o('out', 1)),
+                            xfn_fingerprint(lambda i, o: o('out', 2)))
+
+    def test_unencodable_values(self):
+        with self.assertRaises(TypeError):
+            stable_digest(lambda: None)
+        # (Functions it closes over are encoded by their code).
+        xfn_fingerprint(make_multiplier(lambda: None))
+        with self.assertRaises(TypeError):
+            xfn_fingerprint(make_multiplier(x for x in ()))
+
+
+def make_multiplier(factor):
+    def xfn(input_values_dict, output_setter_fn):
+        output_setter_fn('out', input_values_dict['in'] * factor)
+    return xfn
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+from dataflow.api.network_error import NetworkError
+
+
+class TopologyEditor:
+    """
+    Takes responsibility for changing the topology of a live Network, (see the
+    Network Editing API), by removing nodes, terminals, ports and edges, and
+    by rewiring input ports.
+
+    Each change is made incrementally. The edge index and the EvaluationPlan
+    are updated only where the change touches them, and only the nodes whose
+    inputs change are made dirty, along with whatever is downstream of them.
+    Every other node keeps its (clean) output values.
+
+    A node whose inputs change also forgets the versions of its inputs, (see
+    Evaluator), because they no longer say anything about what it would
+    produce now. So early cutoff cannot skip its re-execution.
+    """
+
+    def __init__(self, network):
+        self._network = network
+
+    def remove_node(self, node_name):
+        net = self._network
+        node = self._node(node_name)
+        fed = self._remove_edges_from(node.output_ports.values())
+        net.remove_edges([edge for port in node.input_ports.values()
+                          for edge in net.edge_index.edges_into(port)])
+        net.forget_node(node)
+        del net.nodes[node_name]
+        plan = net.compiled_plan()
+        if plan is not None:
+            plan.remove_node(node)
+        fed.discard(node)
+        self._inputs_changed(fed)
+
+    def remove_terminal(self, terminal_name):
+        net = self._network
+        try:
+            terminal = net.terminals.pop(terminal_name)
+        except KeyError:
+            raise NetworkError(
+                'Unknown terminal name: <{}>'.format(terminal_name))
+        fed = self._remove_edges_from([terminal])
+        plan = net.compiled_plan()
+        if plan is not None:
+            plan.remove_terminal(terminal)
+        self._inputs_changed(fed)
+
+    def remove_input_port(self, node_name, port_name):
+        net = self._network
+        node = self._node(node_name)
+        port = self._input_port(node, port_name)
+        net.remove_edges(net.edge_index.edges_into(port))
+        del node.input_ports[port_name]
+        plan = net.compiled_plan()
+        if plan is not None:
+            plan.update_feeds(node)
+        self._inputs_changed([node])
+
+    def remove_output_port(self, node_name, port_name):
+        node = self._node(node_name)
+        port = self._output_port(node, port_name)
+        fed = self._remove_edges_from([port])
+        self._network.forget_output_port(port)
+        del node.output_ports[port_name]
+        self._inputs_changed(fed)
+
+    def remove_edge(self, source, node_name, port_name):
+        """
+        Remove the edge from the given source (Terminal or OutputPort) to the
+        named input port.
+        """
+        net = self._network
+        port = self._input_port(self._node(node_name), port_name)
+        edges = [edge for edge in net.edge_index.edges_into(port)
+                 if edge.source is source]
+        if not edges:
+            raise NetworkError(
+                'There is no edge from <{}> to <{}:{}>.'.format(
+                    source.name, node_name, port_name))
+        net.remove_edges(edges)
+        self._inputs_changed([port.node])
+
+    def rewire_input(self, node_name, port_name, source):
+        """
+        Make the given source (Terminal or OutputPort) the only thing feeding
+        the named input port.
+        """
+        net = self._network
+        port = self._input_port(self._node(node_name), port_name)
+        edges = net.edge_index.edges_into(port)
+        if [edge.source for edge in edges] == [source]:
+            return
+        # Before anything is changed, so that nothing needs undoing. (Even on
+        # a network that has no plan yet, which this compiles).
+        net.evaluation_plan().check_new_edge(source, port)
+        net.remove_edges(edges)
+        net.add_edge(source, port)
+        self._inputs_changed([port.node])
+
+    def output_port(self, node_name, port_name):
+        return self._output_port(self._node(node_name), port_name)
+
+    def terminal(self, terminal_name):
+        try:
+            return self._network.terminals[terminal_name]
+        except KeyError:
+            raise NetworkError(
+                'Unknown terminal name: <{}>'.format(terminal_name))
+
+    #------------------------------------------------------------------------
+    # Private below.
+    #------------------------------------------------------------------------
+
+    def _remove_edges_from(self, sources):
+        """
+        Removes all the edges leaving the given sources, and returns the set
+        of nodes they fed.
+        """
+        net = self._network
+        edges = [edge for source in sources
+                 for edge in net.edge_index.edges_from(source)]
+        net.remove_edges(edges)
+        return {edge.dest.node for edge in edges}
+
+    def _inputs_changed(self, nodes):
+        if not nodes:
+            return
+        for node in nodes:
+            node.input_versions = None
+        self._network.invalidate_outputs(nodes)
+
+    def _node(self, node_name):
+        try:
+            return self._network.nodes[node_name]
+        except KeyError:
+            raise NetworkError('Unknown node name: <{}>'.format(node_name))
+
+    @staticmethod
+    def _input_port(node, port_name):
+        try:
+            return node.input_ports[port_name]
+        except KeyError:
+            raise NetworkError(
+                'Node: <{}> does not have an input port called: <{}>'.format(
+                    node.name, port_name))
+
+    @staticmethod
+    def _output_port(node, port_name):
+        try:
+            return node.output_ports[port_name]
+        except KeyError:
+            raise NetworkError(
+                'Node: <{}> does not have an output port called: <{}>'.format(
+                    node.name, port_name))